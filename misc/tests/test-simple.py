@@ -1,8 +1,22 @@
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import pytest
 
 from unified_planning.engines import (OptimalityGuarantee,
         PlanGenerationResultStatus)
+from unified_planning.plans import ActionInstance
 from unified_planning.shortcuts import *
+from up_fast_downward import (FastDownwardOptimalPDDLPlanner,
+                              FastDownwardSASCompiler, GroundingCache,
+                              TranslationCache)
+from up_fast_downward import components, portfolio, utils
+from up_fast_downward.statistics import STATISTICS_VERSION, typed_statistics
 unified_planning.shortcuts.get_environment().credits_stream = None # silence credits
 
 
@@ -29,3 +43,566 @@ def test_valid_result_status(oneshot_planner_name):
     assert result.plan is not None
     assert result.status is PlanGenerationResultStatus.SOLVED_SATISFICING
 
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_bypass_driver(oneshot_planner_name):
+    solvable = robot_problem(4)
+    unsolvable = robot_problem(4)
+    unsolvable.add_goal(unsolvable.fluent('at')(unsolvable.object('l-0')))
+    params = {"fast_downward_bypass_driver": True}
+    with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+        result = planner.solve(solvable)
+        assert len(result.plan.actions) == 1
+        bypass_status = planner.solve(unsolvable).status
+    with OneshotPlanner(name=oneshot_planner_name) as planner:
+        assert planner.solve(unsolvable).status is bypass_status
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_in_memory(oneshot_planner_name):
+    params = {"fast_downward_in_memory": True}
+    with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+
+@pytest.mark.skipif(not os.access(utils.MEMORY_DIRECTORY, os.W_OK),
+                    reason="no memory-backed file system")
+def test_in_memory_stale_directories(monkeypatch):
+    live = utils.make_temp_directory(in_memory=True)
+    # a directory of a killed process: nobody holds its lock
+    stale = tempfile.mkdtemp(prefix="up-fast-downward-",
+                             dir=utils.MEMORY_DIRECTORY)
+    open(os.path.join(stale, "lock"), "w").close()
+    monkeypatch.setattr(utils, "_stale_directories_removed", False)
+    new = utils.make_temp_directory(in_memory=True)
+    assert os.path.isdir(live)
+    assert not os.path.exists(stale)
+    for directory in (live, new):
+        utils.remove_temp_directory(directory)
+        assert not os.path.exists(directory)
+
+@pytest.mark.parametrize("bypass_driver", [False, True])
+def test_resource_limits(bypass_driver):
+    params = {"fast_downward_bypass_driver": bypass_driver,
+              "fast_downward_phase_metrics": True,
+              "fast_downward_overall_time_limit": "10m",
+              "fast_downward_translate_memory_limit": "2G",
+              "fast_downward_search_memory_limit": "2G"}
+    with OneshotPlanner(name="fast-downward-opt", params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+    for phase in ("translate", "search"):
+        assert float(result.metrics[f"{phase}_wall_time"]) > 0
+        if sys.platform != "win32":
+            assert f"{phase}_cpu_time" in result.metrics
+
+@pytest.mark.skipif(sys.platform != "linux",
+                    reason="prlimit is only available on Linux")
+def test_limits_set_after_start(tmp_path):
+    import resource
+    run = portfolio.ConfigRun(
+        "sleep", [sys.executable, "-c", "import time; time.sleep(60)"],
+        str(tmp_path / "plan"),
+        set_limits=components.limits_setter(30, 2**31))
+    run.start()
+    try:
+        pid = run.process.pid
+        assert resource.prlimit(pid, resource.RLIMIT_CPU) == (30, 31)
+        assert resource.prlimit(pid, resource.RLIMIT_AS) == (2**31, 2**31)
+    finally:
+        run.kill()
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_single_driver_run(oneshot_planner_name):
+    params = {"fast_downward_overall_time_limit": "10m",
+              "fast_downward_search_memory_limit": "2G"}
+    with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+    # Without options that need separate runs, the driver runs once.
+    assert float(result.metrics["planner_wall_time"]) > 0
+    assert "translate_wall_time" not in result.metrics
+
+def test_output_streamed_while_running(tmp_path):
+    stream = io.StringIO()
+    code = "print('started', flush=True); import time; time.sleep(60)"
+    run = portfolio.ConfigRun("sleep", [sys.executable, "-c", code],
+                              str(tmp_path / "plan"), output_stream=stream)
+    run.start()
+    try:
+        deadline = time.monotonic() + 30
+        while "started" not in stream.getvalue():
+            assert not run.poll() and time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        run.kill()
+    assert stream.getvalue() == "started\n"
+
+@pytest.mark.parametrize("params", [
+    {}, {"fast_downward_phase_metrics": True},
+    {"fast_downward_bypass_driver": True},
+    {"fast_downward_portfolio": ["lama-first", "astar(blind())"]}])
+def test_output_stream(params):
+    out, err = io.StringIO(), io.StringIO()
+    with OneshotPlanner(name="fast-downward", params=params) as planner:
+        planner.solve(robot_problem(4), output_stream=(out, err))
+    # the output of the translator and of the search
+    assert "Parsing..." in out.getvalue()
+    assert "Solution found!" in out.getvalue()
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_statistics(oneshot_planner_name):
+    params = {"fast_downward_log_messages": False}
+    with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert not result.log_messages
+    assert result.metrics["statistics_version"] == STATISTICS_VERSION
+    statistics = typed_statistics(result.metrics)
+    assert statistics["translator_operators"] > 0
+    assert statistics["search_expanded"] >= 1
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_progress_callback(oneshot_planner_name):
+    events = []
+    params = {"fast_downward_progress_callback": events.append}
+    with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+    plan_events = [event for event in events if event.kind == "plan"]
+    assert plan_events and plan_events[-1].plan_cost is not None
+
+def test_optimal_search_config():
+    params = {"fast_downward_search_config": "astar(blind())"}
+    with OneshotPlanner(name="fast-downward-opt", params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+
+def test_optimal_log_level_positional():
+    planner = FastDownwardOptimalPDDLPlanner("debug")
+    assert planner._log_level == "debug"
+    assert planner._fd_alias is None
+
+def test_optimal_auto_config(tmp_path):
+    log = tmp_path / "selection.jsonl"
+    params = {"fast_downward_auto_config": True,
+              "fast_downward_selection_log": str(log)}
+    with OneshotPlanner(name="fast-downward-opt", params=params) as planner:
+        result = planner.solve(robot_problem(4))
+    assert len(result.plan.actions) == 1
+    assert result.metrics["selected_config"] == "astar(lmcut())"
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert records[0]["config"] == result.metrics["selected_config"]
+    assert records[0]["status"] == result.status.name
+
+def test_portfolio():
+    problem = robot_problem(4)
+    portfolio = ["lama-first", "astar(blind())"]
+    with OneshotPlanner(name="fast-downward",
+                        params={"fast_downward_portfolio": portfolio}) as planner:
+        result = planner.solve(problem)
+    assert result.status is PlanGenerationResultStatus.SOLVED_SATISFICING
+    assert len(result.plan.actions) == 1
+    assert result.metrics["portfolio_winner"] in portfolio
+
+def test_portfolio_entry_points():
+    problem = robot_problem(4)
+    portfolio = ["astar(blind())", "eager_greedy([ff()])"]
+    with OneshotPlanner(name="fast-downward",
+                        params={"fast_downward_portfolio": portfolio}) as planner:
+        with planner.replanning_session(problem) as session:
+            result = session.solve({})
+        assert result.metrics["portfolio_winner"] in portfolio
+        with pytest.raises(unified_planning.exceptions.UPUsageError):
+            list(planner.solve_batch([problem]))
+        with pytest.raises(unified_planning.exceptions.UPUsageError):
+            asyncio.run(planner.solve_async(problem))
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_translate_once(oneshot_planner_name):
+    problem = robot_problem(4)
+    with OneshotPlanner(name=oneshot_planner_name) as planner:
+        with planner.translate(problem) as task:
+            results = [task.solve(), task.solve("astar(blind())")]
+            results += task.solve_parallel(["lama-first", "astar(blind())"])
+    for result in results:
+        assert result.status in (PlanGenerationResultStatus.SOLVED_SATISFICING,
+                                 PlanGenerationResultStatus.SOLVED_OPTIMALLY)
+        assert len(result.plan.actions) == 1
+
+def test_translate_missing_output():
+    with OneshotPlanner(name="fast-downward-opt") as planner:
+        with planner.translate(robot_problem(4)) as task:
+            os.remove(task.sas_filename)
+            result = task.solve()
+    # not a proof that the problem is unsolvable
+    assert result.status is PlanGenerationResultStatus.INTERNAL_ERROR
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_translation_cache(oneshot_planner_name, tmp_path):
+    cache = TranslationCache(str(tmp_path))
+    params = {"fast_downward_translation_cache": cache}
+    for _ in range(2):
+        with OneshotPlanner(name=oneshot_planner_name, params=params) as planner:
+            result = planner.solve(robot_problem(4))
+        assert len(result.plan.actions) == 1
+    assert result.metrics["translation_cache_hit"] == "True"
+    assert cache.statistics.hits == 1
+    assert cache.statistics.misses == 1
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_replanning_session(oneshot_planner_name):
+    problem = robot_problem(4)
+    at = problem.fluent('at')
+    l = [problem.object(f'l-{i}') for i in range(4)]
+    with OneshotPlanner(name=oneshot_planner_name) as planner:
+        with planner.replanning_session(problem) as session:
+            # a reachable state: only the initial state of the task changes
+            result = session.solve({at(l[0]): False, at(l[2]): True})
+            assert result.metrics["replanning_translated"] == "False"
+            assert len(result.plan.actions) == 1
+            # violates the mutex of the locations: translate again
+            result = session.solve({at(l[1]): True})
+            assert result.metrics["replanning_translated"] == "True"
+            assert len(result.plan.actions) == 1
+            assert session.translations == 2
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_solve_batch(oneshot_planner_name):
+    problems = [robot_problem(n) for n in range(2, 6)]
+    with OneshotPlanner(name=oneshot_planner_name) as planner:
+        results = dict(planner.solve_batch(iter(problems), timeout=60,
+                                           workers=2, max_buffered_results=2))
+    assert sorted(results) == [0, 1, 2, 3]
+    for result in results.values():
+        assert result.status in (PlanGenerationResultStatus.SOLVED_SATISFICING,
+                                 PlanGenerationResultStatus.SOLVED_OPTIMALLY)
+        assert len(result.plan.actions) == 1
+
+def test_solve_batch_rejects_separate_runs():
+    params = {"fast_downward_auto_config": True}
+    with OneshotPlanner(name="fast-downward-opt", params=params) as planner:
+        with pytest.raises(unified_planning.exceptions.UPUsageError,
+                           match="fast_downward_auto_config"):
+            list(planner.solve_batch([robot_problem(4)]))
+
+@pytest.mark.parametrize("oneshot_planner_name", ["fast-downward",
+                                                  "fast-downward-opt"])
+def test_solve_async(oneshot_planner_name):
+    async def solve_all(planner):
+        problems = [robot_problem(n) for n in range(2, 5)]
+        return await asyncio.gather(*(planner.solve_async(p) for p in problems))
+
+    with OneshotPlanner(name=oneshot_planner_name) as planner:
+        results = asyncio.run(solve_all(planner))
+    for result in results:
+        assert result.status in (PlanGenerationResultStatus.SOLVED_SATISFICING,
+                                 PlanGenerationResultStatus.SOLVED_OPTIMALLY)
+        assert len(result.plan.actions) == 1
+
+def test_get_solutions():
+    with AnytimePlanner(name="fast-downward") as planner:
+        results = list(planner.get_solutions(robot_problem(4), timeout=60))
+    assert results[0].status is PlanGenerationResultStatus.INTERMEDIATE
+    assert results[-1].status is PlanGenerationResultStatus.SOLVED_SATISFICING
+    assert len(results[-1].plan.actions) == 1
+
+def test_get_solutions_output_stream():
+    out, err = io.StringIO(), io.StringIO()
+    with AnytimePlanner(name="fast-downward") as planner:
+        results = list(planner.get_solutions(robot_problem(4), timeout=60,
+                                             output_stream=(out, err)))
+    assert results[-1].status is PlanGenerationResultStatus.SOLVED_SATISFICING
+    assert "Solution found!" in out.getvalue()
+    # the driver of the search does not log its steps
+    assert "INFO     Running search" not in out.getvalue()
+
+def test_anytime_solve():
+    with AnytimePlanner(name="fast-downward") as planner:
+        result = planner._solve(robot_problem(4), timeout=60, anytime=True)
+    assert result.status is PlanGenerationResultStatus.SOLVED_SATISFICING
+    assert len(result.plan.actions) == 1
+
+def test_get_all_solutions_async():
+    async def all_solutions(planner):
+        return [r async for r in planner.get_all_solutions_async(
+            robot_problem(4), timeout=60)]
+
+    with AnytimePlanner(name="fast-downward") as planner:
+        results = asyncio.run(all_solutions(planner))
+    assert results[0].status is PlanGenerationResultStatus.INTERMEDIATE
+    assert results[-1].status is PlanGenerationResultStatus.SOLVED_SATISFICING
+    assert len(results[-1].plan.actions) == 1
+
+def test_async_rejects_separate_runs(tmp_path):
+    params = {"fast_downward_translation_cache": TranslationCache(str(tmp_path))}
+    with AnytimePlanner(name="fast-downward", params=params) as planner:
+        with pytest.raises(unified_planning.exceptions.UPUsageError,
+                           match="fast_downward_translation_cache"):
+            asyncio.run(planner.solve_async(robot_problem(4)))
+
+@pytest.mark.parametrize("grounder_name", ["fast-downward-grounder",
+                                           "fast-downward-reachability-grounder"])
+def test_grounder_maps_back(grounder_name):
+    problem = robot_problem(3)
+    move = problem.action('move')
+
+    with Compiler(name=grounder_name) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    assert len(result.problem.actions) == 6
+    for action in result.problem.actions:
+        lifted = result.map_back_action_instance(ActionInstance(action))
+        assert lifted.action == move
+        assert lifted.actual_parameters[0] != lifted.actual_parameters[1]
+
+@pytest.mark.parametrize("grounder_name", ["fast-downward-grounder",
+                                           "fast-downward-reachability-grounder"])
+def test_grounder_prepared_domain(grounder_name):
+    with Compiler(name=grounder_name) as grounder:
+        grounder.prepare_domain(robot_problem(3))
+        result = grounder.compile(robot_problem(5), CompilationKind.GROUNDING)
+    assert len(result.problem.actions) == 20
+    assert result.log_messages
+
+@pytest.mark.parametrize("grounder_name", ["fast-downward-grounder",
+                                           "fast-downward-reachability-grounder"])
+def test_grounder_profile(grounder_name):
+    phases = []
+    params = {"profile_memory": True, "profile_callback": phases.append}
+    with Compiler(name=grounder_name, params=params) as grounder:
+        result = grounder.compile(robot_problem(3), CompilationKind.GROUNDING)
+    assert "compute_model" in [p.phase for p in phases]
+    assert float(result.metrics["profile_compute_model_wall_time"]) >= 0
+    assert int(result.metrics["profile_compute_model_items"]) > 0
+    assert "profile_compute_model_peak_allocated_bytes" in result.metrics
+    with Compiler(name=grounder_name) as grounder:
+        result = grounder.compile(robot_problem(3), CompilationKind.GROUNDING)
+    assert not result.metrics
+
+@pytest.mark.parametrize("grounder_name", ["fast-downward-grounder",
+                                           "fast-downward-reachability-grounder"])
+def test_grounder_cache_hit(grounder_name):
+    # Grounding reads the initial values of the problem, which must not
+    # change its key in the cache.
+    cache = GroundingCache()
+    problem = robot_problem(45)
+    with Compiler(name=grounder_name, params={"cache": cache}) as grounder:
+        grounder.compile(problem, CompilationKind.GROUNDING)
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    assert cache.statistics.misses == 1
+    assert cache.statistics.hits == 1
+    assert len(result.problem.actions) == 45 * 44
+
+@pytest.mark.parametrize("grounder_name", ["fast-downward-grounder",
+                                           "fast-downward-reachability-grounder"])
+def test_grounder_cache_tiers(grounder_name, tmp_path):
+    problem = robot_problem(4)
+    cache = GroundingCache(directory=str(tmp_path))
+    with Compiler(name=grounder_name, params={"cache": cache}) as grounder:
+        first = grounder.compile(problem, CompilationKind.GROUNDING)
+        second = grounder.compile(problem, CompilationKind.GROUNDING)
+    # The memory tier keeps the ground problem.
+    assert second.problem is first.problem
+    assert cache.statistics.memory_hits == 1
+    assert cache.statistics.misses == 1
+
+    # A new cache finds the grounding on disk and rebuilds the problem.
+    cache = GroundingCache(directory=str(tmp_path))
+    with Compiler(name=grounder_name, params={"cache": cache}) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    assert cache.statistics.disk_hits == 1
+    assert cache.statistics.misses == 0
+    assert len(result.problem.actions) == 12
+    for action in result.problem.actions:
+        lifted = result.map_back_action_instance(ActionInstance(action))
+        assert lifted.action == problem.action('move')
+
+def test_grounding_cache_eviction():
+    cache = GroundingCache(max_entries=2)
+    cache.put_result("a", 1)
+    cache.put_result("b", 2)
+    assert cache.get_result("a") == 1
+    cache.put_result("c", 3)
+    assert cache.get_result("b") is None
+    assert cache.get_result("a") == 1
+    assert cache.get_result("c") == 3
+    assert cache.statistics.memory_evictions == 1
+    # Without a directory, there is no disk tier.
+    cache.put("d", 4)
+    assert cache.get("d") is None
+    assert cache.statistics.misses == 1
+
+def test_reachability_grounder_direct_instantiation():
+    problem = robot_problem(4)
+    with Compiler(name="fast-downward-reachability-grounder") as grounder:
+        expected = grounder.compile(problem, CompilationKind.GROUNDING)
+    params = {"direct_instantiation": True}
+    with Compiler(name="fast-downward-reachability-grounder",
+                  params=params) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    assert ([str(a) for a in result.problem.actions] ==
+            [str(a) for a in expected.problem.actions])
+    for action, expected_action in zip(result.problem.actions,
+                                       expected.problem.actions):
+        lifted = result.map_back_action_instance(ActionInstance(action))
+        expected_lifted = expected.map_back_action_instance(
+            ActionInstance(expected_action))
+        assert lifted.action == expected_lifted.action
+        assert lifted.actual_parameters == expected_lifted.actual_parameters
+
+def test_grounder_compact():
+    problem = robot_problem(3)
+    with Compiler(name="fast-downward-grounder") as grounder:
+        expected = grounder.compile(problem, CompilationKind.GROUNDING)
+        compact = grounder.ground_compact(problem)
+    assert len(compact) == len(expected.problem.actions) == 6
+    assert compact.costs is None
+    assert [compact.fnode(f) for f in compact.goals] == problem.goals
+    for i, action in enumerate(compact.actions):
+        assert action.name == compact.action_names[i]
+        assert len(compact.action_preconditions(i)) == 1
+        assert len(compact.action_add_effects(i)) == 1
+        assert len(compact.action_del_effects(i)) == 1
+        lifted = compact.map_back_action_instance(ActionInstance(action))
+        assert lifted.action == problem.action("move")
+        assert lifted.actual_parameters == compact.map_back(i)[1]
+
+def test_grounder_stream():
+    problem = robot_problem(3)
+    with Compiler(name="fast-downward-grounder") as grounder:
+        expected = grounder.compile(problem, CompilationKind.GROUNDING)
+        streamed = list(grounder.ground_actions(problem))
+        compact = list(grounder.ground_actions(problem, compact=True))
+    assert ([str(s.action) for s in streamed] ==
+            [str(a) for a in expected.problem.actions])
+    for s in streamed:
+        lifted = expected.map_back_action_instance(ActionInstance(
+            expected.problem.action(s.action.name)))
+        assert s.schematic_action == lifted.action
+        assert s.parameters == lifted.actual_parameters
+    assert sorted(c.action.name for c in compact) == [
+        "(move l-0 l-1)", "(move l-0 l-2)", "(move l-1 l-0)",
+        "(move l-1 l-2)", "(move l-2 l-0)", "(move l-2 l-1)"]
+
+def test_grounder_simplify():
+    problem = robot_problem(3)
+    lamp = Fluent('lamp')
+    switch_on = InstantaneousAction('switch_on')
+    switch_on.add_effect(lamp, True)
+    problem.add_fluent(lamp, default_initial_value=False)
+    problem.add_action(switch_on)
+    with Compiler(name="fast-downward-grounder",
+                  params={"simplify": True}) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    assert len(result.problem.actions) == 6
+    assert not result.problem.has_fluent("lamp")
+    assert result.metrics["simplification_actions_before"] == "7"
+    assert result.metrics["simplification_irrelevant_actions"] == "1"
+    assert result.metrics["simplification_dropped_fluents"] == "1"
+
+@pytest.mark.parametrize("grounder_name,params", [
+    ("fast-downward-grounder", {}),
+    ("fast-downward-grounder", {"simplify": True}),
+    ("fast-downward-reachability-grounder", {"direct_instantiation": True})])
+def test_grounder_action_costs(grounder_name, params):
+    problem = robot_problem(3)
+    move = problem.action('move')
+    Location = problem.user_type('Location')
+    distance = Fluent('distance', IntType(), l_from=Location, l_to=Location)
+    problem.add_fluent(distance, default_initial_value=1)
+    l = [problem.object(f'l-{i}') for i in range(3)]
+    problem.set_initial_value(distance(l[0], l[2]), 5)
+    problem.add_quality_metric(MinimizeActionCosts({move: distance(*move.parameters)}))
+    with Compiler(name=grounder_name, params=params) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    metric, = result.problem.quality_metrics
+    assert isinstance(metric, MinimizeActionCosts)
+    for action in result.problem.actions:
+        lifted = result.map_back_action_instance(ActionInstance(action))
+        cost = metric.get_action_cost(action).constant_value()
+        params = [p.object() for p in lifted.actual_parameters]
+        assert cost == (5 if params == [l[0], l[2]] else 1)
+
+def test_grounder_merge_duplicates():
+    problem = robot_problem(3)
+    # The parameter "by" does not matter, so the ground actions that only
+    # differ in it are duplicates.
+    Location = problem.user_type('Location')
+    at = problem.fluent('at')
+    teleport = InstantaneousAction('teleport', l_from=Location, l_to=Location,
+                                   by=Location)
+    l_from, l_to, _ = teleport.parameters
+    teleport.add_precondition(at(l_from))
+    teleport.add_effect(at(l_from), False)
+    teleport.add_effect(at(l_to), True)
+    problem.add_action(teleport)
+    with Compiler(name="fast-downward-grounder",
+                  params={"merge_duplicates": True}) as grounder:
+        result = grounder.compile(problem, CompilationKind.GROUNDING)
+    # The teleport actions between different locations are also duplicates
+    # of the move actions.
+    assert result.metrics["merged_duplicate_actions"] == "24"
+    assert len(result.problem.actions) == 6 + 3
+    lifted_actions = [
+        result.map_back_action_instance(ActionInstance(a)).action.name
+        for a in result.problem.actions]
+    assert sorted(lifted_actions) == ["move"] * 6 + ["teleport"] * 3
+
+def test_grounder_does_not_load_translate():
+    # Only the SAS+ compiler needs the module translate, which imports the
+    # whole translator and parses the command line.
+    code = "\n".join([
+        "import sys",
+        "from unified_planning.shortcuts import *",
+        "from up_fast_downward import FastDownwardGrounder",
+        "from up_fast_downward.translator import TranslatorSession",
+        "TranslatorSession()",
+        "assert 'translate' not in sys.modules",
+        "assert 'options' not in sys.modules",
+    ])
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+def test_sas_compiler():
+    problem = robot_problem(3)
+    compiler = FastDownwardSASCompiler()
+    task = compiler.compile_finite_domain(problem)
+    # The robot is always at exactly one location.
+    assert len(task.variables) == 1
+    variable = task.variables[0]
+    at = problem.fluent('at')
+    assert sorted(str(fluent_exp) for fluent_exp, positive in variable.facts
+                  if positive) == ['at(l-0)', 'at(l-1)', 'at(l-2)']
+    assert len(task.problem.actions) == 6
+    for action in task.problem.actions:
+        lifted = task.map_back_action_instance(ActionInstance(action))
+        assert lifted.action.name == 'move'
+    with SequentialSimulator(task.problem) as simulator:
+        values = task.map_back_state(simulator.get_initial_state())
+    l0 = problem.object('l-0')
+    l2 = problem.object('l-2')
+    assert values[at(l0)].is_true()
+    assert values[at(l2)].is_false()
+
+def robot_problem(num_locations):
+    Location = UserType('Location')
+    at = Fluent('at', BoolType(), l=Location)
+    move = InstantaneousAction('move', l_from=Location, l_to=Location)
+    l_from, l_to = move.parameters
+    move.add_precondition(at(l_from))
+    move.add_precondition(Not(Equals(l_from, l_to)))
+    move.add_effect(at(l_from), False)
+    move.add_effect(at(l_to), True)
+    problem = Problem('robot')
+    problem.add_fluent(at, default_initial_value=False)
+    problem.add_action(move)
+    locations = [Object(f'l-{i}', Location) for i in range(num_locations)]
+    problem.add_objects(locations)
+    problem.set_initial_value(at(locations[0]), True)
+    problem.add_goal(at(locations[-1]))
+    return problem
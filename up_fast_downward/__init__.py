@@ -1,2 +1,4 @@
 from .fast_downward import FastDownwardPDDLPlanner, FastDownwardOptimalPDDLPlanner
 from .fast_downward_grounder import FastDownwardGrounder, FastDownwardReachabilityGrounder
+from .sas_compiler import FastDownwardSASCompiler
+from .caching import GroundingCache, TranslationCache
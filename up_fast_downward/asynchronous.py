@@ -0,0 +1,217 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import unified_planning as up
+from typing import AsyncIterator, List, Optional, Tuple
+from warnings import warn
+from unified_planning.engines import PlanGenerationResultStatus as ResultStatus
+from unified_planning.engines.results import LogLevel, LogMessage, PlanGenerationResult
+from unified_planning.io import PDDLWriter
+from up_fast_downward import portfolio, statistics, utils
+from up_fast_downward.progress import OutputReader
+
+
+def _check_problem(
+    planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+    problem: "up.model.AbstractProblem",
+):
+    # the checks of the solve method of the unified planning framework
+    assert isinstance(problem, up.model.Problem)
+    if not planner.skip_checks and not planner.supports(problem.kind):
+        msg = f"We cannot establish whether {planner.name} can solve this problem!"
+        if planner.error_on_failed_checks:
+            raise up.exceptions.UPUsageError(msg)
+        warn(msg)
+
+
+async def run(
+    planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+    problem: "up.model.AbstractProblem",
+    timeout: Optional[float] = None,
+    anytime: bool = False,
+    poll_interval: float = 0.05,
+) -> AsyncIterator["up.engines.results.PlanGenerationResult"]:
+    """
+    Runs the Fast Downward driver on the given problem as an asyncio
+    subprocess. In anytime mode, the plans are yielded with status
+    INTERMEDIATE as soon as Fast Downward has written them. The last result
+    is the final result of the run.
+
+    Writing the PDDL files and parsing the plans runs in worker threads, so
+    large problems do not block the event loop.
+
+    If the task that iterates over the results is cancelled, the driver
+    and all processes it has started are killed.
+    """
+    _check_problem(planner, problem)
+    unsupported = planner._separate_run_options(anytime)
+    if unsupported:
+        raise up.exceptions.UPUsageError(
+            "Asynchronous solving runs the driver once per problem and does not "
+            "support " + ", ".join(unsupported)
+        )
+    if anytime:
+        config = planner._fd_anytime_alias or planner._fd_anytime_search_config
+    else:
+        config = planner._default_config()
+    if config is None:
+        raise up.exceptions.UPUsageError(
+            "Asynchronous solving needs an engine with an alias or a search "
+            "configuration"
+        )
+    directory = planner._temp_directory()
+    process = None
+    try:
+        domain_filename = os.path.join(directory, "domain.pddl")
+        problem_filename = os.path.join(directory, "problem.pddl")
+        plan_filename = os.path.join(directory, "plan.txt")
+
+        def write_task() -> Tuple["up.model.Problem", PDDLWriter]:
+            prepared_problem = planner._prepare_problem(problem)
+            writer = PDDLWriter(
+                prepared_problem,
+                planner._needs_requirements,
+                planner._rewrite_bool_assignments,
+            )
+            writer.write_domain(domain_filename)
+            writer.write_problem(problem_filename)
+            return prepared_problem, writer
+
+        writing = asyncio.ensure_future(asyncio.to_thread(write_task))
+        try:
+            problem, writer = await asyncio.shield(writing)
+        finally:
+            if not writing.done():
+                # cancelled: wait for the thread before the directory is
+                # removed
+                await asyncio.wait([writing])
+        if anytime:
+            cmd = planner._get_anytime_cmd(
+                domain_filename, problem_filename, plan_filename
+            )
+        else:
+            cmd = planner._get_cmd(domain_filename, problem_filename, plan_filename)
+
+        kwargs = (
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}  # type: ignore
+            if sys.platform == "win32"
+            else {"start_new_session": True}
+        )
+        with open(plan_filename + ".out", "w") as stdout:
+            with open(plan_filename + ".err", "w") as stderr:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=stdout, stderr=stderr, cwd=directory, **kwargs
+                )
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        def plan_from_file(filename: str) -> "up.plans.Plan":
+            return planner._plan_from_file(problem, filename, writer.get_item_named)
+
+        # Anytime configurations write the plans to numbered plan files.
+        plans: List[str] = []
+
+        def new_plans() -> List["up.plans.Plan"]:
+            result = []
+            while True:
+                filename = f"{plan_filename}.{len(plans) + 1}"
+                if portfolio.plan_cost(filename) is None:
+                    return result
+                plans.append(filename)
+                result.append(plan_from_file(filename))
+
+        monitor = planner._progress_monitor(config)
+        output_reader = OutputReader(plan_filename + ".out")
+
+        def stopped() -> bool:
+            # passes the new output to the progress monitor
+            if monitor is None:
+                return False
+            for line in output_reader.read_lines():
+                monitor.feed(line)
+            return monitor.stopped
+
+        timeout_occurred = progress_stopped = False
+        while process.returncode is None:
+            if stopped():
+                portfolio.kill_process(process)
+                await process.wait()
+                progress_stopped = True
+                break
+            if anytime:
+                for plan in await asyncio.to_thread(new_plans):
+                    yield PlanGenerationResult(
+                        ResultStatus.INTERMEDIATE, plan, engine_name=planner.name
+                    )
+            wait_time = None
+            if anytime or monitor is not None:
+                wait_time = poll_interval
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    portfolio.kill_process(process)
+                    await process.wait()
+                    timeout_occurred = True
+                    break
+                wait_time = (
+                    remaining if wait_time is None else min(wait_time, remaining)
+                )
+            try:
+                await asyncio.wait_for(process.wait(), wait_time)
+            except asyncio.TimeoutError:
+                pass
+        runtime = time.monotonic() - start
+        stopped()
+
+        if anytime:
+            for plan in await asyncio.to_thread(new_plans):
+                yield PlanGenerationResult(
+                    ResultStatus.INTERMEDIATE, plan, engine_name=planner.name
+                )
+
+        def final_result() -> "up.engines.results.PlanGenerationResult":
+            plan = None
+            if anytime:
+                if plans:
+                    _, best_plan_filename = min(
+                        (portfolio.plan_cost(f), f) for f in plans
+                    )
+                    plan = plan_from_file(best_plan_filename)
+            elif portfolio.plan_cost(plan_filename) is not None:
+                plan = plan_from_file(plan_filename)
+
+            if timeout_occurred or progress_stopped:
+                status = ResultStatus.TIMEOUT
+            else:
+                status = planner._result_status(problem, plan, process.returncode)
+            metrics = {"engine_internal_time": str(runtime)}
+            if progress_stopped:
+                metrics["progress_stopped"] = "True"
+            metrics.update(statistics.parse_statistics(plan_filename + ".out"))
+            log_messages = []
+            if planner._fd_log_messages:
+                with open(plan_filename + ".out") as stdout:
+                    out = stdout.read()
+                with open(plan_filename + ".err") as stderr:
+                    err = stderr.read()
+                log_messages = [
+                    LogMessage(LogLevel.INFO, out),
+                    LogMessage(LogLevel.ERROR, err),
+                ]
+            return PlanGenerationResult(
+                status,
+                plan,
+                engine_name=planner.name,
+                log_messages=log_messages,
+                metrics=metrics,
+            )
+
+        yield await asyncio.to_thread(final_result)
+    finally:
+        if process is not None and process.returncode is None:
+            # cancelled or closed by the caller
+            portfolio.kill_process(process)
+            await process.wait()
+        utils.remove_temp_directory(directory)
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+import unified_planning as up
+from typing import Iterable, Iterator, List, Optional, Tuple
+from warnings import warn
+from unified_planning.engines import PlanGenerationResultStatus as ResultStatus
+from unified_planning.engines.results import LogLevel, LogMessage, PlanGenerationResult
+from up_fast_downward.translated_task import DriverTask
+
+# marks the end of the results in the queue of a batch
+_DONE = object()
+
+
+def _unsupported_result(
+    planner: "up_fast_downward.fast_downward.FastDownwardMixin", message: str
+) -> "up.engines.results.PlanGenerationResult":
+    return PlanGenerationResult(
+        ResultStatus.UNSUPPORTED_PROBLEM,
+        None,
+        engine_name=planner.name,
+        log_messages=[LogMessage(LogLevel.ERROR, message)],
+    )
+
+
+def solve_batch(
+    planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+    problems: Iterable["up.model.AbstractProblem"],
+    timeout: Optional[float] = None,
+    workers: Optional[int] = None,
+    max_buffered_results: Optional[int] = None,
+    poll_interval: float = 0.05,
+) -> Iterator[Tuple[int, "up.engines.results.PlanGenerationResult"]]:
+    """
+    Solves the given problems with at most `workers` runs of Fast Downward
+    at the same time and yields the index of each problem together with its
+    result as soon as the run has finished. See `solve_batch` of the
+    Fast Downward engines.
+    """
+    unsupported = planner._separate_run_options()
+    if unsupported:
+        raise up.exceptions.UPUsageError(
+            "solve_batch runs the driver once per problem and does not support "
+            + ", ".join(unsupported)
+        )
+    if planner._default_config() is None:
+        raise up.exceptions.UPUsageError(
+            "solve_batch needs an engine with an alias or a search configuration"
+        )
+    if workers is None:
+        workers = os.cpu_count() or 1
+    assert workers >= 1
+    assert max_buffered_results is None or max_buffered_results >= 1
+    results: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+
+    def schedule():
+        running: List[Tuple[int, DriverTask]] = []
+        todo = enumerate(problems)
+        exhausted = False
+        try:
+            while not stop.is_set():
+                # Only start a job if there is space for its result, so
+                # the results that were not consumed yet do not pile up.
+                while (
+                    not exhausted
+                    and len(running) < workers
+                    and (
+                        max_buffered_results is None
+                        or results.qsize() + len(running) < max_buffered_results
+                    )
+                ):
+                    item = next(todo, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index, problem = item
+                    if not planner.skip_checks and not planner.supports(problem.kind):
+                        msg = f"We cannot establish whether {planner.name} can solve this problem!"
+                        if planner.error_on_failed_checks:
+                            # do not abort the batch for a single problem
+                            results.put((index, _unsupported_result(planner, msg)))
+                            continue
+                        warn(msg)
+                    task = DriverTask(planner, problem)
+                    running.append((index, task))
+                    task.start(timeout)
+                if exhausted and not running:
+                    break
+                now = time.monotonic()
+                for index, task in list(running):
+                    finished = task.run.poll()
+                    if (
+                        not finished
+                        and task.deadline is not None
+                        and now >= task.deadline
+                    ):
+                        task.run.kill()
+                        finished = True
+                    if finished:
+                        running.remove((index, task))
+                        results.put((index, task.result()))
+                        task.close()
+                time.sleep(poll_interval)
+        except BaseException as e:
+            results.put(e)
+        finally:
+            for _, task in running:
+                task.run.kill()
+                task.close()
+            results.put(_DONE)
+
+    scheduler = threading.Thread(target=schedule, daemon=True)
+    scheduler.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        scheduler.join()
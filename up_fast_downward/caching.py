@@ -0,0 +1,365 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import unified_planning as up
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Increase whenever the format of cached entries changes, so that entries
+# written by older versions are not used anymore.
+CACHE_FORMAT_VERSION = 2
+
+
+def problem_hash(problem: "up.model.Problem", *salt: str) -> str:
+    """
+    Computes a hash of the structure of the given problem that is stable
+    across processes. Problems that only differ in their name obtain the
+    same hash. The salt strings are included in the hash and can be used
+    to distinguish entries of different engines or configurations.
+    """
+    return _structure_hash(problem, salt, with_instance=True)
+
+
+def domain_hash(problem: "up.model.Problem", *salt: str) -> str:
+    """
+    Like `problem_hash`, but only considers the domain of the problem (its
+    types, fluents, actions and quality metrics), so all instances of a
+    domain obtain the same hash.
+    """
+    return _structure_hash(problem, salt, with_instance=False)
+
+
+def _structure_hash(problem: "up.model.Problem", salt, with_instance: bool) -> str:
+    sha = hashlib.sha256()
+
+    def add(text: str):
+        sha.update(text.encode("utf-8"))
+        sha.update(b"\0")
+
+    add(f"version {CACHE_FORMAT_VERSION}")
+    add("problem" if with_instance else "domain")
+    for s in salt:
+        add(f"salt {s}")
+    for user_type in problem.user_types:
+        father = user_type.father.name if user_type.father is not None else ""
+        add(f"type {user_type.name} {father}")
+    if with_instance:
+        for obj in problem.all_objects:
+            add(f"object {obj.name} {obj.type.name}")
+    defaults = problem.fluents_defaults
+    for fluent in problem.fluents:
+        if with_instance:
+            add(f"fluent {fluent} {defaults.get(fluent)}")
+        else:
+            add(f"fluent {fluent}")
+    for action in problem.actions:
+        add(f"action {action}")
+    if with_instance:
+        # Reading `problem.initial_values` adds the default values to the
+        # explicit initial values of the problem, so only the values that
+        # differ from the default of their fluent are part of the hash.
+        init = sorted(
+            f"{f} {v}"
+            for f, v in problem.explicit_initial_values.items()
+            if v != defaults.get(f.fluent())
+        )
+        for value in init:
+            add(f"init {value}")
+        for goal in problem.goals:
+            add(f"goal {goal}")
+    for qm in problem.quality_metrics:
+        add(f"metric {qm}")
+    return sha.hexdigest()
+
+
+def translation_key(
+    domain_pddl: str, problem_pddl: str, translate_options: List[str], *salt: str
+) -> str:
+    """
+    Computes the key of the translator output for the given PDDL domain and
+    problem and options of the translator.
+    """
+    sha = hashlib.sha256()
+    for text in (
+        f"version {CACHE_FORMAT_VERSION}",
+        *(f"salt {s}" for s in salt),
+        *(f"option {o}" for o in translate_options),
+        domain_pddl,
+        problem_pddl,
+    ):
+        sha.update(text.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+class CacheStatistics:
+    """Counters of a cache."""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __repr__(self):
+        counters = ", ".join(f"{k}={v}" for k, v in self.as_dict().items())
+        return f"CacheStatistics({counters})"
+
+
+class DiskStore:
+    """
+    Stores files under a key in a directory. Files are written atomically
+    (write to a temporary file and rename), so several processes can share
+    the directory. If max_bytes is given, the least recently used files are
+    removed when the files in the directory need more space.
+    """
+
+    def __init__(self, directory: str, suffix: str, max_bytes: Optional[int] = None):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Returns the path of the file stored under the key (or None) and
+        marks it as recently used.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def store_bytes(self, key: str, data: bytes) -> int:
+        """Stores the data under the key and returns the number of evictions."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+        return self._evict()
+
+    def store_file(self, key: str, filename: str) -> int:
+        """
+        Stores a copy of the given file under the key and returns the number
+        of evictions.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file, open(filename, "rb") as src:
+                shutil.copyfileobj(src, tmp_file)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+        return self._evict()
+
+    def _evict(self) -> int:
+        if self.max_bytes is None:
+            return 0
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix) and not entry.name.startswith(
+                    ".tmp-"
+                ):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        evictions = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if _remove_if_exists(path):
+                evictions += 1
+            total -= size
+        return evictions
+
+
+def _remove_if_exists(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class GroundingCache:
+    """
+    Cache for the grounders, keyed by a structural hash of the input
+    problem (see `problem_hash`).
+
+    The cache keeps up to `max_entries` finished results of the grounders
+    (e.g. the ground problem with the mapping back to the original actions)
+    in memory and evicts the least recently used one if there are more.
+    Results share their ground problem with all later hits, so it must not
+    be modified. If a directory is given, the groundings of Fast Downward
+    (plain tuples from which the grounders rebuild their results) are also
+    stored on disk (pickled), so they survive restarts of the process. The
+    directory must only be writable by trusted users because loading a
+    pickled entry can execute code. `max_disk_bytes` bounds the space used
+    in the directory.
+
+    The grounders first look up their result (`get_result`) and on a miss
+    the grounding (`get`). The same cache can be shared by several
+    grounders and threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        directory: Optional[str] = None,
+        max_disk_bytes: Optional[int] = None,
+    ):
+        assert max_entries >= 0
+        self._max_entries = max_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._disk = None
+        if directory is not None:
+            self._disk = DiskStore(directory, ".grounding", max_disk_bytes)
+        self._lock = threading.Lock()
+        self.statistics = CacheStatistics()
+
+    def get_result(self, key: str) -> Optional[Any]:
+        """
+        Returns the result stored in memory under the key or None. Only
+        hits are counted, a miss is counted by the following `get`.
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.statistics.memory_hits += 1
+        return result
+
+    def put_result(self, key: str, result: Any):
+        """Stores the result in memory under the key."""
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+                self.statistics.memory_evictions += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the grounding stored on disk under the key or None."""
+        entry = None
+        if self._disk is not None:
+            path = self._disk.lookup(key)
+            if path is not None:
+                try:
+                    with open(path, "rb") as cached_file:
+                        entry = pickle.load(cached_file)
+                except (OSError, EOFError, pickle.UnpicklingError):
+                    # evicted in the meantime or written by an incompatible
+                    # version
+                    entry = None
+        with self._lock:
+            if entry is None:
+                self.statistics.misses += 1
+            else:
+                self.statistics.disk_hits += 1
+        return entry
+
+    def put(self, key: str, entry: Any):
+        """Stores the grounding on disk under the key (if there is a directory)."""
+        if self._disk is not None:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+            evictions = self._disk.store_bytes(key, data)
+            with self._lock:
+                self.statistics.disk_evictions += evictions
+
+    def clear(self):
+        """Removes all entries from the memory tier."""
+        with self._lock:
+            self._memory.clear()
+
+
+class TranslationCache:
+    """
+    On-disk cache for the output of the Fast Downward translator (SAS+
+    files) of the PDDL planners, keyed by the PDDL input and the options of
+    the translator (see `translation_key`).
+
+    Files are written atomically, so several processes can share the
+    directory. If `max_bytes` is given, the least recently used files are
+    removed when the cache needs more space.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None):
+        self._disk = DiskStore(directory, ".sas", max_bytes)
+        self._lock = threading.Lock()
+        self.statistics = CacheStatistics()
+
+    def lookup(self, key: str, filename: str) -> bool:
+        """
+        Copies the file stored under the key to the given filename and tells
+        whether there was such a file.
+        """
+        path = self._disk.lookup(key)
+        found = False
+        if path is not None:
+            try:
+                _link_or_copy(path, filename)
+                found = True
+            except FileNotFoundError:
+                # evicted in the meantime
+                pass
+        with self._lock:
+            if found:
+                self.statistics.disk_hits += 1
+            else:
+                self.statistics.misses += 1
+        return found
+
+    def store(self, key: str, filename: str):
+        """Stores a copy of the given file under the key."""
+        evictions = self._disk.store_file(key, filename)
+        with self._lock:
+            self.statistics.disk_evictions += evictions
+
+
+def _link_or_copy(src: str, dst: str):
+    # A hard link shares the data with the cached file and keeps it
+    # available if the cached file is evicted.
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if isinstance(e, FileNotFoundError):
+            raise
+        shutil.copyfile(src, dst)
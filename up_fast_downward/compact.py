@@ -0,0 +1,296 @@
+import unified_planning as up
+from array import array
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+)
+from unified_planning.model import FNode, InstantaneousAction
+from unified_planning.plans import ActionInstance
+
+if TYPE_CHECKING:
+    from up_fast_downward.fast_downward_grounder import Fact, Grounding
+
+# Type codes of the arrays: fact and object ids are 32-bit integers,
+# offsets into the arrays are 64-bit integers.
+ID_TYPECODE = "i"
+OFFSET_TYPECODE = "q"
+
+
+class ConditionalEffect(NamedTuple):
+    """
+    A conditional effect of a ground action: if all facts of the condition
+    hold, the fact is added (`add` is True) or deleted.
+    """
+
+    condition: Sequence[int]
+    fact: int
+    add: bool
+
+
+class _CSRBuilder:
+    """Builds the offsets and values of a compressed sparse row array."""
+
+    def __init__(self):
+        self.offsets = array(OFFSET_TYPECODE, [0])
+        self.values = array(ID_TYPECODE)
+
+    def add_row(self, values):
+        self.values.extend(values)
+        self.offsets.append(len(self.values))
+
+
+class CompactGrounding:
+    """
+    A ground task of the FastDownwardGrounder in a flat STRIPS-like form.
+
+    Facts are the ground literals of the task (see `Fact` of the grounder),
+    identified by their index in `facts`. The actions are identified by
+    their index in `action_names`. For an array `values` with offsets
+    `offsets`, the row of action i are the values
+    `values[offsets[i]:offsets[i + 1]]` (compressed sparse row format):
+
+    - `preconditions`: the facts of the precondition of each action
+    - `add_effects` and `del_effects`: the unconditional effects
+    - `conditional_effects`: the indices of the conditional effects of
+      each action into `effect_conditions` (one row per conditional
+      effect), `effect_facts` and `effect_adds` (1 for add effects and 0
+      for delete effects)
+
+    All arrays are `array.array` objects, which can be used without copying
+    as NumPy arrays with `numpy.frombuffer`. `costs` holds the cost of each
+    action if the problem minimizes action costs and is None otherwise.
+    `goals` holds the goal facts and is None if the goal is unreachable.
+
+    UP actions are only built on demand by `action` (or by indexing
+    `actions`), and `map_back_action_instance` maps instances of these
+    actions back to the actions of the original problem like the result of
+    `compile`.
+    """
+
+    def __init__(
+        self,
+        problem: "up.model.Problem",
+        grounding: "Grounding",
+        action_names: Sequence[str],
+        lifted_actions: Sequence[
+            Optional[Tuple["up.model.Action", Tuple[str, ...]]]
+        ],
+        objects: Mapping[str, FNode],
+        fnode: Callable[["Fact"], FNode],
+        with_costs: bool,
+    ):
+        self.problem = problem
+        self._fnode = fnode
+        self.action_names = action_names
+        fact_ids: Dict["Fact", int] = {}
+
+        def ids(facts):
+            result = []
+            for fact in facts:
+                fact_id = fact_ids.get(fact)
+                if fact_id is None:
+                    fact_id = fact_ids[fact] = len(fact_ids)
+                result.append(fact_id)
+            return result
+
+        preconditions = _CSRBuilder()
+        add_effects = _CSRBuilder()
+        del_effects = _CSRBuilder()
+        conditional_effects = _CSRBuilder()
+        effect_conditions = _CSRBuilder()
+        self.effect_facts = array(ID_TYPECODE)
+        self.effect_adds = array("b")
+        self.costs = array(OFFSET_TYPECODE) if with_costs else None
+        for action in grounding.actions:
+            preconditions.add_row(ids(action.precondition))
+            unconditional = ([], [])
+            effect_ids = []
+            for add, effects in ((1, action.add_effects), (0, action.del_effects)):
+                for condition, fact in effects:
+                    if condition:
+                        effect_ids.append(len(self.effect_facts))
+                        effect_conditions.add_row(ids(condition))
+                        self.effect_facts.extend(ids([fact]))
+                        self.effect_adds.append(add)
+                    else:
+                        unconditional[add].append(fact)
+            add_effects.add_row(ids(unconditional[1]))
+            del_effects.add_row(ids(unconditional[0]))
+            conditional_effects.add_row(effect_ids)
+            if self.costs is not None:
+                self.costs.append(action.cost)
+        self.goals = None
+        if grounding.goals is not None:
+            self.goals = array(ID_TYPECODE, ids(grounding.goals))
+        self.facts: Tuple["Fact", ...] = tuple(fact_ids)
+
+        self.precondition_offsets = preconditions.offsets
+        self.preconditions = preconditions.values
+        self.add_effect_offsets = add_effects.offsets
+        self.add_effects = add_effects.values
+        self.del_effect_offsets = del_effects.offsets
+        self.del_effects = del_effects.values
+        self.conditional_effect_offsets = conditional_effects.offsets
+        self.conditional_effects = conditional_effects.values
+        self.effect_condition_offsets = effect_conditions.offsets
+        self.effect_conditions = effect_conditions.values
+
+        # The schematic action of each ground action (-1 for the artificial
+        # goal action) and the ids of its parameters in `_objects`.
+        self._lifted_actions: List["up.model.Action"] = []
+        lifted_action_ids: Dict["up.model.Action", int] = {}
+        self._lifted_action_ids = array(ID_TYPECODE)
+        object_ids: Dict[str, int] = {}
+        parameters = _CSRBuilder()
+        for lifted in lifted_actions:
+            if lifted is None:
+                self._lifted_action_ids.append(-1)
+                parameters.add_row([])
+                continue
+            schematic_action, args = lifted
+            lifted_id = lifted_action_ids.get(schematic_action)
+            if lifted_id is None:
+                lifted_id = lifted_action_ids[schematic_action] = len(
+                    self._lifted_actions
+                )
+                self._lifted_actions.append(schematic_action)
+            self._lifted_action_ids.append(lifted_id)
+            row = []
+            for arg in args:
+                object_id = object_ids.get(arg)
+                if object_id is None:
+                    object_id = object_ids[arg] = len(object_ids)
+                row.append(object_id)
+            parameters.add_row(row)
+        self._parameter_offsets = parameters.offsets
+        self._parameters = parameters.values
+        self._objects = tuple(objects[name] for name in object_ids)
+
+        self._fnodes: Dict[int, FNode] = {}
+        self._actions: Dict[int, InstantaneousAction] = {}
+        self._action_ids: Dict[InstantaneousAction, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.action_names)
+
+    @staticmethod
+    def _row(offsets: array, values: array, i: int) -> array:
+        return values[offsets[i] : offsets[i + 1]]
+
+    def action_preconditions(self, i: int) -> array:
+        return self._row(self.precondition_offsets, self.preconditions, i)
+
+    def action_add_effects(self, i: int) -> array:
+        return self._row(self.add_effect_offsets, self.add_effects, i)
+
+    def action_del_effects(self, i: int) -> array:
+        return self._row(self.del_effect_offsets, self.del_effects, i)
+
+    def action_conditional_effects(self, i: int) -> List[ConditionalEffect]:
+        return [
+            ConditionalEffect(
+                self._row(self.effect_condition_offsets, self.effect_conditions, e),
+                self.effect_facts[e],
+                bool(self.effect_adds[e]),
+            )
+            for e in self._row(
+                self.conditional_effect_offsets, self.conditional_effects, i
+            )
+        ]
+
+    def fnode(self, fact_id: int) -> FNode:
+        """Returns the FNode of the fact with the given id."""
+        result = self._fnodes.get(fact_id)
+        if result is None:
+            result = self._fnode(self.facts[fact_id])
+            self._fnodes[fact_id] = result
+        return result
+
+    def action(self, i: int) -> InstantaneousAction:
+        """Returns the UP action with the given index (built only once)."""
+        action = self._actions.get(i)
+        if action is not None:
+            return action
+        fnode = self.fnode
+        exp_manager = self.problem.environment.expression_manager
+        action = InstantaneousAction(
+            self.action_names[i], _env=self.problem.environment
+        )
+        for fact in self.action_preconditions(i):
+            action.add_precondition(fnode(fact))
+        for fact in self.action_add_effects(i):
+            action.add_effect(fnode(fact), True)
+        for fact in self.action_del_effects(i):
+            action.add_effect(fnode(fact), False)
+        for condition, fact, add in self.action_conditional_effects(i):
+            action.add_effect(
+                fnode(fact), add, exp_manager.And(fnode(f) for f in condition)
+            )
+        self._actions[i] = action
+        self._action_ids[action] = i
+        return action
+
+    @property
+    def actions(self) -> "LazyActions":
+        """A sequence of the UP actions that builds each action on demand."""
+        return LazyActions(self)
+
+    def map_back(
+        self, i: int
+    ) -> Optional[Tuple["up.model.Action", Tuple[FNode, ...]]]:
+        """
+        Returns the schematic action and the parameters of the action with
+        the given index, or None for the artificial goal action.
+        """
+        lifted_id = self._lifted_action_ids[i]
+        if lifted_id < 0:
+            return None
+        parameters = self._row(self._parameter_offsets, self._parameters, i)
+        objects = self._objects
+        return (
+            self._lifted_actions[lifted_id],
+            tuple(objects[p] for p in parameters),
+        )
+
+    def map_back_action_instance(
+        self, action_instance: ActionInstance
+    ) -> Optional[ActionInstance]:
+        """
+        Maps an instance of an action built by `action` back to the problem
+        that was grounded.
+        """
+        lifted = self.map_back(self._action_ids[action_instance.action])
+        if lifted is None:
+            return None
+        return ActionInstance(*lifted)
+
+
+class LazyActions(Sequence[InstantaneousAction]):
+    """The actions of a CompactGrounding, built when they are accessed."""
+
+    def __init__(self, grounding: CompactGrounding):
+        self._grounding = grounding
+
+    def __len__(self) -> int:
+        return len(self._grounding)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._grounding.action(j) for j in range(len(self))[i]]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("action index out of range")
+        return self._grounding.action(i)
+
+    def __iter__(self) -> Iterator[InstantaneousAction]:
+        for i in range(len(self)):
+            yield self._grounding.action(i)
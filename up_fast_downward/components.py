@@ -0,0 +1,129 @@
+import os
+import re
+import sys
+from typing import Callable, List, Optional
+from up_fast_downward.downward.driver import aliases, limits, returncodes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Running the translator and the search component of Fast Downward directly
+# (without the driver script fast-downward.py) saves the start of one Python
+# interpreter and the argument handling of the driver per call.
+
+BIN_PATH = os.path.join(os.path.dirname(__file__), "downward/builds/release/bin")
+TRANSLATE_PATH = os.path.join(BIN_PATH, "translate", "translate.py")
+SEARCH_PATH = os.path.join(
+    BIN_PATH, "downward.exe" if sys.platform == "win32" else "downward"
+)
+
+
+def supports_config(config: str) -> bool:
+    """
+    Tells whether the search component can run the given alias or search
+    configuration without the driver. Portfolio aliases (e.g.,
+    "seq-opt-fdss-1") need the driver.
+    """
+    return "(" in config or config in aliases.ALIASES
+
+
+def translate_cmd(
+    domain_filename: str,
+    problem_filename: str,
+    sas_filename: str,
+    translate_options: Optional[List[str]] = None,
+) -> List[str]:
+    assert sys.executable, "Path to interpreter could not be found"
+    cmd = [sys.executable, TRANSLATE_PATH, domain_filename, problem_filename]
+    return cmd + ["--sas-file", sas_filename] + (translate_options or [])
+
+
+def translate_returncode(returncode: int) -> int:
+    """Returns the exit code that the driver reports for the translator."""
+    if returncode == 1:
+        # The translator crashed without raising an exception.
+        return returncodes.TRANSLATE_CRITICAL_ERROR
+    return returncode
+
+
+def search_cmd(config: str, plan_filename: str) -> List[str]:
+    """
+    Returns the command of the search component for the given alias or
+    search configuration. The search component reads the translated task
+    from its standard input.
+    """
+    assert supports_config(config)
+    if config in aliases.ALIASES:
+        # as in aliases.set_options_for_alias of the driver
+        options = [
+            x.replace(" ", "").replace("\n", "") for x in aliases.ALIASES[config]
+        ]
+    else:
+        options = ["--search"] + config.split()
+    return [SEARCH_PATH] + options + ["--internal-plan-file", plan_filename]
+
+
+def time_limit_in_seconds(limit: str) -> int:
+    """Parses a time limit of the driver (e.g., "30", "30s", "5m" or "1h")."""
+    match = re.match(r"^(\d+)(s|m|h)?$", limit, flags=re.I)
+    if not match:
+        raise ValueError(f"malformed time limit: {limit}")
+    factor = {"s": 1, "m": 60, "h": 3600}[(match.group(2) or "s").lower()]
+    return int(match.group(1)) * factor
+
+
+def memory_limit_in_bytes(limit: str) -> int:
+    """Parses a memory limit of the driver (e.g., "512M" or "3G")."""
+    match = re.match(r"^(\d+)(k|m|g)?$", limit, flags=re.I)
+    if not match:
+        raise ValueError(f"malformed memory limit: {limit}")
+    factor = {"k": 1024, "m": 1024**2, "g": 1024**3}[(match.group(2) or "m").lower()]
+    return int(match.group(1)) * factor
+
+
+def can_set_limits(time_limit: Optional[int], memory_limit: Optional[int]) -> bool:
+    """
+    Tells whether `limits_setter` can impose the given limits, i.e., the
+    platform has prlimit (Linux) or cannot enforce the limits at all (like
+    the driver). Otherwise, only the driver can enforce them.
+    """
+    if resource is not None and hasattr(resource, "prlimit"):
+        return True
+    return not (
+        (time_limit is not None and limits.can_set_time_limit())
+        or (memory_limit is not None and limits.can_set_memory_limit())
+    )
+
+
+def limits_setter(
+    time_limit: Optional[int], memory_limit: Optional[int]
+) -> Optional[Callable[[int], None]]:
+    """
+    Returns a function that imposes the given limits (in seconds of CPU
+    time and bytes of address space) on the process with the given pid,
+    like the driver does for the components. The function is called right
+    after the process has started, because a preexec_fn is not safe if
+    other threads are running. Limits that the platform cannot enforce are
+    ignored.
+    """
+    if not limits.can_set_time_limit():
+        time_limit = None
+    if not limits.can_set_memory_limit():
+        memory_limit = None
+    if time_limit is None and memory_limit is None:
+        return None
+    assert can_set_limits(time_limit, memory_limit)
+
+    def set_limits(pid: int):
+        if time_limit is not None:
+            # as in limits.set_time_limit of the driver
+            try:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (time_limit, time_limit + 1))
+            except ValueError:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (time_limit, time_limit))
+        if memory_limit is not None:
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    return set_limits
@@ -1,7 +1,19 @@
 import importlib.resources
+import json
+import os
 import sys
 import unified_planning as up
-from typing import Callable, Iterator, IO, List, Optional, Tuple, Union
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    IO,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from unified_planning.model import ProblemKind, InstantaneousAction
 from unified_planning.engines import OptimalityGuarantee
 from unified_planning.engines import PlanGenerationResultStatus as ResultStatus
@@ -9,7 +21,19 @@ from unified_planning.engines import PDDLAnytimePlanner, PDDLPlanner
 from unified_planning.engines import OperationMode, Credits
 from unified_planning.shortcuts import BoolType, MinimizeActionCosts
 from unified_planning.engines.results import LogLevel, LogMessage, PlanGenerationResult
-from up_fast_downward import utils
+from up_fast_downward import (
+    asynchronous,
+    batch,
+    components,
+    portfolio,
+    selection,
+    utils,
+)
+from up_fast_downward.downward.driver import limits
+from up_fast_downward.caching import TranslationCache
+from up_fast_downward.progress import ProgressCallback, ProgressMonitor
+from up_fast_downward.replanning import ReplanningSession
+from up_fast_downward.translated_task import DriverTask, TranslatedTask
 
 credits = {
     "name": "Fast Downward",
@@ -32,6 +56,20 @@ class FastDownwardMixin:
         fast_downward_translate_options: Optional[List[str]] = None,
         fast_downward_search_time_limit: Optional[str] = None,
         log_level: str = "info",
+        fast_downward_translation_cache: Optional[TranslationCache] = None,
+        fast_downward_bypass_driver: bool = False,
+        fast_downward_in_memory: bool = False,
+        fast_downward_overall_time_limit: Optional[str] = None,
+        fast_downward_translate_memory_limit: Optional[str] = None,
+        fast_downward_search_memory_limit: Optional[str] = None,
+        fast_downward_log_messages: bool = True,
+        fast_downward_progress_callback: Optional[ProgressCallback] = None,
+        fast_downward_portfolio: Optional[List[str]] = None,
+        fast_downward_portfolio_workers: Optional[int] = None,
+        fast_downward_auto_config: bool = False,
+        fast_downward_selection_log: Optional[str] = None,
+        fast_downward_phase_metrics: bool = False,
+        fast_downward_anytime_log_level: str = "warning",
     ):
         self._fd_alias = fast_downward_alias
         self._fd_search_config = fast_downward_search_config
@@ -40,12 +78,63 @@ class FastDownwardMixin:
         self._fd_translate_options = fast_downward_translate_options
         self._fd_search_time_limit = fast_downward_search_time_limit
         self._log_level = log_level
+        # Anytime runs need no log messages of the driver because the plans
+        # are read from the plan files.
+        self._fd_anytime_log_level = fast_downward_anytime_log_level
+        self._fd_translation_cache = fast_downward_translation_cache
+        self._fd_bypass_driver = fast_downward_bypass_driver
+        self._fd_in_memory = fast_downward_in_memory
+        self._fd_overall_time_limit = fast_downward_overall_time_limit
+        self._fd_translate_memory_limit = fast_downward_translate_memory_limit
+        self._fd_search_memory_limit = fast_downward_search_memory_limit
+        # If False, the results do not contain the output of Fast Downward
+        # (the statistics in the metrics are still parsed from it).
+        self._fd_log_messages = fast_downward_log_messages
+        self._fd_progress_callback = fast_downward_progress_callback
+        self._fd_portfolio = fast_downward_portfolio
+        if fast_downward_portfolio_workers is None and fast_downward_portfolio:
+            fast_downward_portfolio_workers = min(
+                len(fast_downward_portfolio), os.cpu_count() or 1
+            )
+        self._fd_portfolio_workers = fast_downward_portfolio_workers
+        # select the configuration of oneshot planning from the features of
+        # the translated task (and append the choices to the selection log)
+        self._fd_auto_config = fast_downward_auto_config
+        self._fd_selection_log = fast_downward_selection_log
+        # report the resources used by the translator and the search
+        # separately (which needs a separate run for each of them)
+        self._fd_phase_metrics = fast_downward_phase_metrics
+        # Limits in the format of the driver (e.g., "30m" or "4G"); we also
+        # need them in seconds and bytes to enforce them without the driver.
+        self._search_time_limit_seconds = self._parse_limit(
+            fast_downward_search_time_limit, components.time_limit_in_seconds
+        )
+        self._overall_time_limit_seconds = self._parse_limit(
+            fast_downward_overall_time_limit, components.time_limit_in_seconds
+        )
+        self._translate_memory_limit_bytes = self._parse_limit(
+            fast_downward_translate_memory_limit, components.memory_limit_in_bytes
+        )
+        self._search_memory_limit_bytes = self._parse_limit(
+            fast_downward_search_memory_limit, components.memory_limit_in_bytes
+        )
         assert not (self._fd_alias and self._fd_search_config)
         assert not (self._fd_anytime_alias and self._fd_anytime_search_config)
         self._guarantee_no_plan_found = ResultStatus.UNSOLVABLE_INCOMPLETELY
         self._guarantee_metrics_task = ResultStatus.SOLVED_SATISFICING
 
-    def _base_cmd(self, plan_filename: str):
+    @staticmethod
+    def _parse_limit(
+        limit: Optional[str], parse: Callable[[str], int]
+    ) -> Optional[int]:
+        if limit is None:
+            return None
+        try:
+            return parse(limit)
+        except ValueError as e:
+            raise up.exceptions.UPUsageError(str(e))
+
+    def _downward_cmd(self) -> List[str]:
         loc = "downward/fast-downward.py"
         downward_res = importlib.resources.files("up_fast_downward").joinpath(loc)
         with importlib.resources.as_file(downward_res) as downward:
@@ -55,40 +144,371 @@ class FastDownwardMixin:
             # enough. Otherwise, we need to explore an atexit handler:
             # cf https://importlib-resources.readthedocs.io/en/latest/migration.html
             assert sys.executable, "Path to interpreter could not be found"
-            cmd = [sys.executable, downward, "--plan-file", plan_filename]
+            return [sys.executable, downward]
+
+    def _base_cmd(
+        self,
+        plan_filename: str,
+        translate_time: Optional[float] = None,
+        anytime: bool = False,
+    ):
+        # If the translator already ran (and took translate_time seconds of
+        # CPU time), the command only runs the search.
+        cmd = self._downward_cmd() + ["--plan-file", plan_filename]
+        if translate_time is None:
             if self._fd_search_time_limit is not None:
                 cmd += ["--search-time-limit", self._fd_search_time_limit]
-            cmd += ["--log-level", self._log_level]
-            return cmd
+            if self._fd_overall_time_limit is not None:
+                cmd += ["--overall-time-limit", self._fd_overall_time_limit]
+            if self._fd_translate_memory_limit is not None:
+                cmd += ["--translate-memory-limit", self._fd_translate_memory_limit]
+        else:
+            time_limit = self._search_time_limit(translate_time)
+            if time_limit is not None:
+                cmd += ["--search-time-limit", str(time_limit)]
+        if self._fd_search_memory_limit is not None:
+            cmd += ["--search-memory-limit", self._fd_search_memory_limit]
+        log_level = self._fd_anytime_log_level if anytime else self._log_level
+        cmd += ["--log-level", log_level]
+        return cmd
 
-    def _get_cmd(
-        self, domain_filename: str, problem_filename: str, plan_filename: str
+    def _search_time_limit(self, translate_time: float) -> Optional[int]:
+        # the CPU time limit of the search in seconds (like the driver, we
+        # count the CPU time of the translator for the overall time limit)
+        time_limit = self._search_time_limit_seconds
+        if self._overall_time_limit_seconds is not None:
+            remaining = max(0, self._overall_time_limit_seconds - translate_time)
+            if time_limit is None or remaining < time_limit:
+                time_limit = limits.round_time_limit(remaining)
+        return time_limit
+
+    def _translate_cmd(
+        self,
+        domain_filename: str,
+        problem_filename: str,
+        sas_filename: str,
+        translate_options: Optional[List[str]] = None,
+    ) -> List[str]:
+        if translate_options is None:
+            translate_options = self._fd_translate_options
+        if self._translates_without_driver():
+            return components.translate_cmd(
+                domain_filename, problem_filename, sas_filename, translate_options
+            )
+        cmd = self._downward_cmd()
+        cmd += ["--sas-file", sas_filename, "--log-level", self._log_level]
+        if self._fd_overall_time_limit is not None:
+            cmd += ["--overall-time-limit", self._fd_overall_time_limit]
+        if self._fd_translate_memory_limit is not None:
+            cmd += ["--translate-memory-limit", self._fd_translate_memory_limit]
+        cmd += ["--translate", domain_filename, problem_filename]
+        if translate_options:
+            cmd += ["--translate-options"] + translate_options
+        return cmd
+
+    def _search_cmd(
+        self,
+        config: str,
+        sas_filename: str,
+        plan_filename: str,
+        translate_time: float = 0,
+        anytime: bool = False,
+    ) -> List[str]:
+        cmd = self._base_cmd(plan_filename, translate_time, anytime)
+        if portfolio.is_search_config(config):
+            cmd += [sas_filename, "--search-options", "--search"] + config.split()
+        else:
+            cmd += ["--alias", config, sas_filename]
+        return cmd
+
+    def _translates_without_driver(self) -> bool:
+        # Without the driver, the limits are set with prlimit. Where the
+        # platform does not have it, the driver enforces the limits.
+        return self._fd_bypass_driver and components.can_set_limits(
+            self._overall_time_limit_seconds, self._translate_memory_limit_bytes
+        )
+
+    def _translate_returncode(self, returncode: int) -> int:
+        """Returns the exit code of the driver for the translator run."""
+        if self._translates_without_driver():
+            return components.translate_returncode(returncode)
+        return returncode
+
+    def _translate_run(
+        self,
+        domain_filename: str,
+        problem_filename: str,
+        sas_filename: str,
+        translate_options: Optional[List[str]],
+        output_filename: str,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> portfolio.ConfigRun:
+        """
+        Returns a run of the translator. Its output is written to the files
+        output_filename + ".out" and output_filename + ".err" (and copied to
+        the output stream while the run is polled).
+        """
+        cmd = self._translate_cmd(
+            domain_filename, problem_filename, sas_filename, translate_options
+        )
+        set_limits = None
+        if self._translates_without_driver():
+            set_limits = components.limits_setter(
+                self._overall_time_limit_seconds, self._translate_memory_limit_bytes
+            )
+        return portfolio.ConfigRun(
+            "translate",
+            cmd,
+            output_filename,
+            set_limits=set_limits,
+            output_stream=output_stream,
+        )
+
+    def _search_run(
+        self,
+        config: str,
+        sas_filename: str,
+        plan_filename: str,
+        translate_time: float = 0,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+        anytime: bool = False,
+    ) -> portfolio.ConfigRun:
+        """
+        Returns a run of the search component on the translated task. The
+        CPU time of the translator (translate_time) counts for the overall
+        time limit. Anytime runs use the log level for anytime planning.
+        """
+        time_limit = self._search_time_limit(translate_time)
+        memory_limit = self._search_memory_limit_bytes
+        if (
+            self._fd_bypass_driver
+            and components.supports_config(config)
+            and components.can_set_limits(time_limit, memory_limit)
+        ):
+            return portfolio.ConfigRun(
+                config,
+                components.search_cmd(config, plan_filename),
+                plan_filename,
+                stdin_filename=sas_filename,
+                set_limits=components.limits_setter(time_limit, memory_limit),
+                monitor=self._progress_monitor(config),
+                output_stream=output_stream,
+            )
+        cmd = self._search_cmd(
+            config, sas_filename, plan_filename, translate_time, anytime
+        )
+        return portfolio.ConfigRun(
+            config,
+            cmd,
+            plan_filename,
+            monitor=self._progress_monitor(config),
+            output_stream=output_stream,
+        )
+
+    def _progress_monitor(self, config: str) -> Optional[ProgressMonitor]:
+        """Returns a monitor for the progress of a run (if it is requested)."""
+        if self._fd_progress_callback is None:
+            return None
+        return ProgressMonitor(
+            config, self._fd_progress_callback, self._starting_plan_str()
+        )
+
+    def _starting_plan_str(self) -> str:
+        # the line before a plan in the output of Fast Downward
+        return "Solution found!"
+
+    def _temp_directory(self) -> str:
+        """Creates a temporary directory for the files of a run."""
+        return utils.make_temp_directory(self._fd_in_memory)
+
+    def _default_config(self) -> Optional[str]:
+        """
+        Returns the alias or search configuration of oneshot planning (None
+        if the engine runs a portfolio).
+        """
+        return self._fd_alias or self._fd_search_config
+
+    def _prepare_problem(self, problem: "up.model.Problem") -> "up.model.Problem":
+        """Returns the problem that the engine passes to Fast Downward."""
+        return problem
+
+    def translate(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> TranslatedTask:
+        """
+        Runs the Fast Downward translator on the given problem and returns
+        the translated task, on which any number of search configurations
+        can run without translating the problem again.
+        """
+        assert isinstance(problem, up.model.Problem)
+        return TranslatedTask(
+            self, self._prepare_problem(problem), timeout, output_stream
+        )
+
+    def replanning_session(
+        self,
+        problem: "up.model.AbstractProblem",
+        config: Optional[str] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> ReplanningSession:
+        """
+        Translates the given problem and returns a session that solves the
+        problem from different initial states, only running the search
+        component of Fast Downward for most states.
+        """
+        assert isinstance(problem, up.model.Problem)
+        return ReplanningSession(self, problem, config, timeout, output_stream)
+
+    def solve_batch(
+        self,
+        problems: Iterable["up.model.AbstractProblem"],
+        timeout: Optional[float] = None,
+        workers: Optional[int] = None,
+        max_buffered_results: Optional[int] = None,
+    ) -> Iterator[Tuple[int, "up.engines.results.PlanGenerationResult"]]:
+        """
+        Solves many independent problems with the oneshot configuration of
+        the engine. At most `workers` (by default one per CPU) runs of Fast
+        Downward solve problems at the same time, each with the given
+        timeout. The results are yielded as pairs of the index of the
+        problem in `problems` and its result as soon as they are known, so
+        their order can differ from the order of the problems.
+
+        The problems are only taken from the iterable when a worker is
+        free. If `max_buffered_results` is given, no further runs are
+        started while this many results (of finished and running jobs)
+        have not been consumed, so the memory stays bounded if the results
+        are consumed more slowly than they are computed.
+        """
+        return batch.solve_batch(self, problems, timeout, workers, max_buffered_results)
+
+    async def solve_async(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        """
+        Solves the problem like `solve`, but runs Fast Downward as an
+        asyncio subprocess, so many problems can be solved concurrently on
+        one event loop. Cancelling the awaiting task kills Fast Downward
+        and all processes it has started.
+        """
+        result = None
+        async for result in asynchronous.run(self, problem, timeout):
+            pass
+        return result
+
+    def _separate_run_options(self, anytime: bool = False) -> List[str]:
+        """
+        Returns the options of the engine that need separate runs of the
+        translator and the search (or several searches). Batch and
+        asynchronous solving run the driver once per problem, so they do
+        not support these options. The portfolio and the selection of the
+        configuration only concern oneshot planning.
+        """
+        options = []
+        if self._fd_portfolio and not anytime:
+            options.append("fast_downward_portfolio")
+        if self._fd_auto_config and not anytime:
+            options.append("fast_downward_auto_config")
+        if self._fd_translation_cache is not None:
+            options.append("fast_downward_translation_cache")
+        if self._fd_bypass_driver:
+            options.append("fast_downward_bypass_driver")
+        if self._fd_phase_metrics:
+            options.append("fast_downward_phase_metrics")
+        return options
+
+    def _solves_translated(self) -> bool:
+        # Whether oneshot planning runs the translator and the search
+        # separately instead of one call of the driver.
+        return bool(self._separate_run_options()) or self._fd_in_memory
+
+    def _solve_with_driver(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        # One call of the driver runs the translator and the search.
+        with DriverTask(self, problem, output_stream) as task:
+            return task.solve(timeout)
+
+    def _solve_translated(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        # Runs the translator and the search separately, which allows to
+        # share the translated task between the runs of a portfolio, to
+        # take the translator output from the cache, to run the components
+        # without the driver and to report the resources used by each of
+        # them.
+        with self.translate(problem, timeout, output_stream) as task:
+            if timeout is not None:
+                timeout = max(0, timeout - task.translate_time)
+            if not (self._fd_auto_config and task.translated):
+                return task.solve(None, timeout, output_stream)
+            features = selection.task_features(task.sas_filename)
+            config, reason = selection.select_optimal_config(features)
+            result = task.solve(config, timeout, output_stream)
+            result.metrics["selected_config"] = config
+            result.metrics["selection_reason"] = reason
+            result.metrics["selection_features"] = json.dumps(features._asdict())
+            if self._fd_selection_log is not None:
+                selection.log_selection(
+                    self._fd_selection_log, features, config, reason, result
+                )
+            return result
+
+    def _config_cmd(
+        self,
+        alias: Optional[str],
+        search_config: Optional[str],
+        domain_filename: str,
+        problem_filename: str,
+        plan_filename: str,
+        anytime: bool = False,
     ) -> List[str]:
-        cmd = self._base_cmd(plan_filename)
-        if self._fd_alias:
-            cmd += ["--alias", self._fd_alias]
+        cmd = self._base_cmd(plan_filename, anytime=anytime)
+        if alias:
+            cmd += ["--alias", alias]
         cmd += [domain_filename, problem_filename]
         if self._fd_translate_options:
             cmd += ["--translate-options"] + self._fd_translate_options
-        if self._fd_search_config:
-            cmd += ["--search-options", "--search"] + self._fd_search_config.split()
+        if search_config:
+            cmd += ["--search-options", "--search"] + search_config.split()
         return cmd
 
+    def _get_cmd(
+        self, domain_filename: str, problem_filename: str, plan_filename: str
+    ) -> List[str]:
+        return self._config_cmd(
+            self._fd_alias,
+            self._fd_search_config,
+            domain_filename,
+            problem_filename,
+            plan_filename,
+        )
+
     def _get_anytime_cmd(
         self, domain_filename: str, problem_filename: str, plan_filename: str
     ) -> List[str]:
-        cmd = self._base_cmd(plan_filename)
-        if self._fd_anytime_alias:
-            cmd += ["--alias", self._fd_anytime_alias]
-        cmd += [domain_filename, problem_filename]
-        if self._fd_translate_options:
-            cmd += ["--translate-options"] + self._fd_translate_options
-        if self._fd_anytime_search_config:
-            cmd += [
-                "--search-options",
-                "--search",
-            ] + self._fd_anytime_search_config.split()
-        return cmd
+        # Used by get_all_solutions_async, which runs the driver as an
+        # asyncio subprocess.
+        return self._config_cmd(
+            self._fd_anytime_alias,
+            self._fd_anytime_search_config,
+            domain_filename,
+            problem_filename,
+            plan_filename,
+            anytime=True,
+        )
 
     def _result_status(
         self,
@@ -139,9 +559,29 @@ class FastDownwardPDDLPlanner(FastDownwardMixin, PDDLAnytimePlanner):
         fast_downward_translate_options: Optional[List[str]] = None,
         fast_downward_search_time_limit: Optional[str] = None,
         log_level: str = "info",
+        fast_downward_portfolio: Optional[List[str]] = None,
+        fast_downward_portfolio_workers: Optional[int] = None,
+        fast_downward_translation_cache: Optional[TranslationCache] = None,
+        fast_downward_bypass_driver: bool = False,
+        fast_downward_in_memory: bool = False,
+        fast_downward_overall_time_limit: Optional[str] = None,
+        fast_downward_translate_memory_limit: Optional[str] = None,
+        fast_downward_search_memory_limit: Optional[str] = None,
+        fast_downward_log_messages: bool = True,
+        fast_downward_progress_callback: Optional[ProgressCallback] = None,
+        fast_downward_phase_metrics: bool = False,
+        fast_downward_anytime_log_level: str = "warning",
     ):
         PDDLAnytimePlanner.__init__(self)
-        if fast_downward_search_config is None and fast_downward_alias is None:
+        assert not (
+            fast_downward_portfolio
+            and (fast_downward_alias or fast_downward_search_config)
+        )
+        if (
+            fast_downward_search_config is None
+            and fast_downward_alias is None
+            and not fast_downward_portfolio
+        ):
             fast_downward_alias = "lama-first"
         if (
             fast_downward_anytime_search_config is None
@@ -158,6 +598,18 @@ class FastDownwardPDDLPlanner(FastDownwardMixin, PDDLAnytimePlanner):
             fast_downward_translate_options=fast_downward_translate_options,
             fast_downward_search_time_limit=fast_downward_search_time_limit,
             log_level=log_level,
+            fast_downward_translation_cache=fast_downward_translation_cache,
+            fast_downward_bypass_driver=fast_downward_bypass_driver,
+            fast_downward_in_memory=fast_downward_in_memory,
+            fast_downward_overall_time_limit=fast_downward_overall_time_limit,
+            fast_downward_translate_memory_limit=fast_downward_translate_memory_limit,
+            fast_downward_search_memory_limit=fast_downward_search_memory_limit,
+            fast_downward_log_messages=fast_downward_log_messages,
+            fast_downward_progress_callback=fast_downward_progress_callback,
+            fast_downward_portfolio=fast_downward_portfolio,
+            fast_downward_portfolio_workers=fast_downward_portfolio_workers,
+            fast_downward_phase_metrics=fast_downward_phase_metrics,
+            fast_downward_anytime_log_level=fast_downward_anytime_log_level,
         )
 
     @property
@@ -175,16 +627,52 @@ class FastDownwardPDDLPlanner(FastDownwardMixin, PDDLAnytimePlanner):
         c.long_description = " ".join(details)
         return c
 
-    def _starting_plan_str(self) -> str:
-        return "Solution found!"
+    def _solve(
+        self,
+        problem: "up.model.AbstractProblem",
+        heuristic: Optional[Callable[["up.model.state.State"], Optional[float]]] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+        anytime: bool = False,
+    ) -> "up.engines.results.PlanGenerationResult":
+        if anytime:
+            # get_solutions does not come here, but the final result of the
+            # anytime search is what an anytime solve amounts to.
+            result = None
+            for result in self._get_solutions(problem, timeout, output_stream):
+                pass
+            assert result is not None
+            return result
+        if self._solves_translated():
+            return self._solve_translated(problem, timeout, output_stream)
+        return self._solve_with_driver(problem, timeout, output_stream)
 
-    def _ending_plan_str(self) -> str:
-        return "step(s)."
+    def _get_solutions(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+        output_stream: Optional[IO[str]] = None,
+    ) -> Iterator["up.engines.results.PlanGenerationResult"]:
+        # Instead of scanning the output of Fast Downward for plans, we
+        # watch the numbered plan files that anytime configurations write.
+        with self.translate(problem, timeout, output_stream) as task:
+            if timeout is not None:
+                timeout = max(0, timeout - task.translate_time)
+            yield from task.solve_anytime(None, timeout, output_stream)
 
-    def _parse_plan_line(self, plan_line: str) -> str:
-        if plan_line.startswith("[t="):
-            return ""
-        return "(%s)" % plan_line.split("(")[0].strip()
+    def get_all_solutions_async(
+        self,
+        problem: "up.model.AbstractProblem",
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator["up.engines.results.PlanGenerationResult"]:
+        """
+        Like `get_all_solutions`, but runs Fast Downward as an asyncio
+        subprocess and returns an async iterator over the results. Each
+        plan is yielded with status INTERMEDIATE as soon as Fast Downward
+        has found it. Cancelling the iterating task kills Fast Downward and
+        all processes it has started.
+        """
+        return asynchronous.run(self, problem, timeout, anytime=True)
 
     @staticmethod
     def satisfies(optimality_guarantee: "OptimalityGuarantee") -> bool:
@@ -225,10 +713,59 @@ class FastDownwardPDDLPlanner(FastDownwardMixin, PDDLAnytimePlanner):
 
 
 class FastDownwardOptimalPDDLPlanner(FastDownwardMixin, PDDLPlanner):
-    def __init__(self, log_level: str = "info"):
+    def __init__(
+        self,
+        log_level: str = "info",
+        fast_downward_translation_cache: Optional[TranslationCache] = None,
+        fast_downward_bypass_driver: bool = False,
+        fast_downward_in_memory: bool = False,
+        fast_downward_search_time_limit: Optional[str] = None,
+        fast_downward_overall_time_limit: Optional[str] = None,
+        fast_downward_translate_memory_limit: Optional[str] = None,
+        fast_downward_search_memory_limit: Optional[str] = None,
+        fast_downward_log_messages: bool = True,
+        fast_downward_progress_callback: Optional[ProgressCallback] = None,
+        fast_downward_alias: Optional[str] = None,
+        fast_downward_search_config: Optional[str] = None,
+        fast_downward_portfolio: Optional[List[str]] = None,
+        fast_downward_portfolio_workers: Optional[int] = None,
+        fast_downward_auto_config: bool = False,
+        fast_downward_selection_log: Optional[str] = None,
+        fast_downward_phase_metrics: bool = False,
+    ):
         PDDLPlanner.__init__(self)
+        # The configurations must be admissible (or optimal portfolios) for
+        # the guarantee of this engine.
+        custom_configs = [
+            fast_downward_alias,
+            fast_downward_search_config,
+            fast_downward_portfolio,
+        ]
+        assert sum(bool(c) for c in custom_configs) <= 1
+        assert not (fast_downward_auto_config and any(custom_configs))
+        if not fast_downward_alias and not fast_downward_portfolio:
+            fast_downward_search_config = (
+                fast_downward_search_config or selection.LMCUT_CONFIG
+            )
         FastDownwardMixin.__init__(
-            self, fast_downward_search_config="astar(lmcut())", log_level=log_level
+            self,
+            fast_downward_alias=fast_downward_alias,
+            fast_downward_search_config=fast_downward_search_config,
+            fast_downward_portfolio=fast_downward_portfolio,
+            fast_downward_portfolio_workers=fast_downward_portfolio_workers,
+            fast_downward_auto_config=fast_downward_auto_config,
+            fast_downward_selection_log=fast_downward_selection_log,
+            fast_downward_search_time_limit=fast_downward_search_time_limit,
+            log_level=log_level,
+            fast_downward_translation_cache=fast_downward_translation_cache,
+            fast_downward_bypass_driver=fast_downward_bypass_driver,
+            fast_downward_in_memory=fast_downward_in_memory,
+            fast_downward_overall_time_limit=fast_downward_overall_time_limit,
+            fast_downward_translate_memory_limit=fast_downward_translate_memory_limit,
+            fast_downward_search_memory_limit=fast_downward_search_memory_limit,
+            fast_downward_log_messages=fast_downward_log_messages,
+            fast_downward_progress_callback=fast_downward_progress_callback,
+            fast_downward_phase_metrics=fast_downward_phase_metrics,
         )
         self._guarantee_no_plan_found = ResultStatus.UNSOLVABLE_PROVEN
         self._guarantee_metrics_task = ResultStatus.SOLVED_OPTIMALLY
@@ -242,7 +779,7 @@ class FastDownwardOptimalPDDLPlanner(FastDownwardMixin, PDDLPlanner):
         c = Credits(**credits)
         details = [
             c.long_description,
-            "The optimal engine uses the LM-Cut heuristic by",
+            "The optimal engine by default uses the LM-Cut heuristic by",
             "Malte Helmert and Carmel Domshlak.",
         ]
         c.long_description = " ".join(details)
@@ -283,11 +820,15 @@ class FastDownwardOptimalPDDLPlanner(FastDownwardMixin, PDDLPlanner):
         output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
     ) -> "up.engines.results.PlanGenerationResult":
         assert isinstance(problem, up.model.Problem)
+        if self._solves_translated():
+            return self._solve_translated(problem, timeout, output_stream)
+        return self._solve_with_driver(problem, timeout, output_stream)
 
+    def _prepare_problem(self, problem: "up.model.Problem") -> "up.model.Problem":
         # add a new goal atom (initially false) plus an action that has the
         # original goal as precondition and sets the new goal atom
         modified_problem, _, _ = utils.introduce_artificial_goal_action(problem)
-        return super()._solve(modified_problem, heuristic, timeout, output_stream)
+        return modified_problem
 
     # overwrite plan extraction to remove the newly introduced goal action from
     # the end of the plan
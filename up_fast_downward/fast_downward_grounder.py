@@ -1,17 +1,30 @@
 from collections import defaultdict
-from io import StringIO
+from dataclasses import replace
 from itertools import count
-import os.path
-import sys
 import unified_planning as up
 from functools import partial
 
-from typing import Callable, Mapping, Optional, Union, Set, Tuple
+from time import perf_counter
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Union,
+    Set,
+    Tuple,
+)
 from unified_planning.model import FNode, Problem, ProblemKind, MinimizeActionCosts
 from unified_planning.model.walkers import Simplifier
 from unified_planning.model.action import InstantaneousAction
-from unified_planning.model.operators import OperatorKind
-from unified_planning.engines.compilers.utils import lift_action_instance
+from unified_planning.engines.compilers.utils import (
+    check_and_simplify_preconditions,
+    get_fresh_name,
+    lift_action_instance,
+)
 from unified_planning.engines.compilers.grounder import (
     Grounder,
     ground_minimize_action_costs_metric,
@@ -20,10 +33,32 @@ from unified_planning.engines.engine import Engine
 from unified_planning.engines import Credits
 from unified_planning.engines.mixins.compiler import CompilationKind
 from unified_planning.engines.mixins.compiler import CompilerMixin
-from unified_planning.engines.results import CompilerResult
-from unified_planning.exceptions import UPUnsupportedProblemTypeError
+from unified_planning.engines.results import CompilerResult, LogLevel, LogMessage
+from unified_planning.exceptions import (
+    UPConflictingEffectsException,
+    UPUnsupportedProblemTypeError,
+)
 from up_fast_downward import utils
-
+from up_fast_downward.caching import GroundingCache, domain_hash, problem_hash
+from up_fast_downward.compact import CompactGrounding
+from up_fast_downward.simplification import (
+    SimplificationStats,
+    clone_without_fluents,
+    ground_predicates,
+    merge_duplicate_actions,
+    simplify_grounding,
+    used_fluents,
+)
+from up_fast_downward.profiling import (
+    NULL_PROFILER,
+    GroundingProfiler,
+    ProfileCallback,
+)
+from up_fast_downward.translator import (
+    TranslatorDomain,
+    TranslatorNames,
+    TranslatorSession,
+)
 
 credits = Credits(
     "Fast Downward",
@@ -36,6 +71,57 @@ credits = Credits(
     "Fast Downward is a domain-independent classical planning system.",
 )
 
+
+class Fact(NamedTuple):
+    """A ground literal in the vocabulary of the Fast Downward translator."""
+
+    predicate: str
+    args: Tuple[str, ...]
+    negated: bool
+
+
+class GroundAction(NamedTuple):
+    """
+    A ground action in the vocabulary of the Fast Downward translator. The
+    name has the form "(schematic-action arg1 ... argn)". The cost is 1 if
+    the problem does not minimize action costs.
+    """
+
+    name: str
+    precondition: Tuple[Fact, ...]
+    add_effects: Tuple[Tuple[Tuple[Fact, ...], Fact], ...]
+    del_effects: Tuple[Tuple[Tuple[Fact, ...], Fact], ...]
+    cost: int
+
+
+class Grounding(NamedTuple):
+    """
+    The ground actions and goals computed by Fast Downward. The goals are
+    None if the goal is unreachable because of static facts.
+    """
+
+    actions: Tuple[GroundAction, ...]
+    goals: Optional[Tuple[Fact, ...]]
+
+
+class StreamedAction(NamedTuple):
+    """
+    A ground action yielded by `FastDownwardGrounder.ground_actions`: the
+    action (an InstantaneousAction or, in compact form, a GroundAction)
+    and the schematic action of the original problem with its actual
+    parameters. The schematic action is None for the artificial goal action.
+    """
+
+    action: Union[InstantaneousAction, GroundAction]
+    schematic_action: Optional["up.model.Action"]
+    parameters: Tuple[FNode, ...]
+
+
+# Reachable parameters of the schematic actions, given as pairs of the
+# action name and the object names in the vocabulary of the translator.
+ReachableActions = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
 axioms_msg = """ Grounding this problem introduces axioms.
 
 Does the problem use existantial quantification and negation that corresponds
@@ -43,10 +129,366 @@ to universal quantification (in negation normal form)?
 """
 
 
-class FastDownwardReachabilityGrounder(Engine, CompilerMixin):
+def _find_domain(
+    domains: Dict[str, TranslatorDomain], problem: "up.model.Problem"
+) -> Tuple[Optional[TranslatorDomain], Optional[TranslatorNames]]:
+    """
+    Returns the prepared domain for the given problem together with the
+    translator names of the problem, or (None, None) if no prepared domain
+    matches.
+    """
+    domain = domains.get(domain_hash(problem))
+    if domain is None:
+        return None, None
+    names = domain.instance_names(problem)
+    if names is None:
+        return None, None
+    return domain, names
+
+
+def _domain_log_message(domain: TranslatorDomain, instance_time: float) -> LogMessage:
+    message = (
+        f"Grounded with the prepared domain in {instance_time:.3f}s "
+        f"(full pipeline for the representative problem: "
+        f"{domain.full_pipeline_time:.3f}s, "
+        f"domain preparation: {domain.preparation_time:.3f}s)"
+    )
+    return LogMessage(LogLevel.INFO, message)
+
+
+def _result_key(problem: "up.model.Problem", *salt: str) -> str:
+    """
+    Returns the key of the result of a grounder for the given problem in the
+    memory tier of the cache. The result also depends on the name of the
+    problem and refers to the expressions of its environment.
+    """
+    return problem_hash(
+        problem, *salt, f"name {problem.name}", f"environment {id(problem.environment)}"
+    )
+
+
+def _cached_result(
+    cache: GroundingCache, key: str, profiler: GroundingProfiler
+) -> Optional[CompilerResult]:
+    with profiler.phase("cache_lookup"):
+        result = cache.get_result(key)
+    # a copy, so that adding metrics does not change the cached result
+    return None if result is None else replace(result)
+
+
+def _new_profiler(
+    profile: bool, profile_memory: bool, profile_callback: Optional[ProfileCallback]
+):
+    """
+    Returns a profiler for the phases of one grounding, or the profiler that
+    does not measure anything if profiling is disabled.
+    """
+    if not (profile or profile_memory or profile_callback is not None):
+        return NULL_PROFILER
+    return GroundingProfiler(profile_callback, profile_memory)
+
+
+def _explore(
+    translator: TranslatorSession,
+    problem: "up.model.Problem",
+    profiler: GroundingProfiler,
+) -> Tuple[TranslatorNames, "pddl.Task", List["pddl.Atom"]]:
+    """
+    Translates the given problem and computes the model of the logic program
+    for the reachability analysis, like `instantiate.explore` of the
+    translator before the instantiation.
+    """
+    with profiler.phase("build_task"):
+        translator_task = translator.build_task(problem)
+    task = translator_task.task
+    with profiler.phase("normalize"):
+        translator.normalize.normalize(task)
+    with profiler.phase("pddl_to_prolog") as phase:
+        prog = translator.pddl_to_prolog.translate(task)
+        phase.items = len(prog.rules)
+    with profiler.phase("compute_model") as phase:
+        model = translator.build_model.compute_model(prog)
+        phase.items = len(model)
+    return translator_task.names, task, model
+
+
+def _instantiate_incrementally(
+    translator: TranslatorSession, task: "pddl.Task", model: List["pddl.Atom"]
+) -> Tuple[Optional[List["pddl.Literal"]], Iterator["pddl.PropositionalAction"]]:
+    """
+    Instantiates the task like `instantiate.instantiate` of the translator,
+    but does not collect the ground actions: it returns the instantiated
+    goal (None if it is impossible because of static facts) and an iterator
+    that instantiates the actions one at a time. The iterator drops each
+    atom of the model once it is processed, so the caller should not use
+    the model afterwards.
+
+    Raises an error if the task has reachable axioms.
+    """
+    pddl = translator.pddl
+    instantiate = translator.instantiate
+    fluent_facts = instantiate.get_fluent_facts(task, model)
+    init_facts = set()
+    init_assignments = {}
+    for element in task.init:
+        if isinstance(element, pddl.Assign):
+            init_assignments[element.fluent] = element.expression
+        else:
+            init_facts.add(element)
+    type_to_objects = instantiate.get_objects_by_type(task.objects, task.types)
+
+    for atom in model:
+        if isinstance(atom.predicate, pddl.Axiom):
+            axiom = atom.predicate
+            variable_mapping = {
+                par.name: arg for par, arg in zip(axiom.parameters, atom.args)
+            }
+            if axiom.instantiate(variable_mapping, init_facts, fluent_facts):
+                raise UPUnsupportedProblemTypeError(axioms_msg)
+    goals = instantiate.instantiate_goal(task.goal, init_facts, fluent_facts)
+    use_min_cost_metric = task.use_min_cost_metric
+
+    def actions() -> Iterator["pddl.PropositionalAction"]:
+        for i, atom in enumerate(model):
+            model[i] = None
+            if not isinstance(atom.predicate, pddl.Action):
+                continue
+            action = atom.predicate
+            variable_mapping = {
+                par.name: arg for par, arg in zip(action.parameters, atom.args)
+            }
+            inst_action = action.instantiate(
+                variable_mapping,
+                init_facts,
+                init_assignments,
+                fluent_facts,
+                type_to_objects,
+                use_min_cost_metric,
+            )
+            if inst_action:
+                yield inst_action
+
+    return goals, actions()
+
+
+class _GroundActionBuilder:
+    """
+    Converts the ground actions of the translator to GroundActions. Many
+    ground actions share the same facts, so it reuses the Fact for equal
+    literals.
+    """
+
     def __init__(self):
+        self._facts: Dict["pddl.Literal", Fact] = {}
+
+    def fact(self, literal: "pddl.Literal") -> Fact:
+        result = self._facts.get(literal)
+        if result is None:
+            result = Fact(literal.predicate, tuple(literal.args), literal.negated)
+            self._facts[literal] = result
+        return result
+
+    def _effects(self, effects) -> Tuple[Tuple[Tuple[Fact, ...], Fact], ...]:
+        fact = self.fact
+        return tuple((tuple(fact(c) for c in cond), fact(f)) for cond, f in effects)
+
+    def ground_action(self, action: "pddl.PropositionalAction") -> GroundAction:
+        return GroundAction(
+            action.name,
+            tuple(self.fact(f) for f in action.precondition),
+            self._effects(action.add_effects),
+            self._effects(action.del_effects),
+            action.cost,
+        )
+
+
+class _FactTranslator:
+    """
+    Translates the facts of a grounding back into FNodes. The fluents and
+    the object expressions are looked up by their translator names in
+    indexes that are built once, and each fact is only translated once
+    because many ground actions share the same facts.
+    """
+
+    def __init__(self, problem: "up.model.Problem", names: TranslatorNames):
+        self._exp_manager = problem.environment.expression_manager
+        self._fluents = {name: fluent for fluent, name in names.fluent_names.items()}
+        self.objects = {
+            name: self._exp_manager.ObjectExp(obj)
+            for obj, name in names.object_names.items()
+        }
+        self._fnodes: Dict[Fact, FNode] = {}
+
+    def fnode(self, fact: Fact) -> FNode:
+        result = self._fnodes.get(fact)
+        if result is None:
+            objects = self.objects
+            result = self._exp_manager.FluentExp(
+                self._fluents[fact.predicate], [objects[o] for o in fact.args]
+            )
+            if fact.negated:
+                result = self._exp_manager.Not(result)
+            self._fnodes[fact] = result
+        return result
+
+
+class _ActionInstantiator:
+    """
+    Instantiates the actions of a problem with given parameters like the
+    Grounder of the UP, but substitutes the parameters in a precondition or
+    in a part of an effect only once for each assignment to the parameters
+    that occur in it. Many ground actions share these assignments (e.g., all
+    ground actions with the same values for the parameters ?t and ?l share
+    the precondition at(?t, ?l)).
+    """
+
+    def __init__(self, problem: "up.model.Problem"):
+        self._problem = problem
+        self.simplifier = Simplifier(problem.environment, problem)
+        self._false = problem.environment.expression_manager.FALSE()
+        self._parameters: Dict[FNode, Tuple["up.model.Parameter", ...]] = {}
+        self._substitutions: Dict[Tuple[FNode, Tuple[FNode, ...]], FNode] = {}
+        self._conditions: Dict[FNode, FNode] = {}
+
+    def _parameters_in(self, node: FNode) -> Tuple["up.model.Parameter", ...]:
+        result = self._parameters.get(node)
+        if result is None:
+            parameters = {}
+            stack = [node]
+            while stack:
+                n = stack.pop()
+                if n.is_parameter_exp():
+                    parameters[n.parameter()] = None
+                stack.extend(n.args)
+            result = tuple(parameters)
+            self._parameters[node] = result
+        return result
+
+    def _substitute(
+        self, node: FNode, binding: Dict["up.model.Parameter", FNode]
+    ) -> FNode:
+        parameters = self._parameters_in(node)
+        key = (node, tuple(binding[p] for p in parameters))
+        result = self._substitutions.get(key)
+        if result is None:
+            result = node.substitute({p: binding[p] for p in parameters})
+            self._substitutions[key] = result
+        return result
+
+    def _condition(self, node: FNode, binding: Dict["up.model.Parameter", FNode]):
+        condition = self._substitute(node, binding)
+        result = self._conditions.get(condition)
+        if result is None:
+            result = self.simplifier.simplify(condition)
+            self._conditions[condition] = result
+        return result
+
+    def instantiate(
+        self,
+        action: InstantaneousAction,
+        parameters: Tuple[FNode, ...],
+        name: str,
+    ) -> Optional[InstantaneousAction]:
+        """
+        Returns the action with the given parameters and name, or None if
+        the ground action has contradicting preconditions or conflicting
+        effects (as `create_action_with_given_subs` of the UP).
+        """
+        binding = dict(zip(action.parameters, parameters))
+        new_action = InstantaneousAction(name, _env=action.environment)
+        for precondition in action.preconditions:
+            new_action.add_precondition(self._substitute(precondition, binding))
+        try:
+            for effect in action.effects:
+                condition = self._condition(effect.condition, binding)
+                if condition == self._false:
+                    continue
+                fluent = self._substitute(effect.fluent, binding)
+                value = self._substitute(effect.value, binding)
+                if effect.is_increase():
+                    add_effect = new_action.add_increase_effect
+                elif effect.is_decrease():
+                    add_effect = new_action.add_decrease_effect
+                else:
+                    add_effect = new_action.add_effect
+                add_effect(fluent, value, condition, effect.forall)
+        except UPConflictingEffectsException:
+            return None
+        is_feasible, _ = check_and_simplify_preconditions(
+            self._problem, new_action, self.simplifier
+        )
+        if not is_feasible:
+            return None
+        return new_action
+
+
+def _instantiate_actions(
+    problem: "up.model.Problem",
+    grounding_actions_map: Mapping[InstantaneousAction, List[Tuple[FNode, ...]]],
+) -> Tuple["up.model.Problem", Callable]:
+    """
+    Builds the ground problem with the ground actions given by the map from
+    the actions of the problem to their parameters, like the Grounder of
+    the UP with a `grounding_actions_map`. Returns the ground problem and
+    the function that maps the ground actions back.
+    """
+    instantiator = _ActionInstantiator(problem)
+    new_problem = problem.clone()
+    new_problem.clear_actions()
+    trace_back_map = {}
+    used_action_names = set()
+    for action in problem.actions:
+        for parameters in grounding_actions_map.get(action, []):
+            if not parameters:
+                # as in the Grounder of the UP
+                new_action = action.clone()
+                name = action.name
+            else:
+                name = get_fresh_name(
+                    problem, action.name, [str(p) for p in parameters]
+                )
+                if name in used_action_names:
+                    base_name = name
+                    for num in count():
+                        name = f"{base_name}_{num}"
+                        if name not in used_action_names:
+                            break
+                new_action = instantiator.instantiate(action, parameters, name)
+            if new_action is not None:
+                used_action_names.add(name)
+                new_problem.add_action(new_action)
+                trace_back_map[new_action] = (action, list(parameters))
+
+    new_problem.clear_quality_metrics()
+    for qm in problem.quality_metrics:
+        if isinstance(qm, MinimizeActionCosts):
+            new_problem.add_quality_metric(
+                ground_minimize_action_costs_metric(
+                    qm, trace_back_map, instantiator.simplifier
+                )
+            )
+        else:
+            new_problem.add_quality_metric(qm)
+    return new_problem, partial(lift_action_instance, map=trace_back_map)
+
+
+class FastDownwardReachabilityGrounder(Engine, CompilerMixin):
+    def __init__(
+        self,
+        cache: Optional[GroundingCache] = None,
+        profile: bool = False,
+        profile_memory: bool = False,
+        profile_callback: Optional[ProfileCallback] = None,
+        direct_instantiation: bool = False,
+    ):
         Engine.__init__(self)
         CompilerMixin.__init__(self, CompilationKind.GROUNDING)
+        self._cache = cache
+        self._domains: Dict[str, TranslatorDomain] = {}
+        self._profile = profile
+        self._profile_memory = profile_memory
+        self._profile_callback = profile_callback
+        self._direct_instantiation = direct_instantiation
 
     @property
     def name(self) -> str:
@@ -91,6 +533,22 @@ class FastDownwardReachabilityGrounder(Engine, CompilerMixin):
     ) -> ProblemKind:
         return problem_kind.clone()
 
+    def prepare_domain(self, problem: "up.model.Problem") -> TranslatorDomain:
+        """
+        Prepares the domain of the given problem once, so that grounding
+        further problems with the same domain (types, fluents, actions and
+        quality metrics) and the same constants only translates their
+        objects, initial state and goal. Other problems are still grounded
+        from scratch.
+        """
+        assert isinstance(problem, Problem)
+        domain = TranslatorDomain(problem)
+        start_time = perf_counter()
+        self._compute_reachable_actions(problem)
+        domain.full_pipeline_time = perf_counter() - start_time
+        self._domains[domain.key] = domain
+        return domain
+
     def _compile(
         self, problem: "up.model.AbstractProblem", compilation_kind: "CompilationKind"
     ) -> CompilerResult:
@@ -105,67 +563,143 @@ class FastDownwardReachabilityGrounder(Engine, CompilerMixin):
         :return: The resulting `CompilerResult` data structure.
         """
         assert isinstance(problem, Problem)
-
-        writer = up.io.PDDLWriter(problem)
-        pddl_problem = writer.get_problem().split("\n")
-        pddl_domain = writer.get_domain().split("\n")
-
-        # perform Fast Downward translation until (and including)
-        # the reachability analysis
-        orig_path = list(sys.path)
-        orig_stdout = sys.stdout
-        sys.stdout = StringIO()
-        path = os.path.join(
-            os.path.dirname(__file__), "downward/builds/release/bin/translate"
+        profiler = _new_profiler(
+            self._profile, self._profile_memory, self._profile_callback
         )
-        sys.path.insert(1, path)
-        import pddl_parser as fast_downward_pddl_parser
-        import normalize as fast_downward_normalize
-        from pddl_to_prolog import translate as prolog_program
-        from build_model import compute_model
-        import pddl
-
-        lisp_parser = fast_downward_pddl_parser.lisp_parser
-        fd_domain = lisp_parser.parse_nested_list(pddl_domain)
-        fd_problem = lisp_parser.parse_nested_list(pddl_problem)
-        parse = fast_downward_pddl_parser.parsing_functions.parse_task
-        task = parse(fd_domain, fd_problem)
-        fast_downward_normalize.normalize(task)
-        prog = prolog_program(task)
-        model = compute_model(prog)
-        sys.stdout = orig_stdout
-        sys.path = orig_path
+        with profiler:
+            result = self._compile_with_profiler(problem, compilation_kind, profiler)
+        profile_metrics = profiler.metrics()
+        if profile_metrics:
+            result.metrics = {**(result.metrics or {}), **profile_metrics}
+        return result
+
+    def _compile_with_profiler(
+        self,
+        problem: "up.model.Problem",
+        compilation_kind: "CompilationKind",
+        profiler: GroundingProfiler,
+    ) -> CompilerResult:
+        reachable_actions = None
+        log_messages = None
+        if self._cache is not None:
+            result_key = _result_key(
+                problem,
+                self.name,
+                f"direct_instantiation {self._direct_instantiation}",
+            )
+            result = _cached_result(self._cache, result_key, profiler)
+            if result is not None:
+                return result
+            with profiler.phase("cache_lookup"):
+                cache_key = problem_hash(problem, self.name)
+                reachable_actions = self._cache.get(cache_key)
+        if reachable_actions is None:
+            domain, names = _find_domain(self._domains, problem)
+            start_time = perf_counter()
+            names, reachable_actions = self._compute_reachable_actions(
+                problem, domain, names, profiler
+            )
+            if domain is not None:
+                instance_time = perf_counter() - start_time
+                log_messages = [_domain_log_message(domain, instance_time)]
+            if self._cache is not None:
+                self._cache.put(cache_key, reachable_actions)
+        else:
+            names = TranslatorNames(problem)
 
         # The model contains an overapproximation of the reachable components
         # of the task, in particular also of the reachable ground actions.
         # We retreive the parameters from these actions and hand them over to
         # the Grounder from the UP, which performs the instantiation on the
         # side of the UP.
-        grounding_action_map = defaultdict(list)
-        exp_manager = problem.environment.expression_manager
-        for atom in model:
-            if isinstance(atom.predicate, pddl.Action):
-                action = atom.predicate
-                schematic_up_action = writer.get_item_named(action.name)
-                params = (
-                    writer.get_item_named(p)
-                    for p in atom.args[: action.num_external_parameters]
-                )
+        with profiler.phase("action_parameters"):
+            grounding_action_map = defaultdict(list)
+            exp_manager = problem.environment.expression_manager
+            for action_name, args in reachable_actions:
+                schematic_up_action = names.get_item_named(action_name)
+                params = (names.get_item_named(p) for p in args)
                 up_params = tuple(exp_manager.ObjectExp(p) for p in params)
                 grounding_action_map[schematic_up_action].append(up_params)
 
-        up_grounder = Grounder(grounding_actions_map=grounding_action_map)
-        up_res = up_grounder.compile(problem, compilation_kind)
-        new_problem = up_res.problem
+        if self._direct_instantiation:
+            with profiler.phase("instantiate_actions") as phase:
+                new_problem, map_back = _instantiate_actions(
+                    problem, grounding_action_map
+                )
+                phase.items = len(new_problem.actions)
+        else:
+            with profiler.phase("up_grounder") as phase:
+                up_grounder = Grounder(grounding_actions_map=grounding_action_map)
+                up_res = up_grounder.compile(problem, compilation_kind)
+                phase.items = len(up_res.problem.actions)
+            new_problem = up_res.problem
+            map_back = up_res.map_back_action_instance
         new_problem.name = f"{self.name}_{problem.name}"
 
-        return CompilerResult(new_problem, up_res.map_back_action_instance, self.name)
+        result = CompilerResult(
+            new_problem,
+            map_back,
+            self.name,
+            log_messages=log_messages,
+        )
+        if self._cache is not None:
+            self._cache.put_result(result_key, result)
+            result = replace(result)
+        return result
+
+    def _compute_reachable_actions(
+        self,
+        problem: "up.model.Problem",
+        domain: Optional[TranslatorDomain] = None,
+        names: Optional[TranslatorNames] = None,
+        profiler: GroundingProfiler = NULL_PROFILER,
+    ) -> Tuple[TranslatorNames, ReachableActions]:
+        # perform Fast Downward translation until (and including)
+        # the reachability analysis
+        if domain is not None:
+            translator = domain.session
+            with translator.capture_output():
+                with profiler.phase("explore") as phase:
+                    _, model = domain.explore(problem, names)
+                    phase.items = len(model)
+        else:
+            translator = TranslatorSession()
+            with translator.capture_output():
+                names, _, model = _explore(translator, problem, profiler)
+
+        with profiler.phase("reachable_actions") as phase:
+            # The atoms of actions also contain the values of the variables
+            # of existential preconditions, so the same parameters can occur
+            # several times.
+            reachable_actions = {}
+            for atom in model:
+                if isinstance(atom.predicate, translator.pddl.Action):
+                    action = atom.predicate
+                    args = tuple(atom.args[: action.num_external_parameters])
+                    reachable_actions[(action.name, args)] = None
+            phase.items = len(reachable_actions)
+        return names, tuple(reachable_actions)
 
 
 class FastDownwardGrounder(Engine, CompilerMixin):
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[GroundingCache] = None,
+        profile: bool = False,
+        profile_memory: bool = False,
+        profile_callback: Optional[ProfileCallback] = None,
+        simplify: bool = False,
+        merge_duplicates: bool = False,
+    ):
         Engine.__init__(self)
         CompilerMixin.__init__(self, CompilationKind.GROUNDING)
+        self._cache = cache
+        self._domains: Dict[str, TranslatorDomain] = {}
+        self._profile = profile
+        self._profile_memory = profile_memory
+        self._profile_callback = profile_callback
+        self._simplify = simplify
+        self._merge_duplicates = merge_duplicates
 
     @property
     def name(self) -> str:
@@ -224,35 +758,26 @@ class FastDownwardGrounder(Engine, CompilerMixin):
         resulting_problem_kind.unset_conditions_kind("EXISTENTIAL_CONDITIONS")
         return resulting_problem_kind
 
-    def _get_fnode(
-        self,
-        fact,
-        problem: "up.model.AbstractProblem",
-        get_item_named: Callable[
-            [str],
-            Union[
-                "up.model.Type",
-                "up.model.Action",
-                "up.model.Fluent",
-                "up.model.Object",
-                "up.model.Parameter",
-                "up.model.Variable",
-            ],
-        ],
-    ) -> FNode:
-        """Translates a Fast Downward fact back into a FNode."""
-        exp_manager = problem.environment.expression_manager
-        fluent = get_item_named(fact.predicate)
-        args = [problem.object(o) for o in fact.args]
-        fnode = exp_manager.FluentExp(fluent, args)
-        if fact.negated:
-            return exp_manager.Not(fnode)
-        else:
-            return fnode
+    def prepare_domain(self, problem: "up.model.Problem") -> TranslatorDomain:
+        """
+        Prepares the domain of the given problem once, so that grounding
+        further problems with the same domain (types, fluents, actions and
+        quality metrics) and the same constants only translates their
+        objects, initial state and goal. Other problems (including problems
+        with goals that require an artificial goal action) are still
+        grounded from scratch.
+        """
+        assert isinstance(problem, Problem)
+        domain = TranslatorDomain(problem)
+        start_time = perf_counter()
+        self._instantiate_with_fast_downward(problem)
+        domain.full_pipeline_time = perf_counter() - start_time
+        self._domains[domain.key] = domain
+        return domain
 
     def _transform_action(
         self,
-        fd_action: "translate.pddl.Action",
+        fd_action: GroundAction,
         problem: "up.model.AbstractProblem",
         get_item_named: Callable[
             [str],
@@ -266,26 +791,15 @@ class FastDownwardGrounder(Engine, CompilerMixin):
             ],
         ],
         used_action_names: Set[str],
+        facts: _FactTranslator,
     ) -> InstantaneousAction:
         """Takes a Fast Downward ground actions and builds it with the
         vobabulary of the UP."""
-
-        def fnode(fact):
-            return self._get_fnode(fact, problem, get_item_named)
-
+        fnode = facts.fnode
         exp_manager = problem.environment.expression_manager
-
-        name_and_args = fd_action.name[1:-1].split()
-        name = get_item_named(name_and_args[0]).name
-        name_and_args[0] = name
-        full_name = "_".join(name_and_args)
-        if full_name in used_action_names:
-            for num in count():
-                candidate = f"{full_name}_{num}"
-                if candidate not in used_action_names:
-                    full_name = candidate
-                    break
-        used_action_names.add(full_name)
+        full_name = utils.ground_action_name(
+            fd_action.name, get_item_named, used_action_names
+        )
         action = InstantaneousAction(full_name)
         for fact in fd_action.precondition:
             action.add_precondition(fnode(fact))
@@ -306,129 +820,400 @@ class FastDownwardGrounder(Engine, CompilerMixin):
             Mapping["up.model.InstantaneousAction", "up.model.InstantaneousAction"]
         ],
     ]:
-        """
-        Tests whether the given problem has a complicated goal (not just
-        a conjunction of positive and negative fluents). If yes, it returns
-        a transformed problem with an artificial goal action and a single goal
-        fluent, where the existing actions are modified to delete the goal fluent.
-        The second return value is the new goal action. The third return value
-        maps the actions of the modified problem to the actions of the original
-        problem. If the goal was not complicated, it returns the original
-        problem, None, and None.
-        """
-        COMPLICATED_KINDS = (
-            OperatorKind.EXISTS,
-            OperatorKind.FORALL,
-            OperatorKind.IFF,
-            OperatorKind.IMPLIES,
-            OperatorKind.OR,
-        )
+        """See `utils.add_goal_action_if_complicated_goal`."""
+        return utils.add_goal_action_if_complicated_goal(problem)
 
-        def is_complicated_goal(fnode):
-            if fnode.node_type in COMPLICATED_KINDS or (
-                fnode.node_type == OperatorKind.NOT
-                and fnode.args[0].node_type != OperatorKind.FLUENT_EXP
-            ):
-                return True
-            return any(is_complicated_goal(arg) for arg in fnode.args)
-
-        if not any(is_complicated_goal(g) for g in problem.goals):
-            # no complicated goal
-            return problem, None, None
+    def _explore_with_fast_downward(
+        self,
+        problem: "up.model.Problem",
+        domain: Optional[TranslatorDomain] = None,
+        names: Optional[TranslatorNames] = None,
+        profiler: GroundingProfiler = NULL_PROFILER,
+    ) -> Tuple[TranslatorSession, TranslatorNames, "pddl.Task", List["pddl.Atom"]]:
+        if domain is not None:
+            translator = domain.session
+            with translator.capture_output():
+                with profiler.phase("explore") as phase:
+                    task, model = domain.explore(problem, names)
+                    phase.items = len(model)
         else:
-            # To avoid the introduction of axioms with complicated goals, we
-            # introduce a separate goal action (later to be removed by
-            # map_back)
-            return utils.introduce_artificial_goal_action(problem, True)
-
-    def _instantiate_with_fast_downward(self, pddl_problem, pddl_domain):
-        orig_path = list(sys.path)
-        orig_stdout = sys.stdout
-        sys.stdout = StringIO()
-        path = os.path.join(
-            os.path.dirname(__file__), "downward/builds/release/bin/translate"
+            translator = TranslatorSession()
+            with translator.capture_output():
+                names, task, model = _explore(translator, problem, profiler)
+        return translator, names, task, model
+
+    def _instantiate_with_fast_downward(
+        self,
+        problem: "up.model.Problem",
+        domain: Optional[TranslatorDomain] = None,
+        names: Optional[TranslatorNames] = None,
+        profiler: GroundingProfiler = NULL_PROFILER,
+    ) -> Tuple[TranslatorNames, Grounding]:
+        translator, names, task, model = self._explore_with_fast_downward(
+            problem, domain, names, profiler
         )
-        sys.path.insert(1, path)
-        import pddl_parser as fast_downward_pddl_parser
-        import instantiate as fd_instantiate
-        import normalize as fast_downward_normalize
-
-        lisp_parser = fast_downward_pddl_parser.lisp_parser
-        fd_domain = lisp_parser.parse_nested_list(pddl_domain)
-        fd_problem = lisp_parser.parse_nested_list(pddl_problem)
-        parse = fast_downward_pddl_parser.parsing_functions.parse_task
-        task = parse(fd_domain, fd_problem)
-        fast_downward_normalize.normalize(task)
-
-        _, _, actions, goals, axioms, _ = fd_instantiate.explore(task)
-        sys.stdout = orig_stdout
-        sys.path = orig_path
-        return actions, goals, axioms
+        # Convert each ground action of the translator right away, so that
+        # the translator objects are not all alive at the same time.
+        builder = _GroundActionBuilder()
+        with translator.capture_output():
+            with profiler.phase("instantiate") as phase:
+                goals, actions = _instantiate_incrementally(translator, task, model)
+                ground_actions = tuple(map(builder.ground_action, actions))
+                phase.items = len(ground_actions)
+        ground_goals = None if goals is None else tuple(map(builder.fact, goals))
+        return names, Grounding(ground_actions, ground_goals)
 
     def _compile(
         self, problem: "up.model.AbstractProblem", compilation_kind: "CompilationKind"
     ) -> CompilerResult:
         assert isinstance(problem, Problem)
+        profiler = _new_profiler(
+            self._profile, self._profile_memory, self._profile_callback
+        )
+        with profiler:
+            result = self._compile_with_profiler(problem, profiler)
+        profile_metrics = profiler.metrics()
+        if profile_metrics:
+            result.metrics = {**(result.metrics or {}), **profile_metrics}
+        return result
+
+    def ground_compact(self, problem: "up.model.Problem") -> CompactGrounding:
+        """
+        Grounds the given problem like `compile`, but returns the ground task
+        in a compact STRIPS-like form with arrays of fact ids instead of a
+        UP problem. UP actions are only built on demand.
+        """
+        assert isinstance(problem, Problem)
+        profiler = _new_profiler(
+            self._profile, self._profile_memory, self._profile_callback
+        )
+        with profiler:
+            if self._cache is not None:
+                result_key = _result_key(
+                    problem,
+                    self.name,
+                    "compact",
+                    f"simplify {self._simplify}",
+                    f"merge_duplicates {self._merge_duplicates}",
+                )
+                with profiler.phase("cache_lookup"):
+                    compact = self._cache.get_result(result_key)
+                if compact is not None:
+                    return compact
+            (
+                problem,
+                artificial_goal_action,
+                modified_to_orig_action,
+                names,
+                grounding,
+                _,
+                _,
+                _,
+            ) = self._ground(problem, profiler)
+            with profiler.phase("compact_grounding") as phase:
+                get_item_named = names.get_item_named
+                used_action_names = set()
+                action_names = []
+                lifted_actions = []
+                for a in grounding.actions:
+                    action_names.append(
+                        utils.ground_action_name(
+                            a.name, get_item_named, used_action_names
+                        )
+                    )
+                    name_and_args = a.name[1:-1].split()
+                    schematic_up_act = get_item_named(name_and_args[0])
+                    if schematic_up_act == artificial_goal_action:
+                        lifted_actions.append(None)
+                    else:
+                        if modified_to_orig_action is not None:
+                            schematic_up_act = modified_to_orig_action[schematic_up_act]
+                        lifted_actions.append(
+                            (schematic_up_act, tuple(name_and_args[1:]))
+                        )
+                facts = _FactTranslator(problem, names)
+                with_costs = any(
+                    isinstance(qm, MinimizeActionCosts)
+                    for qm in problem.quality_metrics
+                )
+                compact = CompactGrounding(
+                    problem,
+                    grounding,
+                    action_names,
+                    lifted_actions,
+                    facts.objects,
+                    facts.fnode,
+                    with_costs,
+                )
+                phase.items = len(compact.facts)
+            if self._cache is not None:
+                self._cache.put_result(result_key, compact)
+        return compact
+
+    def ground_actions(
+        self, problem: "up.model.Problem", compact: bool = False
+    ) -> Iterator[StreamedAction]:
+        """
+        Grounds the given problem like `compile`, but yields the ground
+        actions one at a time while Fast Downward instantiates them instead
+        of building the ground problem. The ground actions of the translator
+        are released as soon as they are converted, so consuming the
+        actions one by one needs much less memory than `compile`.
+
+        The actions are UP actions with the same names as in the result of
+        `compile`, or GroundActions in the vocabulary of the translator if
+        `compact` is True. If the grounding is in the disk tier of the cache,
+        the actions come from there, but a streamed grounding is never added
+        to the cache.
+        The simplification (option `simplify`) needs the complete grounding,
+        so it does not apply to the streamed actions.
+        """
+        assert isinstance(problem, Problem)
+        profiler = _new_profiler(
+            self._profile, self._profile_memory, self._profile_callback
+        )
+        with profiler:
+            orig_problem = problem
+            with profiler.phase("goal_transformation"):
+                (
+                    problem,
+                    artificial_goal_action,
+                    modified_to_orig_action,
+                ) = self._add_goal_action_if_complicated_goal(problem)
+
+            grounding = None
+            if self._cache is not None:
+                with profiler.phase("cache_lookup"):
+                    grounding = self._cache.get(problem_hash(orig_problem, self.name))
+            if grounding is None:
+                domain, names = _find_domain(self._domains, problem)
+                translator, names, task, model = self._explore_with_fast_downward(
+                    problem, domain, names, profiler
+                )
+                with translator.capture_output():
+                    _, fd_actions = _instantiate_incrementally(translator, task, model)
+                del task, model
+                ground_actions = map(_GroundActionBuilder().ground_action, fd_actions)
+            else:
+                names = TranslatorNames(problem)
+                ground_actions = iter(grounding.actions)
+                del grounding
+
+            get_item_named = names.get_item_named
+            used_action_names = set()
+            facts = _FactTranslator(problem, names)
+            objects = facts.objects
+            for a in ground_actions:
+                name_and_args = a.name[1:-1].split()
+                schematic_up_act = get_item_named(name_and_args[0])
+                if schematic_up_act == artificial_goal_action:
+                    schematic_up_act = None
+                    up_params = ()
+                else:
+                    if modified_to_orig_action is not None:
+                        schematic_up_act = modified_to_orig_action[schematic_up_act]
+                    up_params = tuple(objects[p] for p in name_and_args[1:])
+                if not compact:
+                    a = self._transform_action(
+                        a, problem, get_item_named, used_action_names, facts
+                    )
+                yield StreamedAction(a, schematic_up_act, up_params)
+
+    def _ground(
+        self, problem: "up.model.Problem", profiler: GroundingProfiler
+    ) -> Tuple[
+        "up.model.Problem",
+        Optional["up.model.InstantaneousAction"],
+        Optional[
+            Mapping["up.model.InstantaneousAction", "up.model.InstantaneousAction"]
+        ],
+        TranslatorNames,
+        Grounding,
+        Optional[List[LogMessage]],
+        Optional[SimplificationStats],
+        Optional[int],
+    ]:
+        """
+        Grounds the problem with Fast Downward (or takes the grounding from
+        the cache), then simplifies the grounding and merges duplicate
+        actions if the grounder should do so. Returns the problem that was
+        grounded, the artificial goal action and the mapping of the actions
+        to the original actions (see `_add_goal_action_if_complicated_goal`),
+        the translator names, the grounding, the log messages, the
+        statistics of the simplification and the number of merged actions.
+        """
+        orig_problem = problem
         # If necessary, perform goal transformation to avoid the introduction
         # of axioms.
-        (
-            problem,
-            artificial_goal_action,
-            modified_to_orig_action,
-        ) = self._add_goal_action_if_complicated_goal(problem)
+        with profiler.phase("goal_transformation"):
+            (
+                problem,
+                artificial_goal_action,
+                modified_to_orig_action,
+            ) = self._add_goal_action_if_complicated_goal(problem)
 
         # Ground the problem with Fast Downward
-        writer = up.io.PDDLWriter(problem)
-        pddl_problem = writer.get_problem().split("\n")
-        pddl_domain = writer.get_domain().split("\n")
+        grounding = None
+        log_messages = None
+        if self._cache is not None:
+            with profiler.phase("cache_lookup"):
+                cache_key = problem_hash(orig_problem, self.name)
+                grounding = self._cache.get(cache_key)
+        if grounding is None:
+            domain, names = _find_domain(self._domains, problem)
+            start_time = perf_counter()
+            names, grounding = self._instantiate_with_fast_downward(
+                problem, domain, names, profiler
+            )
+            if domain is not None:
+                instance_time = perf_counter() - start_time
+                log_messages = [_domain_log_message(domain, instance_time)]
+            if self._cache is not None:
+                self._cache.put(cache_key, grounding)
+        else:
+            names = TranslatorNames(problem)
+
+        simplification = None
+        if self._simplify:
+            with profiler.phase("simplify") as phase:
+                fnode = _FactTranslator(problem, names).fnode
+                grounding, simplification = simplify_grounding(
+                    grounding, lambda fact: problem.initial_value(fnode(fact)).is_true()
+                )
+                phase.items = len(grounding.actions)
 
-        actions, goals, axioms = self._instantiate_with_fast_downward(
-            pddl_problem, pddl_domain
+        merged_actions = None
+        if self._merge_duplicates:
+            with profiler.phase("merge_duplicates") as phase:
+                grounding, merged_actions = merge_duplicate_actions(grounding)
+                phase.items = merged_actions
+        return (
+            problem,
+            artificial_goal_action,
+            modified_to_orig_action,
+            names,
+            grounding,
+            log_messages,
+            simplification,
+            merged_actions,
         )
 
-        if axioms:
-            raise UPUnsupportedProblemTypeError(axioms_msg)
+    def _compile_with_profiler(
+        self, problem: "up.model.Problem", profiler: GroundingProfiler
+    ) -> CompilerResult:
+        if self._cache is not None:
+            result_key = _result_key(
+                problem,
+                self.name,
+                f"simplify {self._simplify}",
+                f"merge_duplicates {self._merge_duplicates}",
+            )
+            result = _cached_result(self._cache, result_key, profiler)
+            if result is not None:
+                return result
+        original_problem = problem
+        (
+            problem,
+            artificial_goal_action,
+            modified_to_orig_action,
+            names,
+            grounding,
+            log_messages,
+            simplification,
+            merged_actions,
+        ) = self._ground(problem, profiler)
+        get_item_named = names.get_item_named
 
         # Rebuild the ground problem from Fast Downward in the UP
-        new_problem = problem.clone()
-        new_problem.name = f"{self.name}_{problem.name}"
-        new_problem.clear_actions()
-        new_problem.clear_goals()
+        with profiler.phase("clone_problem"):
+            if simplification is None:
+                new_problem = problem.clone()
+                new_problem.clear_actions()
+                new_problem.clear_goals()
+            else:
+                # Drop the fluents that no longer occur in the ground task.
+                # The fluents in action costs are still needed to ground the
+                # quality metric.
+                kept_fluents = {get_item_named(p) for p in ground_predicates(grounding)}
+                kept_fluents |= used_fluents(
+                    cost
+                    for qm in problem.quality_metrics
+                    if isinstance(qm, MinimizeActionCosts)
+                    for cost in [*qm.costs.values(), qm.default]
+                    if cost is not None
+                )
+                dropped_fluents = [
+                    f
+                    for f in problem.fluents
+                    if f.type.is_bool_type() and f not in kept_fluents
+                ]
+                new_problem = clone_without_fluents(problem, dropped_fluents)
+                simplification = simplification._replace(
+                    dropped_fluents=len(dropped_fluents)
+                )
+                log_messages = (log_messages or []) + [
+                    LogMessage(LogLevel.INFO, str(simplification))
+                ]
+            new_problem.name = f"{self.name}_{problem.name}"
 
         trace_back_map = dict()
         used_action_names = set()
         exp_manager = problem.environment.expression_manager
+        facts = _FactTranslator(problem, names)
+        objects = facts.objects
 
         # Construct Fast Downward ground actions in the UP and remember the
         # mapping from the ground actions to the original actions.
-        for a in actions:
-            inst_action = self._transform_action(
-                a, new_problem, writer.get_item_named, used_action_names
-            )
-            name_and_args = a.name[1:-1].split()
-            schematic_up_act = writer.get_item_named(name_and_args[0])
-            if schematic_up_act == artificial_goal_action:
-                trace_back_map[inst_action] = None
-            else:
-                if modified_to_orig_action is not None:
-                    schematic_up_act = modified_to_orig_action[schematic_up_act]
-                params = (writer.get_item_named(p) for p in name_and_args[1:])
-                up_params = tuple(exp_manager.ObjectExp(p) for p in params)
-                trace_back_map[inst_action] = (schematic_up_act, up_params)
-            new_problem.add_action(inst_action)
+        with profiler.phase("transform_actions") as phase:
+            for a in grounding.actions:
+                inst_action = self._transform_action(
+                    a, new_problem, get_item_named, used_action_names, facts
+                )
+                name_and_args = a.name[1:-1].split()
+                schematic_up_act = get_item_named(name_and_args[0])
+                if schematic_up_act == artificial_goal_action:
+                    trace_back_map[inst_action] = None
+                else:
+                    if modified_to_orig_action is not None:
+                        schematic_up_act = modified_to_orig_action[schematic_up_act]
+                    up_params = tuple(objects[p] for p in name_and_args[1:])
+                    trace_back_map[inst_action] = (schematic_up_act, up_params)
+                new_problem.add_action(inst_action)
+            phase.items = len(trace_back_map)
 
         # Construct Fast Downward goals in the UP
-        for g in goals:
-            fnode = self._get_fnode(g, new_problem, writer.get_item_named)
-            new_problem.add_goal(fnode)
-
-        new_problem.clear_quality_metrics()
-        for qm in problem.quality_metrics:
-            if isinstance(qm, MinimizeActionCosts):
-                simplifier = Simplifier(new_problem.environment, new_problem)
-                ground_minimize_action_costs_metric(qm, trace_back_map, simplifier)
+        with profiler.phase("transform_goals"):
+            if grounding.goals is None:
+                new_problem.add_goal(exp_manager.FALSE())
             else:
-                new_problem.add_quality_metric(qm)
+                for g in grounding.goals:
+                    new_problem.add_goal(facts.fnode(g))
+
+        with profiler.phase("ground_metrics"):
+            new_problem.clear_quality_metrics()
+            # The metric of the original problem knows the costs of the
+            # original actions, to which the ground actions are mapped back.
+            for qm in original_problem.quality_metrics:
+                if isinstance(qm, MinimizeActionCosts):
+                    simplifier = Simplifier(new_problem.environment, new_problem)
+                    lifted_actions = {
+                        a: lifted
+                        for a, lifted in trace_back_map.items()
+                        if lifted is not None
+                    }
+                    metric = ground_minimize_action_costs_metric(
+                        qm, lifted_actions, simplifier
+                    )
+                    # the artificial goal action does not change the cost
+                    costs = dict(metric.costs)
+                    for a, lifted in trace_back_map.items():
+                        if lifted is None:
+                            costs[a] = 0
+                    new_problem.add_quality_metric(
+                        MinimizeActionCosts(costs, environment=metric.environment)
+                    )
+                else:
+                    new_problem.add_quality_metric(qm)
 
         # We need to use a more complicated function for mapping back the
         # actions because "partial(lift_action_instance, map=trace_back_map)"
@@ -440,8 +1225,22 @@ class FastDownwardGrounder(Engine, CompilerMixin):
             else partial(lift_action_instance, map=trace_back_map)(x)
         )
 
-        return CompilerResult(
+        metrics = {}
+        if simplification is not None:
+            metrics.update(simplification.metrics())
+        if merged_actions is not None:
+            metrics["merged_duplicate_actions"] = str(merged_actions)
+            message = f"Merged {merged_actions} duplicate ground actions"
+            log_messages = (log_messages or []) + [LogMessage(LogLevel.INFO, message)]
+
+        result = CompilerResult(
             new_problem,
             mbai,
             self.name,
+            log_messages=log_messages,
+            metrics=metrics or None,
         )
+        if self._cache is not None:
+            self._cache.put_result(result_key, result)
+            result = replace(result)
+        return result
@@ -0,0 +1,362 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from typing import IO, Callable, Dict, List, Optional, Tuple, Union
+from up_fast_downward.progress import OutputReader, ProgressMonitor
+
+# Fast Downward marks complete plan files with a final line that states the
+# cost of the plan. Plan files without this line have been interrupted.
+_PLAN_COST_REGEX = re.compile(r"; cost = (\d+) \((unit cost|general cost)\)")
+
+# Exit codes of Fast Downward for which the result of a run is final, so a
+# portfolio does not need to wait for the other configurations.
+# https://www.fast-downward.org/ExitCodes
+PLAN_FOUND_RETURNCODES = (0, 1, 2, 3)
+UNSOLVABLE_PROVEN_RETURNCODES = (10, 11)
+
+
+def is_search_config(config: str) -> bool:
+    """
+    Tells whether the given configuration is a search configuration (like
+    "lazy_greedy([ff()])") rather than the name of an alias.
+    """
+    return "(" in config
+
+
+def plan_cost(plan_filename: str) -> Optional[int]:
+    """
+    Returns the cost of the plan in the given file or None if the file does
+    not exist or does not contain a complete plan.
+    """
+    try:
+        with open(plan_filename) as plan_file:
+            last_line = None
+            for last_line in plan_file:
+                pass
+    except FileNotFoundError:
+        return None
+    match = _PLAN_COST_REGEX.match(last_line or "")
+    return int(match.group(1)) if match else None
+
+
+def kill_process(process: subprocess.Popen):
+    """Kills the given process and all processes it has started."""
+    try:
+        if sys.platform == "win32":
+            process.kill()
+        else:
+            # The process runs in a new session, so its process group
+            # contains the process and its children (e.g., the search).
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def peak_rss_in_kb(pid: int) -> Optional[int]:
+    """
+    Returns the largest peak resident set size (in KB) of the given process
+    and its descendants so far, or None if it is unknown. This needs the
+    proc file system of Linux.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status_file:
+            status = status_file.read()
+        with open(f"/proc/{pid}/task/{pid}/children") as children_file:
+            children = [int(child) for child in children_file.read().split()]
+    except (OSError, ValueError):
+        return None
+    match = re.search(r"^VmHWM:\s*(\d+) kB", status, flags=re.M)
+    peaks = [int(match.group(1))] if match else []
+    for child in children:
+        peak = peak_rss_in_kb(child)
+        if peak is not None:
+            peaks.append(peak)
+    return max(peaks, default=None)
+
+
+class ConfigRun:
+    """
+    A run of Fast Downward with one configuration of a portfolio. The
+    output of the run is written to files, so the run does not block if
+    nobody reads it. If an output stream is given, the output is copied
+    to it line by line while the run is polled.
+    """
+
+    def __init__(
+        self,
+        config: str,
+        cmd: List[str],
+        plan_filename: str,
+        cwd: Optional[str] = None,
+        stdin_filename: Optional[str] = None,
+        set_limits: Optional[Callable[[int], None]] = None,
+        monitor: Optional[ProgressMonitor] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ):
+        self.config = config
+        self.cmd = cmd
+        self.plan_filename = plan_filename
+        # working directory of the run (Fast Downward writes intermediate
+        # files like output.sas to the working directory)
+        self.cwd = cwd
+        # input of the search component if it runs without the driver
+        self.stdin_filename = stdin_filename
+        # imposes the resource limits on the process (called with its pid)
+        self.set_limits = set_limits
+        self.stdout_filename = plan_filename + ".out"
+        self.stderr_filename = plan_filename + ".err"
+        self.process: Optional[subprocess.Popen] = None
+        self.returncode: Optional[int] = None
+        self.runtime: Optional[float] = None
+        # resource usage of the process and its children (not on Windows)
+        self.rusage = None
+        # peak resident set size of the process and its children in KB
+        self.peak_rss_kb: Optional[int] = None
+        # reports the progress of the search while the run is polled
+        self.monitor = monitor
+        if isinstance(output_stream, tuple):
+            out_stream, err_stream = output_stream
+        else:
+            out_stream = err_stream = output_stream
+        # The output only needs to be read while the run is polled if
+        # somebody watches it.
+        self._watched = monitor is not None or output_stream is not None
+        self._output_reader = OutputReader(self.stdout_filename, out_stream)
+        self._error_reader = OutputReader(self.stderr_filename, err_stream)
+        self._start_time: Optional[float] = None
+
+    def start(self):
+        kwargs = (
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}  # type: ignore
+            if sys.platform == "win32"
+            else {"start_new_session": True}
+        )
+        stdin = None
+        if self.stdin_filename is not None:
+            stdin = open(self.stdin_filename)
+        try:
+            with open(self.stdout_filename, "w") as stdout:
+                with open(self.stderr_filename, "w") as stderr:
+                    self.process = subprocess.Popen(
+                        self.cmd,
+                        stdin=stdin,
+                        stdout=stdout,
+                        stderr=stderr,
+                        cwd=self.cwd,
+                        **kwargs,
+                    )
+        finally:
+            if stdin is not None:
+                stdin.close()
+        self._start_time = time.monotonic()
+        if self.set_limits is not None:
+            try:
+                self.set_limits(self.process.pid)
+            except BaseException:
+                # never let the process run without its limits
+                self.kill()
+                raise
+
+    def _wait(self, block: bool) -> Optional[int]:
+        # Like Popen.poll and Popen.wait, but also obtains the resource
+        # usage of the process (including its children, e.g., the
+        # components started by the driver).
+        assert self.process is not None
+        if not hasattr(os, "wait4") or self.process.returncode is not None:
+            return self.process.wait() if block else self.process.poll()
+        try:
+            pid, status, rusage = os.wait4(self.process.pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            return self.process.wait() if block else self.process.poll()
+        if pid == 0:
+            return None
+        self.rusage = rusage
+        if self.peak_rss_kb is None and sys.platform != "linux":
+            # On Linux, ru_maxrss also counts the memory of this process
+            # at the time of the fork, so there we use the sampled values.
+            self.peak_rss_kb = rusage.ru_maxrss
+            if sys.platform == "darwin":
+                # macOS reports bytes instead of KB
+                self.peak_rss_kb //= 1024
+        self.process.returncode = os.waitstatus_to_exitcode(status)
+        return self.process.returncode
+
+    def _sample_peak_rss(self):
+        assert self.process is not None
+        if sys.platform == "linux":
+            peak = peak_rss_in_kb(self.process.pid)
+            if peak is not None:
+                self.peak_rss_kb = max(peak, self.peak_rss_kb or 0)
+
+    def poll(self) -> bool:
+        """Returns True if the run has finished."""
+        # The memory of the process can only be read while it is running,
+        # so the peak is the largest value seen at a call of poll.
+        self._sample_peak_rss()
+        returncode = self._wait(block=False)
+        finished = returncode is not None
+        if not self._read_output(finished) and not finished:
+            # stopped by the progress callback
+            self.kill()
+            return True
+        if returncode is None:
+            return False
+        self.returncode = returncode
+        self.runtime = time.monotonic() - self._start_time
+        return True
+
+    def _read_output(self, finished: bool) -> bool:
+        # Copies the new output to the output streams and passes it to the
+        # monitor. Returns False if the run should be stopped.
+        if not self._watched:
+            return True
+        if finished:
+            lines = self._output_reader.read_rest()
+            self._error_reader.read_rest()
+        else:
+            lines = self._output_reader.read_lines()
+            self._error_reader.read_lines()
+        if self.monitor is None:
+            return True
+        for line in lines:
+            self.monitor.feed(line)
+        return not self.monitor.stopped
+
+    @property
+    def stopped(self) -> bool:
+        """Tells whether the progress callback stopped the run."""
+        return self.monitor is not None and self.monitor.stopped
+
+    def kill(self):
+        assert self.process is not None
+        self._sample_peak_rss()
+        kill_process(self.process)
+        self._wait(block=True)
+        self.runtime = time.monotonic() - self._start_time
+        if self._watched:
+            self._output_reader.read_rest()
+            self._error_reader.read_rest()
+
+    @property
+    def started(self) -> bool:
+        return self.process is not None
+
+    @property
+    def is_final(self) -> bool:
+        """
+        Tells whether the run has found a plan or proven that there is
+        none.
+        """
+        if self.returncode in UNSOLVABLE_PROVEN_RETURNCODES:
+            return True
+        return (
+            self.returncode in PLAN_FOUND_RETURNCODES and self.best_plan() is not None
+        )
+
+    def plan_filenames(self) -> List[str]:
+        """
+        Returns the files with complete plans of the run. Anytime
+        configurations write a sequence of plan files with increasing
+        numbers.
+        """
+        filenames = []
+        if plan_cost(self.plan_filename) is not None:
+            filenames.append(self.plan_filename)
+        number = 1
+        while os.path.exists(f"{self.plan_filename}.{number}"):
+            filename = f"{self.plan_filename}.{number}"
+            if plan_cost(filename) is not None:
+                filenames.append(filename)
+            number += 1
+        return filenames
+
+    def best_plan(self) -> Optional[Tuple[int, str]]:
+        """Returns the cost and the file of the cheapest plan of the run."""
+        plans = [(plan_cost(f), f) for f in self.plan_filenames()]
+        return min(plans) if plans else None
+
+    def output(self) -> Tuple[str, str]:
+        """Returns the output of the run on stdout and stderr."""
+        result = []
+        for filename in (self.stdout_filename, self.stderr_filename):
+            try:
+                with open(filename) as output_file:
+                    result.append(output_file.read())
+            except FileNotFoundError:
+                result.append("")
+        return result[0], result[1]
+
+
+def resource_metrics(runs: List[ConfigRun], phase: str) -> Dict[str, str]:
+    """
+    Returns the metrics of the resources used by the given runs in a phase
+    of planning (e.g., "translate" or "search"): the longest wall-clock time,
+    the total CPU time and the largest peak resident set size (in KB) of the
+    runs. Metrics that are unknown on the platform are missing.
+    """
+    runs = [run for run in runs if run.runtime is not None]
+    if not runs:
+        return {}
+    metrics = {f"{phase}_wall_time": str(max(run.runtime for run in runs))}
+    usages = [run.rusage for run in runs if run.rusage is not None]
+    if usages:
+        cpu_time = sum(u.ru_utime + u.ru_stime for u in usages)
+        metrics[f"{phase}_cpu_time"] = str(cpu_time)
+    peaks = [run.peak_rss_kb for run in runs if run.peak_rss_kb is not None]
+    if peaks:
+        metrics[f"{phase}_peak_rss_kb"] = str(max(peaks))
+    return metrics
+
+
+def run_portfolio(
+    runs: List[ConfigRun],
+    workers: int,
+    timeout: Optional[float] = None,
+    stop_at_final_run: bool = True,
+    poll_interval: float = 0.05,
+) -> Tuple[Optional[ConfigRun], bool]:
+    """
+    Runs the given configuration runs with at most `workers` runs at the
+    same time until one of them finds a plan or proves that there is none
+    (only if `stop_at_final_run` is set), all runs have finished or the
+    timeout is reached. Runs that are still running at this point are
+    killed.
+
+    Returns the run that finished with a final result (or None) and whether
+    the timeout was reached.
+    """
+    assert workers >= 1
+    pending = list(runs)
+    running: List[ConfigRun] = []
+    deadline = None if timeout is None else time.monotonic() + timeout
+    # Short runs (e.g., of the translator on small tasks) are common, so we
+    # start with a short interval and increase it up to poll_interval.
+    interval = min(0.001, poll_interval)
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                run = pending.pop(0)
+                run.start()
+                running.append(run)
+            for run in list(running):
+                if run.poll():
+                    running.remove(run)
+                    if stop_at_final_run and run.is_final:
+                        return run, False
+            if not running and not pending:
+                break
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, True
+                time.sleep(min(interval, remaining))
+            else:
+                time.sleep(interval)
+            interval = min(2 * interval, poll_interval)
+        return None, False
+    finally:
+        for run in running:
+            run.kill()
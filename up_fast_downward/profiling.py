@@ -0,0 +1,155 @@
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class PhaseProfile(NamedTuple):
+    """
+    The resources that one phase of a grounding used. `allocated_blocks` is
+    the change of the number of memory blocks allocated by the interpreter,
+    which roughly corresponds to the number of objects that the phase
+    created and kept. The allocated bytes are only measured if memory
+    tracing is enabled. `items` is the number of elements that the phase
+    produced (e.g., atoms of the model), if it applies.
+    """
+
+    phase: str
+    wall_time: float
+    allocated_blocks: int
+    allocated_bytes: Optional[int]
+    peak_allocated_bytes: Optional[int]
+    items: Optional[int]
+
+
+ProfileCallback = Callable[[PhaseProfile], None]
+
+
+class _NullPhase:
+    """A phase of the disabled profiler, which does not measure anything."""
+
+    items: Optional[int] = None
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    def __init__(self, profiler: "GroundingProfiler", name: str):
+        self._profiler = profiler
+        self._name = name
+        self.items: Optional[int] = None
+
+    def __enter__(self) -> "_Phase":
+        if self._profiler.trace_memory:
+            tracemalloc.reset_peak()
+            self._start_bytes = tracemalloc.get_traced_memory()[0]
+        self._start_blocks = sys.getallocatedblocks()
+        self._start_time = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall_time = perf_counter() - self._start_time
+        allocated_blocks = sys.getallocatedblocks() - self._start_blocks
+        allocated_bytes = None
+        peak_allocated_bytes = None
+        if self._profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            allocated_bytes = current - self._start_bytes
+            peak_allocated_bytes = peak - self._start_bytes
+        self._profiler.add(
+            PhaseProfile(
+                self._name,
+                wall_time,
+                allocated_blocks,
+                allocated_bytes,
+                peak_allocated_bytes,
+                self.items,
+            )
+        )
+        return False
+
+
+class GroundingProfiler:
+    """
+    Measures the phases of one grounding. Use `phase` as a context manager
+    around each phase; the yielded object has an attribute `items` for the
+    number of produced elements.
+
+    Tracing the memory with tracemalloc (`trace_memory`) slows down the
+    grounding considerably, so the wall times of a profile with memory
+    tracing are not representative.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[ProfileCallback] = None,
+        trace_memory: bool = False,
+    ):
+        self._callback = callback
+        self.trace_memory = trace_memory
+        self.phases: List[PhaseProfile] = []
+        self._started_tracing = False
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def add(self, profile: PhaseProfile):
+        self.phases.append(profile)
+        if self._callback is not None:
+            self._callback(profile)
+
+    def __enter__(self) -> "GroundingProfiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def metrics(self) -> Dict[str, str]:
+        """
+        Returns the measurements as metrics of a result, e.g.,
+        {"profile_normalize_wall_time": "0.012", ...}.
+        """
+        metrics = {}
+        for profile in self.phases:
+            for field, value in profile._asdict().items():
+                if field != "phase" and value is not None:
+                    metrics[f"profile_{profile.phase}_{field}"] = str(value)
+        return metrics
+
+
+class _NullProfiler:
+    """
+    Profiler that is used if profiling is disabled. Its phases do not
+    measure anything and are shared, so they cost (almost) nothing.
+    """
+
+    phases: List[PhaseProfile] = []
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+    def __enter__(self) -> "_NullProfiler":
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def metrics(self) -> Dict[str, str]:
+        return {}
+
+
+NULL_PROFILER = _NullProfiler()
+
@@ -0,0 +1,153 @@
+import re
+from typing import IO, Callable, Dict, List, NamedTuple, Optional
+
+# Lines of the search component start with the time since its start and its
+# memory usage, e.g., "[t=0.01s, 9964 KB] g=4, 12 evaluated, 4 expanded".
+_LINE_REGEX = re.compile(r"\[t=([\d.e+-]+)s, (\d+) KB\] (.*)$")
+_PROGRESS_REGEX = re.compile(r"(f|g) ?= ?(-?\d+), (\d+) evaluated, (\d+) expanded")
+_HEURISTIC_REGEX = re.compile(r"New best heuristic value for (.+): (-?\d+)$")
+_PLAN_COST_REGEX = re.compile(r"Plan cost: (\d+)$")
+
+
+class ProgressEvent(NamedTuple):
+    """
+    The state of a search of Fast Downward when it reported progress. The
+    kind of the event is "progress" (new f or g layer), "heuristic" (new
+    best heuristic value) or "plan" (new plan found).
+    """
+
+    kind: str
+    config: str
+    time: float  # seconds since the start of the search component
+    memory_kb: int
+    expanded: Optional[int]
+    evaluated: Optional[int]
+    expansions_per_second: Optional[float]
+    f_value: Optional[int]
+    g_value: Optional[int]
+    h_values: Dict[str, int]  # best value of each heuristic
+    plan_cost: Optional[int]  # cost of the best plan found so far
+
+
+ProgressCallback = Callable[[ProgressEvent], Optional[bool]]
+
+
+class OutputReader:
+    """
+    Reads the complete lines that were appended to a file since the last
+    call. If a stream is given, the lines are also written to it.
+    """
+
+    def __init__(self, filename: str, stream: Optional[IO[str]] = None):
+        self.filename = filename
+        self._stream = stream
+        self._offset = 0
+        self._partial_line = ""
+
+    def read_lines(self) -> List[str]:
+        try:
+            with open(self.filename) as output_file:
+                output_file.seek(self._offset)
+                text = output_file.read()
+                self._offset = output_file.tell()
+        except FileNotFoundError:
+            return []
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+        if self._stream is not None:
+            for line in lines:
+                self._stream.write(line + "\n")
+        return lines
+
+    def read_rest(self) -> List[str]:
+        """
+        Like `read_lines`, but also returns an unterminated last line (once
+        the file is complete).
+        """
+        lines = self.read_lines()
+        if self._partial_line:
+            if self._stream is not None:
+                self._stream.write(self._partial_line)
+            lines.append(self._partial_line)
+            self._partial_line = ""
+        return lines
+
+
+class ProgressMonitor:
+    """
+    Turns the output of one run of Fast Downward into progress events and
+    passes them to the callback. If the callback returns False, the run
+    should be stopped.
+    """
+
+    def __init__(self, config: str, callback: ProgressCallback, starting_plan_str: str):
+        self.config = config
+        self._callback = callback
+        # the line that the planner prints before a plan
+        self._starting_plan_str = starting_plan_str
+        self._expanded: Optional[int] = None
+        self._evaluated: Optional[int] = None
+        self._f_value: Optional[int] = None
+        self._g_value: Optional[int] = None
+        self._h_values: Dict[str, int] = {}
+        self._plan_cost: Optional[int] = None
+        self._plan_found = False
+        self.stopped = False
+
+    def feed(self, line: str) -> bool:
+        """
+        Processes a line of output. Returns False if the callback asked to
+        stop the run.
+        """
+        match = _LINE_REGEX.match(line)
+        if match is None:
+            return not self.stopped
+        time, memory_kb, message = match.groups()
+        kind = None
+        progress = _PROGRESS_REGEX.match(message)
+        plan_cost = None
+        if self._plan_found:
+            plan_cost = _PLAN_COST_REGEX.match(message)
+        if progress is not None:
+            kind = "progress"
+            layer, value, evaluated, expanded = progress.groups()
+            if layer == "f":
+                self._f_value = int(value)
+            else:
+                self._g_value = int(value)
+            self._evaluated = int(evaluated)
+            self._expanded = int(expanded)
+        elif self._starting_plan_str in message:
+            self._plan_found = True
+        elif plan_cost is not None:
+            kind = "plan"
+            self._plan_found = False
+            cost = int(plan_cost.group(1))
+            if self._plan_cost is None or cost < self._plan_cost:
+                self._plan_cost = cost
+        else:
+            heuristic = _HEURISTIC_REGEX.match(message)
+            if heuristic is not None:
+                kind = "heuristic"
+                self._h_values[heuristic.group(1)] = int(heuristic.group(2))
+        if kind is not None and not self.stopped:
+            time = float(time)
+            rate = None
+            if self._expanded is not None and time > 0:
+                rate = self._expanded / time
+            event = ProgressEvent(
+                kind,
+                self.config,
+                time,
+                int(memory_kb),
+                self._expanded,
+                self._evaluated,
+                rate,
+                self._f_value,
+                self._g_value,
+                dict(self._h_values),
+                self._plan_cost,
+            )
+            if self._callback(event) is False:
+                self.stopped = True
+        return not self.stopped
@@ -0,0 +1,294 @@
+import os
+import re
+import tempfile
+import time
+import unified_planning as up
+from typing import IO, Dict, List, Mapping, Optional, Tuple, Union
+from unified_planning.exceptions import UPUsageError
+from unified_planning.model import FNode
+from up_fast_downward.translated_task import TranslatedTask
+
+# Names of the values of SAS+ variables that correspond to (negated) atoms,
+# e.g., "Atom at(t0, l1)" or "NegatedAtom handempty()".
+_SAS_ATOM_REGEX = re.compile(r"(Negated)?Atom (\S+)\((.*)\)$")
+
+# Without this option, the translator removes variables that are irrelevant
+# for the goal of the initial problem, and every change of such a variable
+# would require a new translation.
+_SESSION_TRANSLATE_OPTIONS = ["--keep-unimportant-variables"]
+
+
+class _SASVariable:
+    def __init__(self, axiom_layer: int, values: List[str]):
+        self.axiom_layer = axiom_layer
+        self.values = values
+        # (fluent expression, negated) for each value; None for values that
+        # do not correspond to a fluent (e.g., "<none of those>")
+        self.facts: List[Optional[Tuple[FNode, bool]]] = []
+
+
+class ReplanningSession:
+    """
+    Solves a problem for a sequence of initial states that differ from the
+    initial state of the problem, e.g., when replanning during the execution
+    of a plan. Use `replanning_session` of the Fast Downward engines to
+    create a session.
+
+    The problem is translated once. For each new state, the session only
+    rewrites the initial state of the translated task and runs the search
+    component on it. This is sound if the facts that differ from the initial
+    state of the problem are facts of the translated task and the new state
+    satisfies the mutexes found by the translator, which holds for all
+    states that are reachable from the initial state. For other states, the
+    session translates the problem with the new initial state again and
+    uses this translation for later calls.
+
+    A session is not thread-safe. Its files are removed by `close` or at
+    the end of a with block.
+    """
+
+    def __init__(
+        self,
+        planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+        problem: "up.model.Problem",
+        config: Optional[str] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ):
+        assert isinstance(problem, up.model.Problem)
+        self._planner = planner
+        self._config = config
+        self._fluents = set(problem.fluents)
+        self._problem = planner._prepare_problem(problem)
+        self._initial_values = self._problem.initial_values
+        self._task: Optional[TranslatedTask] = None
+        self.translations = 0
+        self._translate({}, timeout, output_stream)
+
+    def _translate(
+        self,
+        changes: Dict[FNode, FNode],
+        timeout: Optional[float],
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]],
+    ):
+        # Translates the problem with the given changes of the initial state.
+        problem = self._problem
+        if changes:
+            problem = problem.clone()
+            for fluent, value in changes.items():
+                problem.set_initial_value(fluent, value)
+        if self._task is not None:
+            self._task.close()
+        self._task = TranslatedTask(
+            self._planner,
+            problem,
+            timeout,
+            output_stream,
+            translate_options=_SESSION_TRANSLATE_OPTIONS,
+        )
+        self.translations += 1
+        # the changes of the initial state of the translated task
+        self._task_changes = changes
+        self._variables: List[_SASVariable] = []
+        self._mutex_groups: List[List[Tuple[int, int]]] = []
+        self._fact_variable: Dict[FNode, int] = {}
+        if self._task.translated:
+            self._read_sas_file()
+
+    def _read_sas_file(self):
+        with open(self._task.sas_filename) as sas_file:
+            lines = sas_file.read().split("\n")
+        pos = lines.index("begin_variable")
+        while lines[pos] == "begin_variable":
+            axiom_layer = int(lines[pos + 2])
+            size = int(lines[pos + 3])
+            values = lines[pos + 4 : pos + 4 + size]
+            self._variables.append(_SASVariable(axiom_layer, values))
+            pos += size + 5
+        num_mutex_groups = int(lines[pos])
+        pos += 1
+        for _ in range(num_mutex_groups):
+            size = int(lines[pos + 1])
+            group = [
+                tuple(map(int, line.split()))
+                for line in lines[pos + 2 : pos + 2 + size]
+            ]
+            self._mutex_groups.append(group)
+            pos += size + 3
+        assert lines[pos] == "begin_state"
+        num_variables = len(self._variables)
+        self._sas_head = "\n".join(lines[: pos + 1])
+        self._sas_tail = "\n".join(lines[pos + 1 + num_variables :])
+        self._sas_state = [int(v) for v in lines[pos + 1 : pos + 1 + num_variables]]
+
+        self._variable_mutex_groups: Dict[int, List[int]] = {}
+        for i, group in enumerate(self._mutex_groups):
+            for var, _ in group:
+                self._variable_mutex_groups.setdefault(var, []).append(i)
+
+        for var, variable in enumerate(self._variables):
+            for value in variable.values:
+                fact = None
+                if variable.axiom_layer == -1:
+                    fact = self._fluent_expression(value)
+                variable.facts.append(fact)
+                if fact is not None:
+                    self._fact_variable[fact[0]] = var
+
+    def _fluent_expression(self, value: str) -> Optional[Tuple[FNode, bool]]:
+        match = _SAS_ATOM_REGEX.match(value)
+        if match is None:
+            return None
+        negated, name, args = match.groups()
+        get_item_named = self._task._writer.get_item_named
+        try:
+            fluent = get_item_named(name)
+            objects = [get_item_named(a.strip()) for a in args.split(",") if a.strip()]
+        except KeyError:
+            # e.g., the dummy atom of a trivially (un)solvable task
+            return None
+        if not isinstance(fluent, up.model.Fluent) or not all(
+            isinstance(o, up.model.Object) for o in objects
+        ):
+            return None
+        em = self._task.problem.environment.expression_manager
+        return em.FluentExp(fluent, objects), negated is not None
+
+    def close(self):
+        """Removes the files of the session."""
+        self._task.close()
+
+    def __enter__(self) -> "ReplanningSession":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def solve(
+        self,
+        state: Union[Mapping[FNode, FNode], "up.model.State"],
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        """
+        Searches for a plan from the given state. The state is a `State`
+        (e.g., of a simulator) or a mapping from fluent expressions to their
+        values; fluents that are missing in the mapping keep their value in
+        the initial state of the problem.
+
+        The metrics of the result tell whether the problem had to be
+        translated again (`replanning_translated`) and the time for updating
+        the translated task (`translate_time`).
+        """
+        start = time.time()
+        changes = self._changes(state)
+        sas_state = None
+        if self._task.translated:
+            sas_state = self._sas_state_for(changes)
+        translated = sas_state is None
+        if translated:
+            self._translate(changes, timeout, output_stream)
+        else:
+            self._write_sas_state(sas_state)
+        update_time = time.time() - start
+        if timeout is not None:
+            timeout = max(0, timeout - update_time)
+
+        result = self._task.solve(self._config, timeout, output_stream)
+        if not translated:
+            # the resources and statistics of an earlier translation
+            for key in list(result.metrics):
+                if key.startswith(("translate_", "translator_")):
+                    del result.metrics[key]
+        result.metrics["translate_time"] = str(update_time)
+        result.metrics["replanning_translated"] = str(translated)
+        return result
+
+    def _changes(
+        self, state: Union[Mapping[FNode, FNode], "up.model.State"]
+    ) -> Dict[FNode, FNode]:
+        # Returns the fluents whose value differs from the initial state of
+        # the problem.
+        initial_values = self._initial_values
+        if isinstance(state, up.model.State):
+            values = (
+                (f, state.get_value(f))
+                for f in initial_values
+                if f.fluent() in self._fluents
+            )
+        else:
+            em = self._task.problem.environment.expression_manager
+            values = (
+                (f, em.auto_promote(v)[0]) for f, v in state.items()  # type: ignore
+            )
+        changes = {}
+        for fluent, value in values:
+            if fluent not in initial_values:
+                raise UPUsageError(f"{fluent} is not a ground fluent of the problem")
+            if value != initial_values[fluent]:
+                changes[fluent] = value
+        return changes
+
+    def _sas_state_for(self, changes: Dict[FNode, FNode]) -> Optional[List[int]]:
+        # Returns the SAS+ initial state for the given changes or None if the
+        # changes cannot be represented in the translated task.
+        def value_of(fluent: FNode, changes: Dict[FNode, FNode]) -> FNode:
+            return changes.get(fluent, self._initial_values[fluent])
+
+        changed_variables = set()
+        for fluent in set(changes) | set(self._task_changes):
+            if value_of(fluent, changes) == value_of(fluent, self._task_changes):
+                continue
+            var = self._fact_variable.get(fluent)
+            if var is None:
+                return None
+            changed_variables.add(var)
+
+        def holds(fluent: FNode) -> bool:
+            return value_of(fluent, changes).is_true()
+
+        sas_state = list(self._sas_state)
+        for var in changed_variables:
+            variable = self._variables[var]
+            true_values = []
+            atom_holds = False
+            for value, fact in enumerate(variable.facts):
+                if fact is None:
+                    continue
+                fluent, negated = fact
+                if holds(fluent) != negated:
+                    true_values.append(value)
+                    atom_holds = atom_holds or not negated
+            if not atom_holds:
+                # "<none of those>" holds if no atom of the variable holds
+                true_values += [
+                    value
+                    for value, name in enumerate(variable.values)
+                    if variable.facts[value] is None and name == "<none of those>"
+                ]
+            if len(true_values) != 1:
+                return None
+            sas_state[var] = true_values[0]
+
+        groups = {
+            i
+            for var in changed_variables
+            for i in self._variable_mutex_groups.get(var, [])
+        }
+        for i in groups:
+            if sum(sas_state[var] == value for var, value in self._mutex_groups[i]) > 1:
+                return None
+        return sas_state
+
+    def _write_sas_state(self, sas_state: List[int]):
+        # Replace the file instead of writing into it because the file might
+        # be a hard link to an entry of the translation cache.
+        directory = os.path.dirname(self._task.sas_filename)
+        fd, tmp_filename = tempfile.mkstemp(dir=directory, suffix=".sas")
+        with os.fdopen(fd, "w") as sas_file:
+            sas_file.write(self._sas_head)
+            sas_file.write("\n")
+            sas_file.write("\n".join(map(str, sas_state)))
+            sas_file.write("\n")
+            sas_file.write(self._sas_tail)
+        os.replace(tmp_filename, self._task.sas_filename)
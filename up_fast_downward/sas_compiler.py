@@ -0,0 +1,358 @@
+import re
+import unified_planning as up
+from typing import Dict, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+from unified_planning.model import (
+    FNode,
+    Fluent,
+    InstantaneousAction,
+    MinimizeActionCosts,
+    Object,
+    Problem,
+    ProblemKind,
+)
+from unified_planning.engines.compilers.utils import lift_action_instance
+from unified_planning.engines.engine import Engine
+from unified_planning.engines import Credits
+from unified_planning.engines.mixins.compiler import CompilationKind
+from unified_planning.engines.mixins.compiler import CompilerMixin
+from unified_planning.engines.results import CompilerResult, LogLevel, LogMessage
+from unified_planning.exceptions import UPUnsupportedProblemTypeError
+from unified_planning.plans import ActionInstance
+from up_fast_downward import utils
+from up_fast_downward.fast_downward_grounder import (
+    FastDownwardGrounder,
+    axioms_msg,
+    credits,
+)
+from up_fast_downward.translator import TranslatorNames, TranslatorSession
+
+# Value names of the translator, e.g. "Atom at(l-0)", "NegatedAtom at(l-0)"
+# or "<none of those>". The translator names contain no parentheses,
+# commas or whitespace.
+_VALUE_NAME = re.compile(r"(Atom|NegatedAtom) ([^(]+)\((.*)\)")
+
+
+class FiniteDomainVariable(NamedTuple):
+    """
+    A finite-domain variable of a FiniteDomainTask: a fluent of the compiled
+    problem without parameters, its values (objects of the type of the
+    fluent) and, for each value, the fact of the original problem that it
+    stands for, given as the ground fluent expression and its truth value.
+    The fact is None for the value "none of those", which means that all
+    facts of the other values are false, and for values of auxiliary
+    variables of the translator.
+    """
+
+    fluent: "up.model.Fluent"
+    values: Tuple["up.model.Object", ...]
+    facts: Tuple[Optional[Tuple[FNode, bool]], ...]
+
+
+class FiniteDomainTask:
+    """
+    A problem compiled by the FastDownwardSASCompiler. `problem` is the UP
+    problem with one fluent for each finite-domain variable (see
+    `variables`). `mutex_groups` holds the mutex groups that the translator
+    found (as pairs of the index of a variable and the index of a value).
+    The methods map states and action instances of the compiled problem
+    back to the original problem.
+    """
+
+    def __init__(
+        self,
+        problem: "up.model.Problem",
+        variables: List[FiniteDomainVariable],
+        mutex_groups: List[List[Tuple[int, int]]],
+        trace_back_map: Dict[
+            "up.model.Action",
+            Optional[Tuple["up.model.Action", Tuple[FNode, ...]]],
+        ],
+    ):
+        self.problem = problem
+        self.variables = variables
+        self.mutex_groups = mutex_groups
+        self._trace_back_map = trace_back_map
+        exp_manager = problem.environment.expression_manager
+        self._true = exp_manager.TRUE()
+        self._false = exp_manager.FALSE()
+        self._value_ids = [
+            {value: i for i, value in enumerate(variable.values)}
+            for variable in variables
+        ]
+
+    def map_back_action_instance(
+        self, action_instance: ActionInstance
+    ) -> Optional[ActionInstance]:
+        """
+        Maps an instance of an action of the compiled problem to the action
+        of the original problem, or to None for the artificial goal action.
+        """
+        if self._trace_back_map[action_instance.action] is None:
+            return None
+        return lift_action_instance(action_instance, self._trace_back_map)
+
+    def map_back_state(
+        self, state: Union["up.model.State", Mapping[FNode, FNode]]
+    ) -> Dict[FNode, FNode]:
+        """
+        Maps a state of the compiled problem (a UP state or the values of
+        the fluents) to the values of the ground fluents of the original
+        problem that the variables represent. Fluents that the translator
+        found to be static or irrelevant are not part of the result.
+        """
+        get_value = getattr(state, "get_value", None) or state.__getitem__
+        result = {}
+        for variable, value_ids in zip(self.variables, self._value_ids):
+            value = value_ids[get_value(variable.fluent()).object()]
+            for i, fact in enumerate(variable.facts):
+                if fact is None:
+                    continue
+                fluent_exp, positive = fact
+                if i == value:
+                    result[fluent_exp] = self._true if positive else self._false
+                elif positive:
+                    result[fluent_exp] = self._false
+        return result
+
+
+class FastDownwardSASCompiler(Engine, CompilerMixin):
+    """
+    Compiles a problem into a ground problem with finite-domain variables
+    like the translator of Fast Downward: the invariant synthesis of the
+    translator finds groups of mutually exclusive facts, and each group
+    becomes a fluent whose values are the facts of the group. Use
+    `compile_finite_domain` to also obtain the mapping of states back to
+    the original problem.
+    """
+
+    def __init__(self):
+        Engine.__init__(self)
+        CompilerMixin.__init__(self, CompilationKind.GROUNDING)
+
+    @property
+    def name(self) -> str:
+        return "Fast Downward SAS+ Compiler"
+
+    @staticmethod
+    def get_credits(**kwargs) -> Optional["Credits"]:
+        return credits
+
+    @staticmethod
+    def supported_kind() -> ProblemKind:
+        return FastDownwardGrounder.supported_kind()
+
+    @staticmethod
+    def supports(problem_kind: "up.model.ProblemKind") -> bool:
+        return problem_kind <= FastDownwardSASCompiler.supported_kind()
+
+    @staticmethod
+    def supports_compilation(compilation_kind: CompilationKind) -> bool:
+        return compilation_kind == CompilationKind.GROUNDING
+
+    @staticmethod
+    def resulting_problem_kind(
+        problem_kind: ProblemKind, compilation_kind: Optional[CompilationKind] = None
+    ) -> ProblemKind:
+        resulting_problem_kind = problem_kind.clone()
+        resulting_problem_kind.unset_typing("HIERARCHICAL_TYPING")
+        resulting_problem_kind.set_typing("FLAT_TYPING")
+        resulting_problem_kind.unset_conditions_kind("NEGATIVE_CONDITIONS")
+        resulting_problem_kind.unset_conditions_kind("DISJUNCTIVE_CONDITIONS")
+        resulting_problem_kind.unset_conditions_kind("EXISTENTIAL_CONDITIONS")
+        resulting_problem_kind.set_conditions_kind("EQUALITIES")
+        resulting_problem_kind.set_fluents_type("OBJECT_FLUENTS")
+        resulting_problem_kind.unset_effects_kind(
+            "STATIC_FLUENTS_IN_BOOLEAN_ASSIGNMENTS"
+        )
+        resulting_problem_kind.unset_effects_kind("FLUENTS_IN_BOOLEAN_ASSIGNMENTS")
+        if resulting_problem_kind.has_actions_cost_kind(
+            "STATIC_FLUENTS_IN_ACTIONS_COST"
+        ):
+            resulting_problem_kind.unset_actions_cost_kind(
+                "STATIC_FLUENTS_IN_ACTIONS_COST"
+            )
+            resulting_problem_kind.set_actions_cost_kind("INT_NUMBERS_IN_ACTIONS_COST")
+        return resulting_problem_kind
+
+    def _compile(
+        self, problem: "up.model.AbstractProblem", compilation_kind: "CompilationKind"
+    ) -> CompilerResult:
+        assert isinstance(problem, Problem)
+        task, log_messages = self._compile_finite_domain(problem)
+        return CompilerResult(
+            task.problem,
+            task.map_back_action_instance,
+            self.name,
+            log_messages=log_messages,
+        )
+
+    def compile_finite_domain(self, problem: "up.model.Problem") -> FiniteDomainTask:
+        """
+        Compiles the problem like `compile`, but returns a FiniteDomainTask
+        with the variables and the mappings of states and action instances
+        back to the given problem.
+        """
+        assert isinstance(problem, Problem)
+        return self._compile_finite_domain(problem)[0]
+
+    def _compile_finite_domain(
+        self, problem: "up.model.Problem"
+    ) -> Tuple[FiniteDomainTask, List[LogMessage]]:
+        orig_fluents = set(problem.fluents)
+        (
+            problem,
+            artificial_goal_action,
+            modified_to_orig_action,
+        ) = utils.add_goal_action_if_complicated_goal(problem)
+        translator = TranslatorSession()
+        with translator.capture_output():
+            translator_task = translator.build_task(problem)
+            task = translator_task.task
+            translator.normalize.normalize(task)
+            sas_task = translator.pddl_to_sas(task)
+        if sas_task.axioms:
+            raise UPUnsupportedProblemTypeError(axioms_msg)
+        names = translator_task.names
+        ranges = sas_task.variables.ranges
+        message = (
+            f"Translated into {len(ranges)} variables with {sum(ranges)} "
+            f"values, {len(sas_task.operators)} operators and "
+            f"{len(sas_task.mutexes)} mutex groups"
+        )
+        log_messages = [LogMessage(LogLevel.INFO, message)]
+
+        env = problem.environment
+        exp_manager = env.expression_manager
+        new_problem = Problem(f"{self.name}_{problem.name}", env)
+
+        # One fluent for each variable, with a type for its values.
+        used_names = set()
+        variables = []
+        value_conditions = []
+        for var, value_names in enumerate(sas_task.variables.value_names):
+            value_type = env.type_manager.UserType(
+                _fresh_name(f"var{var}_value", used_names)
+            )
+            fluent = Fluent(
+                _fresh_name(f"var{var}", used_names), value_type, environment=env
+            )
+            new_problem.add_fluent(fluent)
+            fluent_exp = exp_manager.FluentExp(fluent)
+            values = []
+            facts = []
+            for value_name in value_names:
+                fact = _fact(value_name, names, exp_manager)
+                if fact is None:
+                    object_name = "none_of_those"
+                else:
+                    fluent_name = fact[0].fluent().name
+                    object_name = "_".join(
+                        [fluent_name] + [str(arg) for arg in fact[0].args]
+                    )
+                    if not fact[1]:
+                        object_name = f"not_{object_name}"
+                    if fact[0].fluent() not in orig_fluents:
+                        # the fluent of the artificial goal
+                        fact = None
+                object_name = _fresh_name(f"var{var}_{object_name}", used_names)
+                values.append(Object(object_name, value_type, env))
+                facts.append(fact)
+            new_problem.add_objects(values)
+            variables.append(FiniteDomainVariable(fluent, tuple(values), tuple(facts)))
+            value_conditions.append(
+                [
+                    exp_manager.Equals(fluent_exp, exp_manager.ObjectExp(value))
+                    for value in values
+                ]
+            )
+            new_problem.set_initial_value(fluent_exp, values[sas_task.init.values[var]])
+
+        # Actions
+        get_item_named = names.get_item_named
+        used_action_names = set()
+        trace_back_map = {}
+        costs = {}
+        for op in sas_task.operators:
+            action = InstantaneousAction(
+                utils.ground_action_name(op.name, get_item_named, used_action_names),
+                _env=env,
+            )
+            for var, val in op.prevail:
+                action.add_precondition(value_conditions[var][val])
+            preconditions = set()
+            for var, pre, post, cond in op.pre_post:
+                if pre != -1 and var not in preconditions:
+                    preconditions.add(var)
+                    action.add_precondition(value_conditions[var][pre])
+                condition = exp_manager.And(
+                    value_conditions[v][value] for v, value in cond
+                )
+                action.add_effect(
+                    variables[var].fluent(), variables[var].values[post], condition
+                )
+            name_and_args = op.name[1:-1].split()
+            schematic_up_act = get_item_named(name_and_args[0])
+            if schematic_up_act == artificial_goal_action:
+                trace_back_map[action] = None
+            else:
+                if modified_to_orig_action is not None:
+                    schematic_up_act = modified_to_orig_action[schematic_up_act]
+                up_params = tuple(
+                    exp_manager.ObjectExp(get_item_named(p)) for p in name_and_args[1:]
+                )
+                trace_back_map[action] = (schematic_up_act, up_params)
+            costs[action] = exp_manager.Int(op.cost)
+            new_problem.add_action(action)
+
+        for var, val in sas_task.goal.pairs:
+            new_problem.add_goal(value_conditions[var][val])
+
+        for qm in problem.quality_metrics:
+            if isinstance(qm, MinimizeActionCosts):
+                new_problem.add_quality_metric(
+                    MinimizeActionCosts(costs, environment=env)
+                )
+            else:
+                new_problem.add_quality_metric(qm)
+
+        mutex_groups = [list(group.facts) for group in sas_task.mutexes]
+        task = FiniteDomainTask(new_problem, variables, mutex_groups, trace_back_map)
+        return task, log_messages
+
+
+def _fact(
+    value_name: str,
+    names: TranslatorNames,
+    exp_manager: "up.model.ExpressionManager",
+) -> Optional[Tuple[FNode, bool]]:
+    """
+    Returns the ground fluent expression of the original problem and the
+    truth value that the given value of a variable stands for, or None if
+    it does not stand for a fact of the original problem.
+    """
+    match = _VALUE_NAME.fullmatch(value_name)
+    if match is None:
+        return None
+    kind, predicate, args = match.groups()
+    try:
+        fluent = names.get_item_named(predicate)
+        objects = [names.get_item_named(arg) for arg in args.split(", ") if arg]
+    except KeyError:
+        # auxiliary variable of the translator, e.g., of a trivial task
+        return None
+    if not isinstance(fluent, Fluent):
+        return None
+    fluent_exp = exp_manager.FluentExp(
+        fluent, [exp_manager.ObjectExp(obj) for obj in objects]
+    )
+    return fluent_exp, kind == "Atom"
+
+
+def _fresh_name(name: str, used_names: Set[str]) -> str:
+    candidate = name
+    num = 0
+    while candidate in used_names:
+        candidate = f"{name}_{num}"
+        num += 1
+    used_names.add(candidate)
+    return candidate
@@ -0,0 +1,128 @@
+import json
+import unified_planning as up
+from typing import NamedTuple, Tuple
+
+# Rules of the automatic selection of an optimal configuration. They only
+# use features that can be read cheaply from the translated task, so the
+# selection takes much less time than the search.
+
+# LM-cut is a good default, but computing it per state is expensive on large
+# tasks. On large unit-cost tasks, we precompute a merge-and-shrink
+# abstraction with bisimulation instead. The thresholds are rough and can be
+# tuned with the log of selections (see log_selection).
+MERGE_AND_SHRINK_MIN_OPERATORS = 2000
+# On large tasks with general costs, we use pattern databases.
+PATTERN_DATABASES_MIN_OPERATORS = 20000
+
+LMCUT_CONFIG = "astar(lmcut())"
+MERGE_AND_SHRINK_CONFIG = (
+    "astar(merge_and_shrink("
+    "shrink_strategy=shrink_bisimulation(greedy=false),"
+    "merge_strategy=merge_sccs(order_of_sccs=topological,"
+    "merge_selector=score_based_filtering(scoring_functions=["
+    "goal_relevance(),dfp(),total_order()])),"
+    "label_reduction=exact(before_shrinking=true,before_merging=false),"
+    "max_states=50k,threshold_before_merge=1))"
+)
+PATTERN_DATABASES_CONFIG = "astar(ipdb())"
+# Most admissible heuristics do not support conditional effects or axioms.
+CONDITIONAL_EFFECTS_CONFIG = "astar(hmax())"
+AXIOMS_CONFIG = "astar(blind())"
+
+
+class TaskFeatures(NamedTuple):
+    """Features of a task in the SAS+ representation of Fast Downward."""
+
+    variables: int
+    facts: int
+    operators: int
+    axioms: int
+    conditional_effects: bool
+    unit_cost: bool
+
+
+def task_features(sas_filename: str) -> TaskFeatures:
+    """Reads the features of the translated task in the given file."""
+    with open(sas_filename) as sas_file:
+        lines = sas_file.read().split("\n")
+    # begin_version, version, end_version, begin_metric, metric, end_metric
+    uses_costs = lines[4] == "1"
+    pos = 6
+    num_variables = int(lines[pos])
+    pos += 1
+    facts = 0
+    for _ in range(num_variables):
+        size = int(lines[pos + 3])
+        facts += size
+        pos += size + 5
+    num_mutex_groups = int(lines[pos])
+    pos += 1
+    for _ in range(num_mutex_groups):
+        pos += int(lines[pos + 1]) + 3
+    # initial state and goal
+    pos += num_variables + 2
+    pos += int(lines[pos + 1]) + 3
+    num_operators = int(lines[pos])
+    pos += 1
+    conditional_effects = False
+    unit_cost = True
+    for _ in range(num_operators):
+        # begin_operator, name, number of prevail conditions, conditions
+        pos += int(lines[pos + 2]) + 3
+        num_effects = int(lines[pos])
+        for line in lines[pos + 1 : pos + 1 + num_effects]:
+            if not line.startswith("0 "):
+                conditional_effects = True
+        pos += num_effects + 1
+        if uses_costs and lines[pos] != "1":
+            unit_cost = False
+        pos += 2
+    num_axioms = int(lines[pos])
+    return TaskFeatures(
+        num_variables,
+        facts,
+        num_operators,
+        num_axioms,
+        conditional_effects,
+        unit_cost,
+    )
+
+
+def select_optimal_config(features: TaskFeatures) -> Tuple[str, str]:
+    """
+    Returns an optimal search configuration for a task with the given
+    features together with the reason for the choice.
+    """
+    if features.axioms:
+        return AXIOMS_CONFIG, "axioms"
+    if features.conditional_effects:
+        return CONDITIONAL_EFFECTS_CONFIG, "conditional effects"
+    if features.unit_cost and features.operators >= MERGE_AND_SHRINK_MIN_OPERATORS:
+        return MERGE_AND_SHRINK_CONFIG, "large unit-cost task"
+    if not features.unit_cost and features.operators >= PATTERN_DATABASES_MIN_OPERATORS:
+        return PATTERN_DATABASES_CONFIG, "large task with general costs"
+    return LMCUT_CONFIG, "default"
+
+
+def log_selection(
+    filename: str,
+    features: TaskFeatures,
+    config: str,
+    reason: str,
+    result: "up.engines.results.PlanGenerationResult",
+):
+    """
+    Appends the features, the choice and the outcome of a selection as one
+    line of JSON to the given file, so the rules can be tuned.
+    """
+    record = {
+        "features": features._asdict(),
+        "config": config,
+        "reason": reason,
+        "status": result.status.name,
+        "search_time": result.metrics.get("search_time"),
+        "search_wall_time": result.metrics.get("search_wall_time"),
+        "search_expanded": result.metrics.get("search_expanded"),
+    }
+    with open(filename, "a") as log_file:
+        log_file.write(json.dumps(record) + "\n")
@@ -0,0 +1,408 @@
+import unified_planning as up
+from collections import defaultdict
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+)
+from unified_planning.model import Problem
+from unified_planning.model.walkers import FreeVarsExtractor
+
+if TYPE_CHECKING:
+    from up_fast_downward.fast_downward_grounder import Fact, GroundAction, Grounding
+
+Effects = Tuple[Tuple[Tuple["Fact", ...], "Fact"], ...]
+
+
+class SimplificationStats(NamedTuple):
+    """
+    How much smaller the simplification made a ground task. Facts are the
+    ground atoms that occur in the actions or the goal. Static facts are
+    facts that no remaining action changes and that were replaced by their
+    initial value. Dead actions have a precondition on a static fact that
+    is false, unreachable actions are never applicable in the relaxed task
+    (where a fact keeps both truth values once it reached them) and
+    irrelevant actions change no fact that matters for the goal.
+    """
+
+    actions_before: int
+    actions_after: int
+    facts_before: int
+    facts_after: int
+    static_facts: int
+    dead_actions: int
+    unreachable_actions: int
+    irrelevant_actions: int
+    dropped_fluents: int = 0
+
+    def metrics(self) -> Dict[str, str]:
+        """
+        Returns the statistics as metrics of a result, e.g.,
+        {"simplification_actions_before": "4280", ...}.
+        """
+        return {
+            f"simplification_{field}": str(value)
+            for field, value in self._asdict().items()
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"Simplified the ground task from {self.actions_before} to "
+            f"{self.actions_after} actions and from {self.facts_before} to "
+            f"{self.facts_after} facts ({self.static_facts} static facts, "
+            f"{self.dead_actions} dead, {self.unreachable_actions} unreachable "
+            f"and {self.irrelevant_actions} irrelevant actions, "
+            f"{self.dropped_fluents} dropped fluents)"
+        )
+
+
+def _atom(literal: "Fact") -> "Fact":
+    return literal._replace(negated=False) if literal.negated else literal
+
+
+def _negated(atom: "Fact") -> "Fact":
+    return atom._replace(negated=True)
+
+
+def _atoms(actions: Iterable["GroundAction"], goals: Iterable["Fact"]) -> Set["Fact"]:
+    atoms = {_atom(g) for g in goals}
+    for action in actions:
+        atoms.update(_atom(f) for f in action.precondition)
+        for effects in (action.add_effects, action.del_effects):
+            for condition, fact in effects:
+                atoms.add(fact)
+                atoms.update(_atom(c) for c in condition)
+    return atoms
+
+
+class _GroundTaskSimplifier:
+    """
+    Simplifies a ground task in rounds until it does not change anymore.
+    Each round replaces the facts that no action changes by their initial
+    value, removes the actions and effects that are unreachable from the
+    initial state and removes the actions and effects that are irrelevant
+    for the goal. Removing actions can make further facts static, which is
+    why the rounds are repeated.
+    """
+
+    def __init__(self, initially_true: Callable[["Fact"], bool]):
+        self._initially_true = initially_true
+        self._initial_values: Dict["Fact", bool] = {}
+        self.static_atoms: Set["Fact"] = set()
+        self.dead_actions = 0
+        self.unreachable_actions = 0
+        self.irrelevant_actions = 0
+
+    def _initial_value(self, atom: "Fact") -> bool:
+        value = self._initial_values.get(atom)
+        if value is None:
+            value = self._initial_values[atom] = self._initially_true(atom)
+        return value
+
+    def _holds_initially(self, literal: "Fact") -> bool:
+        return self._initial_value(_atom(literal)) != literal.negated
+
+    def _fold_condition(
+        self, condition: Tuple["Fact", ...], changing: Collection["Fact"]
+    ) -> Optional[Tuple["Fact", ...]]:
+        """
+        Removes the static literals from the condition. Returns None if one
+        of them is false.
+        """
+        if all(_atom(c) in changing for c in condition):
+            return condition
+        result = []
+        for literal in condition:
+            atom = _atom(literal)
+            if atom in changing:
+                result.append(literal)
+            else:
+                self.static_atoms.add(atom)
+                if not self._holds_initially(literal):
+                    return None
+        return tuple(result)
+
+    def _fold_effects(self, effects: Effects, changing: Collection["Fact"]) -> Effects:
+        result = []
+        for condition, fact in effects:
+            condition = self._fold_condition(condition, changing)
+            if condition is not None:
+                result.append((condition, fact))
+        return tuple(result)
+
+    def fold_static_facts(
+        self, actions: List["GroundAction"], goals: Optional[Tuple["Fact", ...]]
+    ) -> Tuple[List["GroundAction"], Optional[Tuple["Fact", ...]]]:
+        changing = set()
+        for action in actions:
+            for effects in (action.add_effects, action.del_effects):
+                changing.update(fact for _, fact in effects)
+        result = []
+        for action in actions:
+            precondition = self._fold_condition(action.precondition, changing)
+            if precondition is None:
+                self.dead_actions += 1
+                continue
+            add_effects = self._fold_effects(action.add_effects, changing)
+            del_effects = self._fold_effects(action.del_effects, changing)
+            # Fast Downward applies add effects after delete effects.
+            unconditional_adds = {f for c, f in add_effects if not c}
+            if unconditional_adds:
+                del_effects = tuple(
+                    (c, f) for c, f in del_effects if c or f not in unconditional_adds
+                )
+            if (
+                precondition != action.precondition
+                or add_effects != action.add_effects
+                or del_effects != action.del_effects
+            ):
+                action = action._replace(
+                    precondition=precondition,
+                    add_effects=add_effects,
+                    del_effects=del_effects,
+                )
+            result.append(action)
+        if goals is not None:
+            goals = self._fold_condition(goals, changing)
+        return result, goals
+
+    def remove_unreachable(
+        self, actions: List["GroundAction"], goals: Optional[Tuple["Fact", ...]]
+    ) -> Tuple[List["GroundAction"], Optional[Tuple["Fact", ...]]]:
+        """
+        Computes the literals that are reachable in the relaxed task, where
+        both truth values of a fact stay reachable once they are reached.
+        Removes the actions and effects that never fire in the relaxed task
+        and returns None as goal if it is unreachable.
+        """
+        # A rule per action (without head) and per effect. A rule fires when
+        # all literals of its body are reached.
+        rule_heads: List[Optional["Fact"]] = []
+        missing: List[int] = []
+        rules_with_literal: Dict["Fact", List[int]] = defaultdict(list)
+
+        def add_rule(head, body):
+            rule = len(rule_heads)
+            rule_heads.append(head)
+            missing.append(len(body))
+            for literal in body:
+                rules_with_literal[literal].append(rule)
+
+        for action in actions:
+            precondition = set(action.precondition)
+            add_rule(None, precondition)
+            for condition, fact in action.add_effects:
+                add_rule(fact, precondition.union(condition))
+            for condition, fact in action.del_effects:
+                add_rule(_negated(fact), precondition.union(condition))
+
+        reached = set()
+        ready = [rule for rule, count in enumerate(missing) if count == 0]
+
+        def reach(literal):
+            if literal not in reached:
+                reached.add(literal)
+                for rule in rules_with_literal.get(literal, ()):
+                    missing[rule] -= 1
+                    if missing[rule] == 0:
+                        ready.append(rule)
+
+        for atom in _atoms(actions, goals or ()):
+            reach(atom if self._initial_value(atom) else _negated(atom))
+        fired = [False] * len(rule_heads)
+        while ready:
+            rule = ready.pop()
+            fired[rule] = True
+            if rule_heads[rule] is not None:
+                reach(rule_heads[rule])
+
+        result = []
+        rule = 0
+        for action in actions:
+            applicable = fired[rule]
+            rule += 1
+            add_effects = []
+            for effect in action.add_effects:
+                if fired[rule]:
+                    add_effects.append(effect)
+                rule += 1
+            del_effects = []
+            for effect in action.del_effects:
+                if fired[rule]:
+                    del_effects.append(effect)
+                rule += 1
+            if not applicable:
+                self.unreachable_actions += 1
+                continue
+            if len(add_effects) != len(action.add_effects) or len(del_effects) != len(
+                action.del_effects
+            ):
+                action = action._replace(
+                    add_effects=tuple(add_effects), del_effects=tuple(del_effects)
+                )
+            result.append(action)
+        if goals is not None and not all(g in reached for g in goals):
+            goals = None
+        return result, goals
+
+    def remove_irrelevant(
+        self, actions: List["GroundAction"], goals: Optional[Tuple["Fact", ...]]
+    ) -> List["GroundAction"]:
+        """
+        Computes the facts that are relevant backward from the goal: the
+        goal facts, and the facts in the preconditions of actions and in the
+        conditions of effects that change a relevant fact. Removes the
+        actions that change no relevant fact and the effects on irrelevant
+        facts.
+        """
+        effects_on: Dict["Fact", List[Tuple[int, Tuple["Fact", ...]]]] = defaultdict(
+            list
+        )
+        for action_id, action in enumerate(actions):
+            for effects in (action.add_effects, action.del_effects):
+                for condition, fact in effects:
+                    effects_on[fact].append((action_id, condition))
+        relevant_actions = [False] * len(actions)
+        relevant = set()
+        queue = []
+
+        def make_relevant(literals):
+            for literal in literals:
+                atom = _atom(literal)
+                if atom not in relevant:
+                    relevant.add(atom)
+                    queue.append(atom)
+
+        make_relevant(goals or ())
+        while queue:
+            for action_id, condition in effects_on.get(queue.pop(), ()):
+                if not relevant_actions[action_id]:
+                    relevant_actions[action_id] = True
+                    make_relevant(actions[action_id].precondition)
+                make_relevant(condition)
+
+        result = []
+        for action, is_relevant in zip(actions, relevant_actions):
+            if not is_relevant:
+                self.irrelevant_actions += 1
+                continue
+            add_effects = tuple(e for e in action.add_effects if e[1] in relevant)
+            del_effects = tuple(e for e in action.del_effects if e[1] in relevant)
+            if len(add_effects) != len(action.add_effects) or len(del_effects) != len(
+                action.del_effects
+            ):
+                action = action._replace(
+                    add_effects=add_effects, del_effects=del_effects
+                )
+            result.append(action)
+        return result
+
+
+def ground_predicates(grounding: "Grounding") -> Set[str]:
+    """Returns the predicates of the facts in the given ground task."""
+    return {atom.predicate for atom in _atoms(grounding.actions, grounding.goals or ())}
+
+
+def simplify_grounding(
+    grounding: "Grounding", initially_true: Callable[["Fact"], bool]
+) -> Tuple["Grounding", SimplificationStats]:
+    """
+    Simplifies the ground task of the FastDownwardGrounder: it replaces
+    facts that no action changes by their initial value (given by
+    `initially_true` for each ground atom) and removes the actions that are
+    dead, unreachable or irrelevant for the goal, until nothing changes
+    anymore. Every plan of the simplified task is a plan of the original
+    task and vice versa (after dropping the actions that the simplification
+    removed). If the goal turns out to be unreachable, the goals of the
+    result are None and it has no actions.
+    """
+    simplifier = _GroundTaskSimplifier(initially_true)
+    actions = list(grounding.actions)
+    goals = grounding.goals
+    while True:
+        previous_actions, previous_goals = actions, goals
+        actions, goals = simplifier.fold_static_facts(actions, goals)
+        actions, goals = simplifier.remove_unreachable(actions, goals)
+        actions = simplifier.remove_irrelevant(actions, goals)
+        if actions == previous_actions and goals == previous_goals:
+            break
+    stats = SimplificationStats(
+        actions_before=len(grounding.actions),
+        actions_after=len(actions),
+        facts_before=len(_atoms(grounding.actions, grounding.goals or ())),
+        facts_after=len(_atoms(actions, goals or ())),
+        static_facts=len(simplifier.static_atoms),
+        dead_actions=simplifier.dead_actions,
+        unreachable_actions=simplifier.unreachable_actions,
+        irrelevant_actions=simplifier.irrelevant_actions,
+    )
+    return grounding._replace(actions=tuple(actions), goals=goals), stats
+
+
+def _effects_key(effects: Effects) -> FrozenSet[Tuple[FrozenSet["Fact"], "Fact"]]:
+    return frozenset((frozenset(condition), fact) for condition, fact in effects)
+
+
+def merge_duplicate_actions(grounding: "Grounding") -> Tuple["Grounding", int]:
+    """
+    Keeps only the first of the ground actions that have the same
+    precondition, effects and cost (regardless of the order of their facts).
+    Returns the grounding with the remaining actions and the number of
+    removed actions. The removed actions have the same effect as the
+    remaining one in every state, so its schematic action and parameters
+    also stand for them.
+    """
+    seen = set()
+    actions = []
+    for action in grounding.actions:
+        key = (
+            frozenset(action.precondition),
+            _effects_key(action.add_effects),
+            _effects_key(action.del_effects),
+            action.cost,
+        )
+        if key not in seen:
+            seen.add(key)
+            actions.append(action)
+    num_merged = len(grounding.actions) - len(actions)
+    if num_merged:
+        grounding = grounding._replace(actions=tuple(actions))
+    return grounding, num_merged
+
+
+def used_fluents(expressions: Iterable["up.model.FNode"]) -> Set["up.model.Fluent"]:
+    """Returns the fluents that occur in the given expressions."""
+    extractor = FreeVarsExtractor()
+    return {
+        fluent_exp.fluent()
+        for expression in expressions
+        for fluent_exp in extractor.get(expression)
+    }
+
+
+def clone_without_fluents(
+    problem: "up.model.Problem", fluents: Collection["up.model.Fluent"]
+) -> "up.model.Problem":
+    """
+    Returns a copy of the given problem without its actions, goals and
+    quality metrics, and without the given fluents and their initial
+    values.
+    """
+    result = Problem(problem.name, problem.environment)
+    defaults = problem.fluents_defaults
+    for fluent in problem.fluents:
+        if fluent not in fluents:
+            result.add_fluent(fluent, default_initial_value=defaults.get(fluent))
+    result.add_objects(problem.all_objects)
+    for fluent_exp, value in problem.explicit_initial_values.items():
+        if fluent_exp.fluent() not in fluents:
+            result.set_initial_value(fluent_exp, value)
+    return result
@@ -0,0 +1,86 @@
+import re
+from typing import Dict, List, Tuple, Union
+
+# Version of the set of statistics below. It changes whenever a statistic is
+# removed or changes its meaning, so consumers can tell which metrics to
+# expect from a result.
+STATISTICS_VERSION = "1"
+
+# (metric name, type, pattern) for the statistics that the translator and
+# the search component of Fast Downward print. If a line occurs several
+# times (e.g., for each iteration of an anytime configuration), the last
+# value is used.
+_STATISTICS: List[Tuple[str, type, str]] = [
+    ("translator_variables", int, r"Translator variables: (\d+)"),
+    ("translator_derived_variables", int, r"Translator derived variables: (\d+)"),
+    ("translator_facts", int, r"Translator facts: (\d+)"),
+    ("translator_goal_facts", int, r"Translator goal facts: (\d+)"),
+    ("translator_mutex_groups", int, r"Translator mutex groups: (\d+)"),
+    ("translator_operators", int, r"Translator operators: (\d+)"),
+    ("translator_axioms", int, r"Translator axioms: (\d+)"),
+    ("translator_task_size", int, r"Translator task size: (\d+)"),
+    ("translator_peak_memory_kb", int, r"Translator peak memory: (\d+) KB"),
+    ("translator_time", float, r"Done! \[[\d.]+s CPU, ([\d.]+)s wall-clock\]"),
+    ("search_expanded", int, r"Expanded (\d+) state\(s\)\."),
+    ("search_reopened", int, r"Reopened (\d+) state\(s\)\."),
+    ("search_evaluated", int, r"Evaluated (\d+) state\(s\)\."),
+    ("search_evaluations", int, r"Evaluations: (\d+)"),
+    ("search_generated", int, r"Generated (\d+) state\(s\)\."),
+    ("search_dead_ends", int, r"Dead ends: (\d+) state\(s\)\."),
+    (
+        "search_expanded_until_last_jump",
+        int,
+        r"Expanded until last jump: (\d+) state\(s\)\.",
+    ),
+    ("search_registered_states", int, r"Number of registered states: (\d+)"),
+    ("search_time", float, r"Search time: ([\d.]+)s"),
+    ("search_total_time", float, r"Total time: ([\d.]+)s"),
+    ("search_peak_memory_kb", int, r"Peak memory: (\d+) KB"),
+]
+
+STATISTICS: Dict[str, type] = {name: kind for name, kind, _ in _STATISTICS}
+
+# One regular expression for all statistics, so each line of the output is
+# matched only once. The search component prefixes its lines with the time
+# and memory (e.g., "[t=0.01s, 9964 KB] ").
+_STATISTICS_REGEX = re.compile(
+    r"(?:\[t=[^\]]*\] )?(?:"
+    + "|".join(f"(?P<{name}>{pattern})" for name, _, pattern in _STATISTICS)
+    + r")$"
+)
+_GROUP_INDEX = {
+    name: _STATISTICS_REGEX.groupindex[name] + 1 for name, _, _ in _STATISTICS
+}
+
+
+def parse_statistics(filename: str) -> Dict[str, str]:
+    """
+    Returns the statistics in the output of Fast Downward (or of one of its
+    components) in the given file as metrics of a result. The file is read
+    line by line, so its content is never held in memory as a whole.
+    """
+    statistics = {}
+    try:
+        with open(filename) as output_file:
+            for line in output_file:
+                match = _STATISTICS_REGEX.match(line.rstrip("\n"))
+                if match is not None:
+                    name = match.lastgroup
+                    statistics[name] = match.group(_GROUP_INDEX[name])
+    except FileNotFoundError:
+        pass
+    if statistics:
+        statistics["statistics_version"] = STATISTICS_VERSION
+    return statistics
+
+
+def typed_statistics(metrics: Dict[str, str]) -> Dict[str, Union[int, float]]:
+    """
+    Returns the statistics of Fast Downward in the metrics of a result with
+    their types, e.g., {"search_expanded": 24, "search_time": 0.001}.
+    """
+    return {
+        name: STATISTICS[name](value)
+        for name, value in metrics.items()
+        if name in STATISTICS
+    }
@@ -0,0 +1,540 @@
+import json
+import os
+import re
+import threading
+import time
+import weakref
+import unified_planning as up
+from functools import lru_cache
+from itertools import count
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple, Union
+from unified_planning.engines import PlanGenerationResultStatus as ResultStatus
+from unified_planning.engines.results import LogLevel, LogMessage, PlanGenerationResult
+from unified_planning.io import PDDLWriter
+from up_fast_downward import portfolio, statistics, utils
+from up_fast_downward.caching import translation_key
+
+FAST_DOWNWARD_VERSION_FILE = os.path.join(
+    os.path.dirname(__file__), "downward/driver/version.py"
+)
+
+
+@lru_cache(maxsize=None)
+def fast_downward_version() -> str:
+    """Returns the version of the Fast Downward build of the package."""
+    with open(FAST_DOWNWARD_VERSION_FILE) as version_file:
+        match = re.search(r'__version__ = "(.*)"', version_file.read())
+    return match.group(1) if match else "unknown"
+
+
+class TranslatedTask:
+    """
+    A problem translated into the SAS+ representation of Fast Downward.
+
+    The translator runs once when the task is created. Afterwards, any
+    number of configurations (aliases or search configurations) can search
+    on the translated task, one after another (`solve`) or in parallel
+    (`solve_parallel`, `solve_portfolio`), without translating the problem
+    again. Use `translate` of the Fast Downward engines to create a
+    translated task. If the engine has a `TranslationCache`, the translator
+    output is taken from the cache if possible.
+
+    The files of the task are removed by `close` or at the end of a with
+    block.
+    """
+
+    def __init__(
+        self,
+        planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+        problem: "up.model.Problem",
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+        translate_options: Optional[List[str]] = None,
+    ):
+        assert isinstance(problem, up.model.Problem)
+        self._planner = planner
+        self.problem = problem
+        # options of the translator in addition to those of the engine
+        self._translate_options = (planner._fd_translate_options or []) + (
+            translate_options or []
+        )
+        self._writer = PDDLWriter(
+            problem, planner._needs_requirements, planner._rewrite_bool_assignments
+        )
+        self._directory = planner._temp_directory()
+        self._cleanup = weakref.finalize(
+            self, utils.remove_temp_directory, self._directory
+        )
+        self._run_counter = count()
+        self._lock = threading.Lock()
+        self.sas_filename = os.path.join(self._directory, "output.sas")
+
+        self.cache_hit = False
+        # CPU time of the translator (counts for the overall time limit)
+        # and metrics of the resources it used
+        self.translate_cpu_time = 0.0
+        self._translate_metrics: Dict[str, str] = {}
+        self._translate_statistics: Dict[str, str] = {}
+        start = time.time()
+        self._translate(timeout, output_stream)
+        self.translate_time = time.time() - start
+
+    def _translate(
+        self,
+        timeout: Optional[float],
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]],
+    ):
+        planner = self._planner
+        domain_pddl = self._writer.get_domain()
+        problem_pddl = self._writer.get_problem()
+        cache = planner._fd_translation_cache
+        if cache is not None:
+            key = translation_key(
+                domain_pddl,
+                problem_pddl,
+                self._translate_options,
+                f"Fast Downward {fast_downward_version()}",
+            )
+            if cache.lookup(key, self.sas_filename):
+                self.cache_hit = True
+                self.translate_timeout_occurred = False
+                self.translate_returncode = 0
+                message = "Using the translator output from the cache."
+                self.log_messages = [LogMessage(LogLevel.INFO, message)]
+                return
+
+        domain_filename = os.path.join(self._directory, "domain.pddl")
+        problem_filename = os.path.join(self._directory, "problem.pddl")
+        with open(domain_filename, "w") as domain_file:
+            domain_file.write(domain_pddl)
+        with open(problem_filename, "w") as problem_file:
+            problem_file.write(problem_pddl)
+        run = planner._translate_run(
+            domain_filename,
+            problem_filename,
+            self.sas_filename,
+            self._translate_options,
+            os.path.join(self._directory, "translate"),
+            output_stream,
+        )
+        _, timeout_occurred = portfolio.run_portfolio(
+            [run], 1, timeout, stop_at_final_run=False
+        )
+        self._translate_statistics = statistics.parse_statistics(run.stdout_filename)
+        # the search only needs the translated task
+        os.remove(domain_filename)
+        os.remove(problem_filename)
+        self.translate_timeout_occurred = timeout_occurred
+        self.translate_returncode = (
+            None
+            if run.returncode is None
+            else planner._translate_returncode(run.returncode)
+        )
+        self._translate_metrics = portfolio.resource_metrics([run], "translate")
+        if run.rusage is not None:
+            self.translate_cpu_time = run.rusage.ru_utime + run.rusage.ru_stime
+        self.log_messages = []
+        if planner._fd_log_messages:
+            out, err = run.output()
+            self.log_messages = [
+                LogMessage(LogLevel.INFO, out),
+                LogMessage(LogLevel.ERROR, err),
+            ]
+        if cache is not None and self.translated:
+            cache.store(key, self.sas_filename)
+
+    @property
+    def translated(self) -> bool:
+        """Tells whether the translator finished successfully."""
+        return (
+            not self.translate_timeout_occurred
+            and self.translate_returncode == 0
+            and os.path.isfile(self.sas_filename)
+        )
+
+    def close(self):
+        """Removes the files of the task."""
+        self._cleanup()
+
+    def __enter__(self) -> "TranslatedTask":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def solve(
+        self,
+        config: Optional[str] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        """
+        Searches for a plan with the given alias or search configuration
+        (by default the configuration or the portfolio of the engine).
+        """
+        planner = self._planner
+        if config is None and planner._fd_portfolio:
+            return self.solve_portfolio(
+                planner._fd_portfolio,
+                planner._fd_portfolio_workers,
+                timeout,
+                output_stream,
+            )
+        return self.solve_parallel([config], 1, timeout, output_stream)[0]
+
+    def solve_parallel(
+        self,
+        configs: List[Optional[str]],
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> List["up.engines.results.PlanGenerationResult"]:
+        """
+        Runs all given configurations with at most `workers` (by default
+        one per configuration) at the same time and returns the result of
+        each configuration. Configurations that have not finished at the
+        timeout are killed. The output of the runs is copied line by line
+        to the output stream while they run.
+        """
+        if not self.translated:
+            return [self._translation_failed_result() for _ in configs]
+        runs = self._config_runs(configs, output_stream)
+        if workers is None:
+            workers = len(runs)
+        _, timeout_occurred = portfolio.run_portfolio(
+            runs, workers, timeout, stop_at_final_run=False
+        )
+        return [self._run_result(run) for run in runs]
+
+    def solve_anytime(
+        self,
+        config: Optional[str] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+        poll_interval: float = 0.05,
+    ) -> Iterator["up.engines.results.PlanGenerationResult"]:
+        """
+        Runs an anytime configuration (by default the anytime configuration
+        of the engine) and yields each plan with status INTERMEDIATE as soon
+        as Fast Downward has written its plan file. The last result is the
+        final result of the run with the best plan. If the iteration stops
+        early, the run is killed. The output of the run is copied line by
+        line to the output stream while it runs.
+        """
+        if not self.translated:
+            yield self._translation_failed_result()
+            return
+        if config is None:
+            planner = self._planner
+            config = planner._fd_anytime_alias or planner._fd_anytime_search_config
+        run = self._config_runs([config], output_stream, anytime=True)[0]
+        deadline = None if timeout is None else time.monotonic() + timeout
+        reported: Set[str] = set()
+        try:
+            run.start()
+            interval = min(0.001, poll_interval)
+            while True:
+                finished = run.poll()
+                if (
+                    not finished
+                    and deadline is not None
+                    and time.monotonic() >= deadline
+                ):
+                    run.kill()
+                    finished = True
+                # A plan file is complete once it contains the cost of the plan.
+                for filename in run.plan_filenames():
+                    if filename not in reported:
+                        reported.add(filename)
+                        plan = self._planner._plan_from_file(
+                            self.problem, filename, self._writer.get_item_named
+                        )
+                        yield PlanGenerationResult(
+                            ResultStatus.INTERMEDIATE,
+                            plan,
+                            engine_name=self._planner.name,
+                        )
+                if finished:
+                    break
+                time.sleep(interval)
+                interval = min(2 * interval, poll_interval)
+        finally:
+            if run.started and run.runtime is None:
+                run.kill()
+        yield self._run_result(run)
+
+    def _run_result(
+        self, run: portfolio.ConfigRun
+    ) -> "up.engines.results.PlanGenerationResult":
+        # the result of a finished or killed run
+        plan = self._best_plan(run)
+        if run.returncode is None:
+            # killed at the timeout
+            status = ResultStatus.TIMEOUT
+        else:
+            status = self._planner._result_status(self.problem, plan, run.returncode)
+        metrics = self._metrics()
+        if run.runtime is not None:
+            metrics["engine_internal_time"] = str(run.runtime)
+        metrics.update(portfolio.resource_metrics([run], "search"))
+        if run.stopped:
+            metrics["progress_stopped"] = "True"
+        metrics.update(statistics.parse_statistics(run.stdout_filename))
+        return PlanGenerationResult(
+            status,
+            plan,
+            engine_name=self._planner.name,
+            log_messages=self._log_messages([run]),
+            metrics=metrics,
+        )
+
+    def solve_portfolio(
+        self,
+        configs: List[str],
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ) -> "up.engines.results.PlanGenerationResult":
+        """
+        Runs the given configurations with at most `workers` (by default
+        one per configuration) at the same time and returns the first plan
+        found (or the best plan found until the timeout). All other runs are
+        killed as soon as the result is known.
+
+        The metrics of the result contain the configuration that found the
+        plan (`portfolio_winner`) and the runtime of each configuration
+        (`portfolio_runtimes`, as JSON).
+        """
+        if not self.translated:
+            return self._translation_failed_result()
+        runs = self._config_runs(configs, output_stream)
+        if workers is None:
+            workers = len(runs)
+        process_start = time.time()
+        winner, timeout_occurred = portfolio.run_portfolio(runs, workers, timeout)
+        process_end = time.time()
+
+        plan_run = winner
+        if winner is None:
+            # use the cheapest plan found by any run
+            best_plans = [
+                (run.best_plan(), i)
+                for i, run in enumerate(runs)
+                if run.started and run.best_plan() is not None
+            ]
+            if best_plans:
+                _, i = min(best_plans)
+                plan_run = runs[i]
+        plan = None if plan_run is None else self._best_plan(plan_run)
+
+        metrics = self._metrics()
+        metrics["engine_internal_time"] = str(process_end - process_start)
+        if plan_run is not None:
+            metrics["portfolio_winner"] = plan_run.config
+        metrics["portfolio_runtimes"] = json.dumps(
+            {run.config: run.runtime for run in runs if run.started}
+        )
+        metrics.update(portfolio.resource_metrics(runs, "search"))
+        if plan_run is not None:
+            metrics.update(statistics.parse_statistics(plan_run.stdout_filename))
+
+        planner = self._planner
+        if winner is not None:
+            status = planner._result_status(self.problem, plan, winner.returncode)
+        elif plan is not None:
+            status = planner._result_status(self.problem, plan, 0)
+        elif timeout_occurred:
+            status = ResultStatus.TIMEOUT
+        else:
+            # No run found a plan or proved that there is none. If a run
+            # completed its search, we report this. Otherwise, we report the
+            # result of the first run in the order of the portfolio.
+            statuses = [
+                planner._result_status(self.problem, None, run.returncode)
+                for run in runs
+            ]
+            status = next(
+                (s for s in statuses if s == planner._guarantee_no_plan_found),
+                statuses[0],
+            )
+        return PlanGenerationResult(
+            status,
+            plan,
+            engine_name=planner.name,
+            log_messages=self._log_messages(runs),
+            metrics=metrics,
+        )
+
+    def _config_runs(
+        self,
+        configs: List[Optional[str]],
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+        anytime: bool = False,
+    ) -> List[portfolio.ConfigRun]:
+        runs = []
+        for config in configs:
+            if config is None:
+                config = self._planner._default_config()
+            if config is None:
+                raise up.exceptions.UPUsageError(
+                    "The engine runs a portfolio, so the configuration of each "
+                    "run must be given"
+                )
+            with self._lock:
+                number = next(self._run_counter)
+            plan_filename = os.path.join(self._directory, f"plan{number}.txt")
+            runs.append(
+                self._planner._search_run(
+                    config,
+                    self.sas_filename,
+                    plan_filename,
+                    self.translate_cpu_time,
+                    output_stream,
+                    anytime,
+                )
+            )
+        return runs
+
+    def _best_plan(self, run: portfolio.ConfigRun) -> Optional["up.plans.Plan"]:
+        best_plan = run.best_plan()
+        if best_plan is None:
+            return None
+        return self._planner._plan_from_file(
+            self.problem, best_plan[1], self._writer.get_item_named
+        )
+
+    def _metrics(self):
+        metrics = {"translate_time": str(self.translate_time)}
+        metrics.update(self._translate_metrics)
+        metrics.update(self._translate_statistics)
+        if self._planner._fd_translation_cache is not None:
+            metrics["translation_cache_hit"] = str(self.cache_hit)
+        return metrics
+
+    def _log_messages(self, runs: List[portfolio.ConfigRun]) -> List[LogMessage]:
+        logs = list(self.log_messages)
+        if not self._planner._fd_log_messages:
+            return logs
+        for run in runs:
+            if run.started:
+                out, err = run.output()
+                logs.append(LogMessage(LogLevel.INFO, f"{run.config}:\n{out}"))
+                logs.append(LogMessage(LogLevel.ERROR, err))
+        return logs
+
+    def _translation_failed_result(self) -> "up.engines.results.PlanGenerationResult":
+        if self.translate_timeout_occurred:
+            status = ResultStatus.TIMEOUT
+        elif self.translate_returncode == 0:
+            # The translator reported success but wrote no translated task.
+            status = ResultStatus.INTERNAL_ERROR
+        else:
+            status = self._planner._result_status(
+                self.problem, None, self.translate_returncode
+            )
+        return PlanGenerationResult(
+            status,
+            None,
+            engine_name=self._planner.name,
+            log_messages=list(self.log_messages),
+            metrics=self._metrics(),
+        )
+
+
+class DriverTask:
+    """
+    A problem solved by one call of the Fast Downward driver, which runs
+    the translator and the search, in a temporary directory. Oneshot solves
+    without options that need separate runs and the problems of a batch
+    are solved like this. If an output stream is given, the output of the
+    driver is copied to it while the run is polled.
+
+    The files of the task are removed by `close` or at the end of a with
+    block.
+    """
+
+    def __init__(
+        self,
+        planner: "up_fast_downward.fast_downward.FastDownwardMixin",
+        problem: "up.model.Problem",
+        output_stream: Optional[Union[Tuple[IO[str], IO[str]], IO[str]]] = None,
+    ):
+        self.problem = planner._prepare_problem(problem)
+        self._planner = planner
+        self._writer = PDDLWriter(
+            self.problem, planner._needs_requirements, planner._rewrite_bool_assignments
+        )
+        self._directory = planner._temp_directory()
+        domain_filename = os.path.join(self._directory, "domain.pddl")
+        problem_filename = os.path.join(self._directory, "problem.pddl")
+        plan_filename = os.path.join(self._directory, "plan.txt")
+        self._writer.write_domain(domain_filename)
+        self._writer.write_problem(problem_filename)
+        cmd = planner._get_cmd(domain_filename, problem_filename, plan_filename)
+        config = planner._default_config()
+        self.run = portfolio.ConfigRun(
+            config,
+            cmd,
+            plan_filename,
+            cwd=self._directory,
+            monitor=planner._progress_monitor(config),
+            output_stream=output_stream,
+        )
+        self.deadline: Optional[float] = None
+
+    def close(self):
+        """Removes the files of the task."""
+        utils.remove_temp_directory(self._directory)
+
+    def __enter__(self) -> "DriverTask":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self, timeout: Optional[float] = None):
+        """Starts the driver (and sets the deadline of the run)."""
+        self.run.start()
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+
+    def solve(
+        self, timeout: Optional[float] = None
+    ) -> "up.engines.results.PlanGenerationResult":
+        """Runs the driver until it finishes or the timeout is reached."""
+        portfolio.run_portfolio([self.run], 1, timeout, stop_at_final_run=False)
+        return self.result()
+
+    def result(self) -> "up.engines.results.PlanGenerationResult":
+        """Returns the result of the finished or killed run."""
+        run = self.run
+        plan = None
+        best_plan = run.best_plan()
+        if best_plan is not None:
+            plan = self._planner._plan_from_file(
+                self.problem, best_plan[1], self._writer.get_item_named
+            )
+        if run.returncode is None:
+            # killed at the timeout
+            status = ResultStatus.TIMEOUT
+        else:
+            status = self._planner._result_status(self.problem, plan, run.returncode)
+        metrics = {"engine_internal_time": str(run.runtime)}
+        if run.stopped:
+            metrics["progress_stopped"] = "True"
+        metrics.update(portfolio.resource_metrics([run], "planner"))
+        metrics.update(statistics.parse_statistics(run.stdout_filename))
+        log_messages = []
+        if self._planner._fd_log_messages:
+            out, err = run.output()
+            log_messages = [
+                LogMessage(LogLevel.INFO, out),
+                LogMessage(LogLevel.ERROR, err),
+            ]
+        return PlanGenerationResult(
+            status,
+            plan,
+            engine_name=self._planner.name,
+            log_messages=log_messages,
+            metrics=metrics,
+        )
@@ -0,0 +1,684 @@
+import builtins
+import importlib
+import os.path
+import re
+import sys
+import threading
+import unified_planning as up
+from contextlib import contextmanager
+from contextvars import ContextVar
+from io import StringIO
+from itertools import count
+from time import perf_counter
+from types import ModuleType
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+from unified_planning.model import FNode, MinimizeActionCosts, Problem
+from unified_planning.exceptions import UPUnsupportedProblemTypeError
+from up_fast_downward.caching import domain_hash
+
+TRANSLATOR_PATH = os.path.join(
+    os.path.dirname(__file__), "downward/builds/release/bin/translate"
+)
+
+# Modules of the translator that are loaded by a TranslatorSession and
+# the attribute names under which the session exposes them.
+TRANSLATOR_MODULES = {
+    "pddl": "pddl",
+    "parsing_functions": "pddl_parser.parsing_functions",
+    "normalize": "normalize",
+    "pddl_to_prolog": "pddl_to_prolog",
+    "build_model": "build_model",
+    "instantiate": "instantiate",
+}
+# Modules that the translator only imports inside of functions. We load
+# them together with the other modules because sys.path does not contain
+# the translator directory when the translator runs.
+_LAZILY_IMPORTED_MODULES = ("split_rules",)
+
+# Output stream of the translator in the current thread (or asyncio task).
+# If it is None, the translator output goes to sys.stdout.
+_translator_output: ContextVar[Optional[IO[str]]] = ContextVar(
+    "translator_output", default=None
+)
+
+
+def _translator_print(*args, file=None, **kwargs):
+    # Replaces the builtin print function in all translator modules.
+    if file is None:
+        file = _translator_output.get()
+    builtins.print(*args, file=file, **kwargs)
+
+
+def _import_translator_modules(
+    names: List[str], argv: Optional[List[str]] = None
+) -> List[ModuleType]:
+    # Imports the given modules of the translator (with the given command
+    # line in sys.argv) and redirects the output of all translator modules.
+    orig_path = list(sys.path)
+    orig_argv = sys.argv
+    sys.path.insert(1, TRANSLATOR_PATH)
+    if argv is not None:
+        sys.argv = argv
+    try:
+        modules = [importlib.import_module(name) for name in names]
+    finally:
+        sys.path = orig_path
+        sys.argv = orig_argv
+    translator_dir = os.path.realpath(TRANSLATOR_PATH)
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, "__file__", None)
+        if module_file is None:
+            continue
+        if os.path.realpath(module_file).startswith(translator_dir + os.sep):
+            module.print = _translator_print
+    for name, module in zip(names, modules):
+        module_file = os.path.realpath(module.__file__)
+        if not module_file.startswith(translator_dir + os.sep):
+            raise ImportError(
+                f"Module {name} does not belong to the Fast Downward "
+                f"translator (loaded from {module.__file__})."
+            )
+    return modules
+
+
+def _load_translator_modules() -> Dict[str, ModuleType]:
+    modules = _import_translator_modules(
+        list(TRANSLATOR_MODULES.values()) + list(_LAZILY_IMPORTED_MODULES)
+    )
+    return dict(zip(TRANSLATOR_MODULES, modules))
+
+
+def _load_translate_module() -> ModuleType:
+    # The options module of the translator (imported by translate) parses
+    # the command line when it is imported. With only the required
+    # arguments, all options have their default values.
+    argv = [os.path.join(TRANSLATOR_PATH, "translate.py"), "domain", "task"]
+    (translate,) = _import_translator_modules(["translate"], argv)
+    return translate
+
+
+class TranslatorSession:
+    """
+    Gives access to the modules of the Fast Downward translator, which are
+    loaded only once per process.
+
+    The session does not modify sys.stdout or sys.path while the translator
+    runs. Instead, the output of the translator is sent to the stream of
+    the innermost `capture_output` block of the current thread, so several
+    threads can use the translator at the same time.
+    """
+
+    _load_lock = threading.Lock()
+    _modules: Optional[Dict[str, ModuleType]] = None
+    # The module translate (with the rest of the translator) is only loaded
+    # for the translation into SAS+ (see `pddl_to_sas`).
+    _translate: Optional[ModuleType] = None
+    # The translation into SAS+ keeps state in module globals (e.g., the
+    # timers and options of the translator), so only one thread runs it.
+    _pddl_to_sas_lock = threading.Lock()
+
+    def __init__(self):
+        with TranslatorSession._load_lock:
+            if TranslatorSession._modules is None:
+                TranslatorSession._modules = _load_translator_modules()
+        for attr, module in TranslatorSession._modules.items():
+            setattr(self, attr, module)
+
+    @contextmanager
+    def capture_output(self, stream: Optional[IO[str]] = None) -> Iterator[IO[str]]:
+        """
+        Sends all output of the translator in this block to the given stream
+        (a new StringIO if no stream is given) and yields the stream.
+        """
+        if stream is None:
+            stream = StringIO()
+        token = _translator_output.set(stream)
+        try:
+            yield stream
+        finally:
+            _translator_output.reset(token)
+
+    def pddl_to_sas(self, task: "pddl.Task") -> "sas_tasks.SASTask":
+        """
+        Translates the normalized translator task into a SAS+ task with the
+        default options of the translator (`translate.pddl_to_sas`). The
+        remaining modules of the translator are loaded on the first call.
+        """
+        with TranslatorSession._load_lock:
+            if TranslatorSession._translate is None:
+                TranslatorSession._translate = _load_translate_module()
+        with TranslatorSession._pddl_to_sas_lock:
+            return TranslatorSession._translate.pddl_to_sas(task)
+
+    def build_task(
+        self, problem: "up.model.Problem", names: Optional["TranslatorNames"] = None
+    ) -> "TranslatorTask":
+        """Builds the translator task for the given problem."""
+        return TranslatorTask(problem, names, self)
+
+
+# Names with a special meaning for the Fast Downward translator. We never
+# hand out these names for elements of the UP problem.
+RESERVED_NAMES = ("object", "=", "total-cost", "number")
+
+
+class TranslatorNames:
+    """
+    Assigns each type, object, fluent and action of a UP problem a name in
+    the vocabulary of the Fast Downward translator and remembers for each
+    such name the original UP element.
+
+    The names only depend on the structure of the problem, so two problems
+    with the same types, objects, fluents and actions (in the same order)
+    obtain the same names. The names of types, fluents and actions do not
+    depend on the objects.
+    """
+
+    def __init__(self, problem: "up.model.Problem"):
+        self._used_names = set(RESERVED_NAMES)
+        self._item_named: Dict[str, object] = {}
+        self.type_names = {}
+        self.object_names = {}
+        self.fluent_names = {}
+        self.action_names = []
+        for user_type in problem.user_types:
+            self.type_names[user_type] = self._new_name(user_type.name, user_type)
+        for fluent in problem.fluents:
+            self.fluent_names[fluent] = self._new_name(fluent.name, fluent)
+        for action in problem.actions:
+            self.action_names.append(self._new_name(action.name, action))
+        for obj in problem.all_objects:
+            self.object_names[obj] = self._new_name(obj.name, obj)
+
+    def _new_name(self, up_name: str, item) -> str:
+        # Names must not contain whitespace or parentheses because the
+        # translator represents ground actions as "(name arg1 ... argn)".
+        # Leading "?" marks variables and "@" marks internal predicates of
+        # the translator.
+        base = re.sub(r"[^A-Za-z0-9_\-]", "_", up_name) or "x"
+        if not base[0].isalpha():
+            base = f"x{base}"
+        name = base
+        for num in count():
+            if name not in self._used_names:
+                break
+            name = f"{base}_{num}"
+        self._used_names.add(name)
+        self._item_named[name] = item
+        return name
+
+    def get_item_named(
+        self, name: str
+    ) -> Union[
+        "up.model.Type", "up.model.Action", "up.model.Fluent", "up.model.Object"
+    ]:
+        """Returns the UP element with the given translator name."""
+        return self._item_named[name]
+
+
+class TranslatorTask:
+    """
+    Builds the task representation of the Fast Downward translator
+    (`pddl.Task`) directly from a UP problem, without writing and parsing
+    PDDL.
+
+    The attribute `task` holds the translator task; `names` maps the names
+    used in the translator task back to the elements of the UP problem.
+    `constants` contains the names of the objects that occur in actions.
+
+    The attribute `domain_task` holds a translator task with the types,
+    predicates, functions and actions of the problem but without objects,
+    initial state and goal. If a `domain_task` is given, the task reuses it
+    and only builds the objects, the initial state and the goal from the
+    problem.
+    """
+
+    def __init__(
+        self,
+        problem: "up.model.Problem",
+        names: Optional[TranslatorNames] = None,
+        session: Optional[TranslatorSession] = None,
+        domain_task: Optional["pddl.Task"] = None,
+    ):
+        assert isinstance(problem, Problem)
+        if session is None:
+            session = TranslatorSession()
+        self._pddl = session.pddl
+        self._parsing_functions = session.parsing_functions
+        self._problem = problem
+        self.names = names if names is not None else TranslatorNames(problem)
+        self._cost_metric = None
+        for qm in problem.quality_metrics:
+            if isinstance(qm, MinimizeActionCosts):
+                self._cost_metric = qm
+        self.constants = set()
+        self._collect_constants = False
+        if domain_task is None:
+            domain_task = self._build_domain_task()
+        self.domain_task = domain_task
+        self.task = self._build_task(domain_task)
+
+    def get_item_named(
+        self, name: str
+    ) -> Union[
+        "up.model.Type", "up.model.Action", "up.model.Fluent", "up.model.Object"
+    ]:
+        """Returns the UP element with the given translator name."""
+        return self.names.get_item_named(name)
+
+    def _build_task(self, domain_task: "pddl.Task") -> "pddl.Task":
+        pddl = self._pddl
+        objects, init, goal = self._build_instance()
+        task = pddl.Task(
+            domain_task.domain_name,
+            self._problem.name,
+            domain_task.requirements,
+            domain_task.types,
+            objects,
+            list(domain_task.predicates),
+            domain_task.functions,
+            init,
+            goal,
+            list(domain_task.actions),
+            list(domain_task.axioms),
+            domain_task.use_min_cost_metric,
+        )
+        task.axiom_counter = domain_task.axiom_counter
+        return task
+
+    def _build_domain_task(self) -> "pddl.Task":
+        pddl = self._pddl
+        problem = self._problem
+        names = self.names
+
+        types = [pddl.Type("object")]
+        for user_type, name in names.type_names.items():
+            father = user_type.father
+            basetype = names.type_names[father] if father is not None else "object"
+            types.append(pddl.Type(name, basetype))
+        self._parsing_functions.set_supertypes(types)
+
+        predicates = []
+        functions = []
+        for fluent, name in names.fluent_names.items():
+            arguments = [
+                pddl.TypedObject(f"?x{i}", self._type_name(p.type))
+                for i, p in enumerate(fluent.signature)
+            ]
+            if fluent.type.is_bool_type():
+                predicates.append(pddl.Predicate(name, arguments))
+            else:
+                functions.append(pddl.Function(name, arguments, "number"))
+        predicates.append(
+            pddl.Predicate(
+                "=",
+                [pddl.TypedObject("?x", "object"), pddl.TypedObject("?y", "object")],
+            )
+        )
+        requirements = [":adl", ":typing"]
+        if self._cost_metric is not None:
+            requirements.append(":action-costs")
+            functions.append(pddl.Function("total-cost", [], "number"))
+
+        actions = []
+        self._collect_constants = True
+        for action, name in zip(problem.actions, names.action_names):
+            fd_action = self._action(action, name)
+            if fd_action is not None:
+                actions.append(fd_action)
+        self._collect_constants = False
+
+        return pddl.Task(
+            "domain",
+            problem.name,
+            pddl.Requirements(requirements),
+            types,
+            [],
+            predicates,
+            functions,
+            [],
+            pddl.Conjunction([]),
+            actions,
+            [],
+            self._cost_metric is not None,
+        )
+
+    def _build_instance(
+        self,
+    ) -> Tuple[List["pddl.TypedObject"], List["pddl.Literal"], "pddl.Condition"]:
+        pddl = self._pddl
+        problem = self._problem
+        names = self.names
+
+        objects = [
+            pddl.TypedObject(name, names.type_names[obj.type])
+            for obj, name in names.object_names.items()
+        ]
+
+        init = []
+        for fluent_exp, value in problem.initial_values.items():
+            fluent = fluent_exp.fluent()
+            args = [names.object_names[a.object()] for a in fluent_exp.args]
+            if fluent.type.is_bool_type():
+                if value.is_true():
+                    init.append(pddl.Atom(names.fluent_names[fluent], args))
+            else:
+                pne = pddl.PrimitiveNumericExpression(names.fluent_names[fluent], args)
+                init.append(
+                    pddl.Assign(pne, pddl.NumericConstant(value.constant_value()))
+                )
+        init += [pddl.Atom("=", (o.name, o.name)) for o in objects]
+
+        goal = pddl.Conjunction([self._condition(g, {}) for g in problem.goals])
+        goal = goal.uniquify_variables({}).simplified()
+        return objects, init, goal
+
+    def _type_name(self, up_type: "up.model.Type") -> str:
+        if not up_type.is_user_type():
+            raise UPUnsupportedProblemTypeError(
+                f"Type {up_type} is not supported by the Fast Downward translator."
+            )
+        return self.names.type_names[up_type]
+
+    def _action(
+        self, action: "up.model.InstantaneousAction", name: str
+    ) -> Optional["pddl.Action"]:
+        pddl = self._pddl
+        if not isinstance(action, up.model.InstantaneousAction):
+            raise UPUnsupportedProblemTypeError(
+                f"Action {action.name} is not an instantaneous action."
+            )
+        scope = {}
+        parameters = []
+        for param in action.parameters:
+            var_name = self._new_variable(param.name, scope)
+            scope[param.name] = var_name
+            parameters.append(pddl.TypedObject(var_name, self._type_name(param.type)))
+        precondition = pddl.Conjunction(
+            [self._condition(p, scope) for p in action.preconditions]
+        ).simplified()
+
+        tmp_effects = []
+        for effect in action.effects:
+            tmp_effects.extend(self._effects(effect, scope))
+        effects = []
+        self._parsing_functions.add_effect(
+            pddl.ConjunctiveEffect(tmp_effects).normalize(), effects
+        )
+        if not effects:
+            # The parser of the translator also drops actions without effects.
+            return None
+
+        cost = None
+        if self._cost_metric is not None:
+            cost_exp = self._cost_metric.get_action_cost(action)
+            if cost_exp is not None:
+                cost = pddl.Increase(
+                    pddl.PrimitiveNumericExpression("total-cost", []),
+                    self._numeric_expression(cost_exp, scope),
+                )
+        return pddl.Action(
+            name, parameters, len(parameters), precondition, effects, cost
+        )
+
+    def _effects(
+        self, effect: "up.model.Effect", scope: Dict[str, str]
+    ) -> List["pddl.effects.AnyEffect"]:
+        pddl = self._pddl
+        fluent = effect.fluent.fluent()
+        if not effect.is_assignment() or not fluent.type.is_bool_type():
+            raise UPUnsupportedProblemTypeError(
+                f"Effect {effect} is not supported by the Fast Downward translator."
+            )
+        scope = dict(scope)
+        parameters = []
+        for var in effect.forall:
+            var_name = self._new_variable(var.name, scope)
+            scope[var.name] = var_name
+            parameters.append(pddl.TypedObject(var_name, self._type_name(var.type)))
+        atom = pddl.Atom(
+            self.names.fluent_names[fluent],
+            [self._term(a, scope) for a in effect.fluent.args],
+        )
+        condition = self._condition(effect.condition, scope)
+        value = effect.value
+        if value.is_bool_constant():
+            literal = atom if value.is_true() else atom.negate()
+            conditional_literals = [(condition, literal)]
+        else:
+            # Compile the assignment of a Boolean expression into two
+            # conditional effects.
+            value_condition = self._condition(value, scope)
+            conditional_literals = [
+                (pddl.Conjunction([condition, value_condition]), atom),
+                (
+                    pddl.Conjunction([condition, value_condition.negate()]),
+                    atom.negate(),
+                ),
+            ]
+        result = []
+        for condition, literal in conditional_literals:
+            condition = condition.simplified()
+            if isinstance(condition, pddl.Falsity):
+                continue
+            eff = pddl.SimpleEffect(literal)
+            if not isinstance(condition, pddl.Truth):
+                eff = pddl.ConditionalEffect(condition, eff)
+            if parameters:
+                eff = pddl.UniversalEffect(parameters, eff)
+            result.append(eff)
+        return result
+
+    def _new_variable(self, up_name: str, scope: Dict[str, str]) -> str:
+        base = "?" + re.sub(r"[^A-Za-z0-9_\-]", "_", up_name)
+        used = set(scope.values())
+        name = base
+        for num in count():
+            if name not in used:
+                break
+            name = f"{base}_{num}"
+        return name
+
+    def _term(self, node: FNode, scope: Dict[str, str]) -> str:
+        if node.is_parameter_exp():
+            return scope[node.parameter().name]
+        elif node.is_variable_exp():
+            return scope[node.variable().name]
+        elif node.is_object_exp():
+            name = self.names.object_names[node.object()]
+            if self._collect_constants:
+                self.constants.add(name)
+            return name
+        raise UPUnsupportedProblemTypeError(
+            f"Expression {node} is not supported as argument by the Fast "
+            "Downward translator."
+        )
+
+    def _condition(self, node: FNode, scope: Dict[str, str]) -> "pddl.Condition":
+        pddl = self._pddl
+        if node.is_fluent_exp():
+            fluent = node.fluent()
+            if fluent.type.is_bool_type():
+                args = [self._term(a, scope) for a in node.args]
+                return pddl.Atom(self.names.fluent_names[fluent], args)
+        elif node.is_equals():
+            return pddl.Atom("=", [self._term(a, scope) for a in node.args])
+        elif node.is_bool_constant():
+            return pddl.Truth() if node.is_true() else pddl.Falsity()
+        elif node.is_not():
+            return self._condition(node.arg(0), scope).negate()
+        elif node.is_and():
+            return pddl.Conjunction([self._condition(a, scope) for a in node.args])
+        elif node.is_or():
+            return pddl.Disjunction([self._condition(a, scope) for a in node.args])
+        elif node.is_implies():
+            left = self._condition(node.arg(0), scope)
+            right = self._condition(node.arg(1), scope)
+            return pddl.Disjunction([left.negate(), right])
+        elif node.is_iff():
+            left = self._condition(node.arg(0), scope)
+            right = self._condition(node.arg(1), scope)
+            return pddl.Disjunction(
+                [
+                    pddl.Conjunction([left, right]),
+                    pddl.Conjunction([left.negate(), right.negate()]),
+                ]
+            )
+        elif node.is_exists() or node.is_forall():
+            scope = dict(scope)
+            parameters = []
+            for var in node.variables():
+                var_name = self._new_variable(var.name, scope)
+                scope[var.name] = var_name
+                parameters.append(pddl.TypedObject(var_name, self._type_name(var.type)))
+            body = [self._condition(node.arg(0), scope)]
+            if node.is_exists():
+                return pddl.ExistentialCondition(parameters, body)
+            return pddl.UniversalCondition(parameters, body)
+        raise UPUnsupportedProblemTypeError(
+            f"Condition {node} is not supported by the Fast Downward translator."
+        )
+
+    def _numeric_expression(
+        self, node: FNode, scope: Dict[str, str]
+    ) -> Union["pddl.NumericConstant", "pddl.PrimitiveNumericExpression"]:
+        pddl = self._pddl
+        if not (node.is_int_constant() or node.is_real_constant()):
+            node = self._problem.environment.simplifier.simplify(node)
+        if node.is_int_constant() or node.is_real_constant():
+            return pddl.NumericConstant(node.constant_value())
+        elif node.is_fluent_exp():
+            args = [self._term(a, scope) for a in node.args]
+            return pddl.PrimitiveNumericExpression(
+                self.names.fluent_names[node.fluent()], args
+            )
+        raise UPUnsupportedProblemTypeError(
+            f"Action cost {node} is not supported by the Fast Downward translator."
+        )
+
+
+class TranslatorDomain:
+    """
+    The part of the translation that only depends on the domain of a UP
+    problem: the normalized translator task without objects, initial state
+    and goal, and the rules of the logic program for the reachability
+    analysis that stem from the actions.
+
+    The domain is prepared from a representative problem and can be used
+    for all problems with the same domain and constants (see
+    `instance_names`). For these problems, `explore` only translates the
+    objects, the initial state and the goal before it computes the model of
+    the logic program.
+
+    `preparation_time` is the time (in seconds) for preparing the domain.
+    `full_pipeline_time` can be set by the user of the domain to the time
+    of processing the representative problem without the domain, so that
+    it can be compared to the time per instance.
+    """
+
+    def __init__(
+        self,
+        problem: "up.model.Problem",
+        session: Optional[TranslatorSession] = None,
+    ):
+        assert isinstance(problem, Problem)
+        start_time = perf_counter()
+        self.session = session if session is not None else TranslatorSession()
+        self.key = domain_hash(problem)
+        self.full_pipeline_time: Optional[float] = None
+        translator = self.session
+        with translator.capture_output():
+            names = TranslatorNames(problem)
+            translator_task = TranslatorTask(problem, names, translator)
+            task = translator_task.domain_task
+            translator.normalize.normalize(task)
+            prog = translator.pddl_to_prolog.PrologProgram()
+            for conditions, effect in translator.normalize.build_exploration_rules(
+                task
+            ):
+                if effect.predicate != "@goal-reachable":
+                    prog.add_rule(translator.pddl_to_prolog.Rule(conditions, effect))
+            prog.normalize()
+            prog.split_rules()
+        self._task = task
+        self._constants = {
+            name: names.get_item_named(name) for name in translator_task.constants
+        }
+        self._rules = prog.rules
+        self._facts = prog.facts
+        self._needs_object_facts = any(
+            condition.predicate == "@object"
+            for rule in prog.rules
+            for condition in rule.conditions
+        )
+        self.preparation_time = perf_counter() - start_time
+
+    def instance_names(self, problem: "up.model.Problem") -> Optional[TranslatorNames]:
+        """
+        Returns the translator names for the given problem if the problem
+        has the prepared domain and None otherwise.
+        """
+        if domain_hash(problem) != self.key:
+            return None
+        names = TranslatorNames(problem)
+        for name, obj in self._constants.items():
+            if names.object_names.get(obj) != name:
+                return None
+        return names
+
+    def explore(
+        self, problem: "up.model.Problem", names: TranslatorNames
+    ) -> Tuple["pddl.Task", List["pddl.Atom"]]:
+        """
+        Returns the translator task of the given problem (with the names
+        from `instance_names`) and the model of the logic program for the
+        reachability analysis, like `pddl_to_prolog.translate` and
+        `build_model.compute_model` on the normalized task.
+        """
+        translator = self.session
+        pddl = translator.pddl
+        pddl_to_prolog = translator.pddl_to_prolog
+        task = TranslatorTask(problem, names, translator, self._task).task
+
+        # Normalize the goal on its own, the actions are already normalized.
+        goal_task = pddl.Task(
+            task.domain_name,
+            task.task_name,
+            task.requirements,
+            task.types,
+            task.objects,
+            task.predicates,
+            task.functions,
+            [],
+            task.goal,
+            [],
+            [],
+            task.use_min_cost_metric,
+        )
+        goal_task.axiom_counter = task.axiom_counter
+        translator.normalize.normalize(goal_task)
+        task.goal = goal_task.goal
+        task.axioms += goal_task.axioms
+        task.axiom_counter = goal_task.axiom_counter
+
+        prog = pddl_to_prolog.PrologProgram()
+        # avoid clashes with the auxiliary predicates of the domain rules
+        prog.new_name = (f"p$goal{i}" for i in count())
+        pddl_to_prolog.translate_facts(prog, task)
+        for conditions, effect in translator.normalize.build_exploration_rules(
+            goal_task
+        ):
+            prog.add_rule(pddl_to_prolog.Rule(conditions, effect))
+        prog.normalize()
+        prog.split_rules()
+        if self._needs_object_facts and not any(
+            fact.atom.predicate == "@object" for fact in prog.facts
+        ):
+            prog.facts += [
+                pddl_to_prolog.Fact(pddl.Atom("@object", [obj]))
+                for obj in sorted(prog.objects)
+            ]
+        prog.facts += self._facts
+        prog.rules = self._rules + prog.rules
+        model = translator.build_model.compute_model(prog)
+        return task, model
@@ -1,7 +1,116 @@
+import os
+import shutil
+import tempfile
+import threading
 from itertools import count
 from unified_planning.shortcuts import BoolType, MinimizeActionCosts
 from unified_planning.model import InstantaneousAction
-from typing import Mapping, Optional, Tuple
+from unified_planning.model.operators import OperatorKind
+from typing import Callable, Dict, Mapping, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Memory-backed file system (tmpfs) for the files of Fast Downward runs.
+MEMORY_DIRECTORY = "/dev/shm"
+_TEMP_PREFIX = "up-fast-downward-"
+# A process holds an exclusive lock on this file in each of its directories
+# in the memory-backed file system as long as it uses the directory.
+_LOCK_FILENAME = "lock"
+_stale_directories_removed = False
+_stale_directories_lock = threading.Lock()
+# file descriptors of the locks of our directories
+_directory_locks: Dict[str, int] = {}
+_directory_locks_lock = threading.Lock()
+
+
+def make_temp_directory(in_memory: bool = False) -> str:
+    """
+    Creates a temporary directory for the files of a Fast Downward run
+    (PDDL, SAS+ and plan files). If in_memory is set and the system has a
+    memory-backed file system, the directory is created there, so the files
+    never reach a (possibly shared) disk. Remove the directory with
+    `remove_temp_directory`.
+    """
+    if fcntl is None or not in_memory or not os.access(MEMORY_DIRECTORY, os.W_OK):
+        return tempfile.mkdtemp(prefix=_TEMP_PREFIX)
+    _remove_stale_directories()
+    directory = tempfile.mkdtemp(prefix=_TEMP_PREFIX, dir=MEMORY_DIRECTORY)
+    # The lock file only gets its name once it is locked, so other
+    # processes never see it unlocked while the directory is in use.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    os.rename(tmp_path, os.path.join(directory, _LOCK_FILENAME))
+    with _directory_locks_lock:
+        _directory_locks[directory] = fd
+    return directory
+
+
+def remove_temp_directory(directory: str):
+    """
+    Removes a directory created by `make_temp_directory` and releases its
+    lock.
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    with _directory_locks_lock:
+        fd = _directory_locks.pop(directory, None)
+    if fd is not None:
+        os.close(fd)
+
+
+def _remove_stale_directories():
+    # Removes the directories in the memory-backed file system whose lock
+    # is not held by any process (once per process). Their processes have
+    # been killed before they could clean up. The lock also works across
+    # PID namespaces (e.g., for containers that share /dev/shm).
+    global _stale_directories_removed
+    with _stale_directories_lock:
+        if _stale_directories_removed:
+            return
+        _stale_directories_removed = True
+    for name in os.listdir(MEMORY_DIRECTORY):
+        if not name.startswith(_TEMP_PREFIX):
+            continue
+        directory = os.path.join(MEMORY_DIRECTORY, name)
+        try:
+            fd = os.open(os.path.join(directory, _LOCK_FILENAME), os.O_RDONLY)
+        except OSError:
+            # not ours, not accessible or still being created
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # in use
+            os.close(fd)
+            continue
+        try:
+            shutil.rmtree(directory, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
+def ground_action_name(
+    fd_name: str,
+    get_item_named: Callable[[str], object],
+    used_action_names: Set[str],
+) -> str:
+    """
+    Returns a new name in the UP for the ground action with the given name
+    in the translator (e.g. "(move l1 l2)"), composed of the names of the
+    schematic action and the parameters.
+    """
+    name_and_args = fd_name[1:-1].split()
+    full_name = "_".join(get_item_named(n).name for n in name_and_args)
+    if full_name in used_action_names:
+        for num in count():
+            candidate = f"{full_name}_{num}"
+            if candidate not in used_action_names:
+                full_name = candidate
+                break
+    used_action_names.add(full_name)
+    return full_name
 
 
 def introduce_artificial_goal_action(
@@ -63,3 +172,46 @@ def introduce_artificial_goal_action(
         modified_problem.add_quality_metric(metric)
 
     return modified_problem, goal_action, modified_to_orig_action
+
+
+def add_goal_action_if_complicated_goal(
+    problem: "up.model.AbstractProblem",
+) -> Tuple[
+    "up.model.AbstractProblem",
+    Optional["up.model.InstantaneousAction"],
+    Optional[Mapping["up.model.InstantaneousAction", "up.model.InstantaneousAction"]],
+]:
+    """
+    Tests whether the given problem has a complicated goal (not just
+    a conjunction of positive and negative fluents). If yes, it returns
+    a transformed problem with an artificial goal action and a single goal
+    fluent, where the existing actions are modified to delete the goal fluent.
+    The second return value is the new goal action. The third return value
+    maps the actions of the modified problem to the actions of the original
+    problem. If the goal was not complicated, it returns the original
+    problem, None, and None.
+    """
+    COMPLICATED_KINDS = (
+        OperatorKind.EXISTS,
+        OperatorKind.FORALL,
+        OperatorKind.IFF,
+        OperatorKind.IMPLIES,
+        OperatorKind.OR,
+    )
+
+    def is_complicated_goal(fnode):
+        if fnode.node_type in COMPLICATED_KINDS or (
+            fnode.node_type == OperatorKind.NOT
+            and fnode.args[0].node_type != OperatorKind.FLUENT_EXP
+        ):
+            return True
+        return any(is_complicated_goal(arg) for arg in fnode.args)
+
+    if not any(is_complicated_goal(g) for g in problem.goals):
+        # no complicated goal
+        return problem, None, None
+    else:
+        # To avoid the introduction of axioms with complicated goals, we
+        # introduce a separate goal action (later to be removed by
+        # map_back)
+        return introduce_artificial_goal_action(problem, True)